@@ -0,0 +1,94 @@
+# benchmarks/bench_async_sql.py
+"""
+Throughput of SQLAdapter's thread-pool path vs. the native AsyncEngine path
+at increasing concurrency.
+
+    python -m benchmarks.bench_async_sql                      # local SQLite stand-in
+    python -m benchmarks.bench_async_sql \\
+        --sync-url postgresql+psycopg2://u:p@localhost/bench \\
+        --async-url postgresql+asyncpg://u:p@localhost/bench   # Postgres stand-in
+
+Prints one JSON object per (mode, concurrency) run.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import sqlalchemy
+
+from src.text_to_sql_agents.magentic_orchestration.adapters.sql_adapter import SQLAdapter
+from src.text_to_sql_agents.models.config_models import PoolSettings
+
+
+QUERY = "SELECT id, region, amount FROM sales WHERE id % 97 = {k} LIMIT 100"
+
+
+def build_sqlite_fixture(path: Path, rows: int = 100_000):
+    engine = sqlalchemy.create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(sqlalchemy.text("DROP TABLE IF EXISTS sales"))
+        conn.execute(sqlalchemy.text("CREATE TABLE sales (id INTEGER PRIMARY KEY, region TEXT, amount REAL)"))
+        conn.execute(
+            sqlalchemy.text(
+                "WITH RECURSIVE r(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM r WHERE i < :n) "
+                "INSERT INTO sales SELECT i, 'region_' || (i % 20), (i * 37 % 1000) / 10.0 FROM r"
+            ),
+            {"n": rows},
+        )
+    engine.dispose()
+
+
+async def run_load(adapter: SQLAdapter, concurrency: int, queries: int) -> dict:
+    latencies = []
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(k: int):
+        async with gate:
+            start = time.perf_counter()
+            await adapter.execute_query(QUERY.format(k=k % 97))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(k) for k in range(queries)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "queries": queries,
+        "elapsed_s": round(elapsed, 4),
+        "qps": round(queries / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+    }
+
+
+async def main(args):
+    sync_url, async_url = args.sync_url, args.async_url
+    if not sync_url:
+        db = Path(tempfile.mkdtemp()) / "bench.db"
+        build_sqlite_fixture(db)
+        sync_url, async_url = f"sqlite:///{db}", f"sqlite+aiosqlite:///{db}"
+
+    for concurrency in args.concurrency:
+        pool = PoolSettings(pool_size=concurrency, max_overflow=0, executor_workers=args.workers)
+        for mode, url in (("thread", sync_url), ("async", async_url)):
+            adapter = SQLAdapter(url, provider=f"bench-{mode}-{concurrency}", pool=pool, async_mode=(
+                "on" if mode == "async" else "off"
+            ))
+            await adapter.execute_query(QUERY.format(k=0))  # warm the pool
+            result = await run_load(adapter, concurrency, args.queries)
+            print(json.dumps({"mode": mode, "concurrency": concurrency, **result}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sync-url", help="SQLAlchemy URL with a sync driver (default: temporary SQLite file)")
+    parser.add_argument("--async-url", help="Same database with an async driver")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=8, help="Thread-pool size for the thread path")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,74 @@
+# benchmarks/bench_guardrail.py
+"""
+Guardrail cost per statement at realistic query sizes: the previous six-regex check,
+the single-pass tokenizer analysis (cold) and a verdict-cache hit (warm).
+
+    python -m benchmarks.bench_guardrail
+    python -m benchmarks.bench_guardrail --repeat 2000
+
+Prints one JSON object per query size.
+"""
+
+import argparse
+import json
+import re
+import time
+
+from src.text_to_sql_agents.utils.sql_guard import GuardrailEngine, analyze_sql
+
+
+LEGACY_PATTERNS = [r"\bDROP\b", r"\bDELETE\b", r"\bUPDATE\b", r"\bINSERT\b", r"\bALTER\b", r"\bTRUNCATE\b"]
+
+
+def legacy_check(sql: str) -> bool:
+    return not any(re.search(p, sql, re.IGNORECASE) for p in LEGACY_PATTERNS)
+
+
+def make_query(ctes: int) -> str:
+    """A read-only query with `ctes` CTEs, comments and string literals (about 400 chars per CTE)."""
+    parts = []
+    for i in range(ctes):
+        parts.append(
+            f"c{i} AS (\n"
+            f"  -- monthly revenue for segment {i}\n"
+            f"  SELECT o.customer_id, DATE_TRUNC('month', o.order_date) AS month,\n"
+            f"         SUM(o.amount) AS revenue, COUNT(*) AS orders\n"
+            f"  FROM sales.orders o JOIN sales.customers c ON c.id = o.customer_id\n"
+            f"  WHERE c.segment = 'segment {i}' AND o.status <> 'cancelled'\n"
+            f"  GROUP BY o.customer_id, DATE_TRUNC('month', o.order_date)\n"
+            f")"
+        )
+    unions = " UNION ALL ".join(f"SELECT * FROM c{i}" for i in range(ctes))
+    return "WITH " + ",\n".join(parts) + f"\nSELECT month, SUM(revenue) FROM ({unions}) t GROUP BY month ORDER BY month"
+
+
+def per_call_us(func, sql: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(sql)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main(args):
+    for ctes in args.ctes:
+        sql = make_query(ctes)
+        assert analyze_sql(sql).allowed, analyze_sql(sql)
+        engine = GuardrailEngine()
+        engine.analyze(sql)
+        print(
+            json.dumps(
+                {
+                    "chars": len(sql),
+                    "legacy_regex_us": round(per_call_us(legacy_check, sql, args.repeat), 2),
+                    "tokenizer_cold_us": round(per_call_us(analyze_sql, sql, args.repeat), 2),
+                    "cache_hit_us": round(per_call_us(engine.analyze, sql, args.repeat), 2),
+                }
+            )
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ctes", type=int, nargs="+", default=[1, 5, 25, 100])
+    parser.add_argument("--repeat", type=int, default=500)
+    main(parser.parse_args())
@@ -0,0 +1,110 @@
+# benchmarks/bench_llm_scheduler.py
+"""
+LLM calls against a throttling chat-completions endpoint, with and without LLMScheduler.
+
+    python -m benchmarks.bench_llm_scheduler                          # in-process fake server
+    python -m benchmarks.bench_llm_scheduler --url http://localhost:8099   # benchmarks.fake_chat_server
+
+Time is compressed: quotas apply per --window-seconds instead of per minute, on both the
+server and the scheduler. "naive" retries a 429 after 0.5 * attempt seconds, like the
+controller's step retries; "scheduler" runs the same calls through LLMScheduler with the
+quota configured. Interactive calls are mixed into a batch load. Prints one JSON object per mode.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.fake_chat_server import create_app
+from src.text_to_sql_agents.magentic_orchestration.llm_scheduler import BATCH, INTERACTIVE, LLMScheduler
+
+
+def _client(args) -> httpx.AsyncClient:
+    if args.url:
+        return httpx.AsyncClient(base_url=args.url, timeout=60)
+    app = create_app(latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 4, rpm=args.rpm, window_seconds=args.window_seconds)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://fake", timeout=60)
+
+
+async def _call(client: httpx.AsyncClient, i: int) -> dict:
+    body = {"model": "fake", "messages": [{"role": "user", "content": f"question {i} " * 20}], "max_tokens": 50}
+    response = await client.post("/v1/chat/completions", json=body)
+    response.raise_for_status()
+    return response.json()
+
+
+async def run(mode: str, args) -> dict:
+    latencies: Dict[str, List[float]] = {"interactive": [], "batch": []}
+    failures = 0
+    scheduler = LLMScheduler(requests_per_minute=args.rpm, period_seconds=args.window_seconds, max_throttle_retries=20)
+
+    async with _client(args) as client:
+
+        async def one(i: int, priority: int):
+            nonlocal failures
+            start = time.perf_counter()
+            try:
+                if mode == "scheduler":
+                    await scheduler.submit(lambda: _call(client, i), tokens=100, priority=priority)
+                else:
+                    for attempt in range(1, 21):
+                        try:
+                            await _call(client, i)
+                            break
+                        except httpx.HTTPStatusError as e:
+                            if e.response.status_code != 429 or attempt == 20:
+                                raise
+                            await asyncio.sleep(0.5 * attempt)
+            except Exception:
+                failures += 1
+                return
+            latencies["interactive" if priority == INTERACTIVE else "batch"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        tasks = [asyncio.create_task(one(i, BATCH)) for i in range(args.batch)]
+        for i in range(args.interactive):
+            await asyncio.sleep(args.window_seconds / max(args.interactive, 1))
+            tasks.append(asyncio.create_task(one(args.batch + i, INTERACTIVE)))
+        await asyncio.gather(*tasks)
+        wall = time.perf_counter() - start
+        server = (await client.get("/stats")).json()
+
+    def summary(values: List[float]) -> dict:
+        values = sorted(values)
+        if not values:
+            return {}
+        return {
+            "p50_ms": round(statistics.median(values) * 1000, 1),
+            "p95_ms": round(values[max(0, int(len(values) * 0.95) - 1)] * 1000, 1),
+        }
+
+    return {
+        "mode": mode,
+        "calls": args.batch + args.interactive,
+        "failed": failures,
+        "wall_s": round(wall, 2),
+        "server_requests": server["requests"],
+        "server_429": server["throttled"],
+        "interactive": summary(latencies["interactive"]),
+        "batch": summary(latencies["batch"]),
+        "scheduler": scheduler.stats() if mode == "scheduler" else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Running fake_chat_server; default: in-process")
+    parser.add_argument("--rpm", type=int, default=40, help="Requests per window on the server and the scheduler")
+    parser.add_argument("--window-seconds", type=float, default=2.0)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--batch", type=int, default=120)
+    parser.add_argument("--interactive", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", default=["naive", "scheduler"])
+    args = parser.parse_args()
+    for mode in args.modes:
+        print(json.dumps(asyncio.run(run(mode, args))))
@@ -0,0 +1,71 @@
+# benchmarks/bench_metrics.py
+"""
+Hot-path cost of the built-in instrumentation: counter increments, histogram observations,
+timed blocks (with and without a disabled tracing span), and the cost of one /metrics scrape.
+
+    python -m benchmarks.bench_metrics
+    python -m benchmarks.bench_metrics --repeat 500000 --series 2000
+
+Prints one JSON object per operation (nanoseconds per call; milliseconds for the scrape).
+"""
+
+import argparse
+import json
+import time
+
+from src.text_to_sql_agents.magentic_orchestration.metrics import MetricsRegistry
+from src.text_to_sql_agents.magentic_orchestration.tracing import span
+
+
+def per_call_ns(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e9
+
+
+def main(args):
+    registry = MetricsRegistry(prefix="bench")
+    counter = registry.counter("rows_total", "rows", ("provider",))
+    histogram = registry.histogram("step_seconds", "steps", ("plan", "step", "agent", "outcome"))
+    timed = registry.histogram("agent_seconds", "agents", ("agent", "outcome"))
+
+    def timer_block():
+        with timed.time("generate_sql"):
+            pass
+
+    def timer_and_span():
+        with span("step", plan="p", step="gen"), timed.time("generate_sql"):
+            pass
+
+    operations = {
+        "baseline_noop": lambda: None,
+        "counter_inc": lambda: counter.inc(100, "mssql"),
+        "histogram_observe": lambda: histogram.observe(0.042, "text_to_sql_basic", "gen", "generate_sql", "ok"),
+        "timed_block": timer_block,
+        "timed_block_with_disabled_span": timer_and_span,
+    }
+    for name, func in operations.items():
+        print(json.dumps({"operation": name, "ns_per_call": round(per_call_ns(func, args.repeat), 1)}))
+
+    for i in range(args.series):
+        histogram.observe(0.01 * (i % 50), "plan", f"step{i}", "agent", "ok")
+    start = time.perf_counter()
+    text = registry.render()
+    print(
+        json.dumps(
+            {
+                "operation": "render",
+                "histogram_series": args.series,
+                "lines": text.count("\n"),
+                "ms": round((time.perf_counter() - start) * 1000, 2),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200_000)
+    parser.add_argument("--series", type=int, default=500, help="Histogram label sets rendered by the scrape")
+    main(parser.parse_args())
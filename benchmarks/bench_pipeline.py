@@ -0,0 +1,375 @@
+# benchmarks/bench_pipeline.py
+"""
+End-to-end MagenticController.run_plan benchmarks that run fully offline. The LLM and
+Foundry adapters are deterministic stubs (benchmarks.stub_adapters). The database is a
+generated SQLite warehouse (benchmarks.warehouse_fixture) behind the real SQLAdapter.
+
+    python -m benchmarks.bench_pipeline                                   # every scenario
+    python -m benchmarks.bench_pipeline --scenario latency --requests 200
+    python -m benchmarks.bench_pipeline --scenario throughput --concurrency 1 8 32 64
+    python -m benchmarks.bench_pipeline --scenario large_result --large-rows 1000000
+    python -m benchmarks.bench_pipeline --llm-latency lognormal:600:0.4 \\
+        --plugin-latency generate_sql=lognormal:1500:0.3 --rpm 300
+    python -m benchmarks.bench_pipeline --output bench/$(git rev-parse --short HEAD).jsonl
+    python -m benchmarks.bench_pipeline --compare bench/main.jsonl --max-regression 10
+
+Scenarios:
+  latency       requests one after another: plan latency percentiles and per-step p50
+  throughput    the same workload at each --concurrency: requests/s, latency percentiles
+                and the worst event-loop lag
+  large_result  one question answered with --large-rows rows, in three modes: full result,
+                streamed to a PlanEventStream (/query/stream), and bounded (preview rows plus
+                aggregates). Reports wall time and peak traced memory.
+
+Prints one JSON object per line. The first line describes the run (commit, fixture,
+latency models); each later line is one measurement. --compare matches measurements by
+(scenario, mode, concurrency) against an earlier output and reports every change.
+Regressions beyond --max-regression percent make the exit status 1.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+from loguru import logger
+
+from benchmarks.stub_adapters import LatencyModel, StubFoundryAdapter, StubKernelAdapter, latency_models
+from benchmarks.warehouse_fixture import DEFAULT_PATH, build_warehouse, large_result_question, questions
+from src.text_to_sql_agents.agents.executor import dispose_engines
+from src.text_to_sql_agents.magentic_orchestration.adapters.executor_pool import shutdown_executors
+from src.text_to_sql_agents.magentic_orchestration.adapters.sql_adapter import SQLAdapter
+from src.text_to_sql_agents.magentic_orchestration.llm_scheduler import LLMScheduler
+from src.text_to_sql_agents.magentic_orchestration.magentic_controller import MagenticController
+from src.text_to_sql_agents.magentic_orchestration.metrics import LoopLagMonitor
+from src.text_to_sql_agents.magentic_orchestration.plan_events import PlanEventStream, plan_events
+from src.text_to_sql_agents.models.config_models import PoolSettings, SchemaCacheSettings
+
+
+PLAN_FILE = Path("src/text_to_sql_agents/magentic_orchestration/workflow_plans.yaml")
+PLAN = "text_to_sql_basic"
+BOUNDED_PLAN = "text_to_sql_bounded"
+
+# metrics compared by --compare; everything else in a record is context
+HIGHER_IS_BETTER = {"rps"}
+COMPARED_SUFFIXES = ("_ms", "_mb", "rps")
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentiles(values_ms: List[float]) -> Dict[str, float]:
+    if not values_ms:
+        return {}
+    ordered = sorted(values_ms)
+
+    def at(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+    return {
+        "mean_ms": round(sum(ordered) / len(ordered), 2),
+        "p50_ms": at(0.50),
+        "p95_ms": at(0.95),
+        "p99_ms": at(0.99),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def write_plans(directory: Path) -> Path:
+    """The shipped plans, plus a copy of the basic plan whose exec step uses bounded execution."""
+    data = yaml.safe_load(PLAN_FILE.read_text(encoding="utf-8"))
+    bounded = json.loads(json.dumps(data["plans"][PLAN]))
+    for step in bounded["steps"]:
+        if step["agent"] == "execute_sql":
+            step["input"]["stream"] = True
+    data["plans"][BOUNDED_PLAN] = bounded
+    path = directory / "bench_plans.yaml"
+    path.write_text(yaml.safe_dump(data, sort_keys=False), encoding="utf-8")
+    return path
+
+
+class Workload:
+    """Questions handed to the controller and the SQL the stub LLM answers them with."""
+
+    def __init__(self):
+        self.answers: Dict[str, str] = {}
+        self._next = 0
+
+    def take(self, count: int) -> List[str]:
+        pairs = questions(count, offset=self._next)
+        self._next += count
+        self.answers.update(pairs)
+        return [question for question, _ in pairs]
+
+    def large(self, rows: int, tag: str) -> str:
+        question, sql = large_result_question(rows)
+        question = f"{question} ({tag})"  # distinct per mode, so no SQL cache hits between modes
+        self.answers[question] = sql
+        return question
+
+    def answer(self, question: str) -> str:
+        return self.answers.get(question, "SELECT 1 AS answer")
+
+
+def build_controller(args, fixture: Dict[str, Any], workload: Workload, work_dir: Path) -> MagenticController:
+    overrides = dict(item.split("=", 1) for item in args.plugin_latency)
+    scheduler = None if args.no_scheduler else LLMScheduler(requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+    kernel = StubKernelAdapter(
+        workload.answer, latency_models(args.llm_latency, overrides, seed=args.seed), scheduler=scheduler
+    )
+    foundry = StubFoundryAdapter(LatencyModel.parse(args.foundry_latency, seed=args.seed + 100))
+    sql = SQLAdapter(
+        fixture["url"],
+        provider="bench-sqlite",
+        pool=PoolSettings(pool_size=args.workers, max_overflow=0, executor_workers=args.workers),
+        async_mode="off",
+        schema_cache=SchemaCacheSettings(path=str(work_dir / "schema_snapshot.json")),
+    )
+    controller = MagenticController(kernel_adapter=kernel, foundry_adapter=foundry, sql_adapter=sql)
+    controller.load_plan_file(str(write_plans(work_dir)))
+    return controller
+
+
+async def run_one(controller: MagenticController, question: str, plan: str = PLAN) -> Tuple[float, Dict[str, Any]]:
+    started = time.perf_counter()
+    result = await controller.run_plan(plan, {"user_query": question, "user_id": "bench"})
+    return (time.perf_counter() - started) * 1000, result
+
+
+async def scenario_latency(controller: MagenticController, workload: Workload, args) -> List[Dict[str, Any]]:
+    for question in workload.take(args.warmup):
+        await run_one(controller, question)
+    latencies: List[float] = []
+    steps: Dict[str, List[float]] = {}
+    errors = 0
+    for question in workload.take(args.requests):
+        try:
+            elapsed, result = await run_one(controller, question)
+        except Exception as e:
+            logger.warning(f"Request failed: {e}")
+            errors += 1
+            continue
+        latencies.append(elapsed)
+        for step_id, timing in result["timings"].items():
+            steps.setdefault(step_id, []).append(timing["duration_ms"])
+    return [
+        {
+            "scenario": "latency",
+            "requests": args.requests,
+            "errors": errors,
+            **percentiles(latencies),
+            "step_p50_ms": {step_id: percentiles(values)["p50_ms"] for step_id, values in steps.items()},
+        }
+    ]
+
+
+async def scenario_throughput(controller: MagenticController, workload: Workload, args) -> List[Dict[str, Any]]:
+    records = []
+    for concurrency in args.concurrency:
+        gate = asyncio.Semaphore(concurrency)
+        latencies: List[float] = []
+        errors = 0
+
+        async def one(question: str):
+            nonlocal errors
+            async with gate:
+                try:
+                    elapsed, _ = await run_one(controller, question)
+                    latencies.append(elapsed)
+                except Exception as e:
+                    logger.warning(f"Request failed: {e}")
+                    errors += 1
+
+        # fresh questions per level: nothing is served from the SQL cache of an earlier level
+        batch = workload.take(max(args.requests, concurrency))
+        lag = LoopLagMonitor(interval=0.01)
+        lag.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(one(q) for q in batch))
+        elapsed = time.perf_counter() - started
+        await lag.stop()
+        records.append(
+            {
+                "scenario": "throughput",
+                "concurrency": concurrency,
+                "requests": len(batch),
+                "errors": errors,
+                "elapsed_s": round(elapsed, 3),
+                "rps": round(len(latencies) / elapsed, 2),
+                **percentiles(latencies),
+                "loop_lag_max_ms": round(lag.max_lag * 1000, 2),
+            }
+        )
+    return records
+
+
+async def _large_run(controller: MagenticController, question: str, mode: str) -> Dict[str, Any]:
+    if mode == "bounded":
+        _, result = await run_one(controller, question, BOUNDED_PLAN)
+        return {"rows": result["results"]["exec"]["row_count"], "events": 0}
+    if mode == "streamed":
+        events = 0
+
+        def count(event: Dict[str, Any]):
+            nonlocal events
+            events += 1
+
+        with plan_events(PlanEventStream(count)):
+            task = asyncio.create_task(controller.run_plan(PLAN, {"user_query": question, "user_id": "bench"}))
+        result = await task
+        return {"rows": len(result["results"]["exec"]), "events": events}
+    _, result = await run_one(controller, question)
+    return {"rows": len(result["results"]["exec"]), "events": 0}
+
+
+async def scenario_large_result(controller: MagenticController, workload: Workload, args) -> List[Dict[str, Any]]:
+    records = []
+    for mode in ("full", "streamed", "bounded"):
+        # timed without tracemalloc (it slows allocation-heavy code), then measured with it
+        started = time.perf_counter()
+        outcome = await _large_run(controller, workload.large(args.large_rows, f"{mode}, timed"), mode)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        tracemalloc.start()
+        try:
+            await _large_run(controller, workload.large(args.large_rows, f"{mode}, traced"), mode)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        records.append(
+            {
+                "scenario": "large_result",
+                "mode": mode,
+                "requested_rows": args.large_rows,
+                **outcome,
+                "wall_ms": round(elapsed_ms, 1),
+                "peak_mb": round(peak / 2**20, 1),
+            }
+        )
+    return records
+
+
+SCENARIOS = {
+    "latency": scenario_latency,
+    "throughput": scenario_throughput,
+    "large_result": scenario_large_result,
+}
+
+
+def _key(record: Dict[str, Any]) -> Tuple[Any, ...]:
+    return record.get("scenario"), record.get("mode"), record.get("concurrency")
+
+
+def compare(records: List[Dict[str, Any]], baseline_path: str, max_regression: float) -> List[Dict[str, Any]]:
+    """One line per compared metric: baseline, current, change in percent, and whether it regressed."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {_key(r): r for r in (json.loads(line) for line in f if line.strip()) if r.get("scenario")}
+    lines = []
+    for record in records:
+        before = baseline.get(_key(record))
+        if before is None:
+            continue
+        for metric, value in record.items():
+            old = before.get(metric)
+            if not metric.endswith(COMPARED_SUFFIXES) or not isinstance(value, (int, float)) or not old:
+                continue
+            change = (value - old) / old * 100
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            lines.append(
+                {
+                    "compare": "/".join(str(part) for part in _key(record) if part is not None),
+                    "metric": metric,
+                    "baseline": old,
+                    "current": value,
+                    "change_pct": round(change, 1),
+                    "regression": worse > max_regression,
+                }
+            )
+    return lines
+
+
+async def main(args) -> int:
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    fixture = build_warehouse(args.warehouse, args.orders)
+    work_dir = Path(tempfile.mkdtemp(prefix="bench_pipeline_"))
+    workload = Workload()
+    controller = build_controller(args, fixture, workload, work_dir)
+    out = open(args.output, "a", encoding="utf-8") if args.output else None
+
+    def emit(record: Dict[str, Any]):
+        line = json.dumps(record, default=str)
+        print(line, flush=True)
+        if out is not None:
+            out.write(line + "\n")
+
+    emit(
+        {
+            "run": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git("rev-parse", "--short", "HEAD"),
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "python": platform.python_version(),
+            "fixture": {"rows": fixture["rows"], "build_seconds": fixture["build_seconds"]},
+            "llm_latency": args.llm_latency,
+            "plugin_latency": args.plugin_latency,
+            "foundry_latency": args.foundry_latency,
+            "scheduler": None if args.no_scheduler else {"rpm": args.rpm, "tpm": args.tpm},
+            "seed": args.seed,
+        }
+    )
+    records: List[Dict[str, Any]] = []
+    try:
+        for name in args.scenario:
+            for record in await SCENARIOS[name](controller, workload, args):
+                records.append(record)
+                emit(record)
+    finally:
+        if out is not None:
+            out.close()
+        shutdown_executors()
+        dispose_engines()
+
+    if not args.compare:
+        return 0
+    comparison = compare(records, args.compare, args.max_regression)
+    for line in comparison:
+        print(json.dumps(line))
+    return 1 if any(line["regression"] for line in comparison) else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--warehouse", default=DEFAULT_PATH, help="SQLite fixture file (built on first use)")
+    parser.add_argument("--orders", type=int, default=2_000_000, help="Rows in the fixture's orders table")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per latency run / throughput level")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--large-rows", type=int, default=500_000)
+    parser.add_argument("--llm-latency", default="lognormal:400:0.3", help="Default plugin latency spec (ms)")
+    parser.add_argument(
+        "--plugin-latency", nargs="*", default=[], metavar="PLUGIN=SPEC", help="Per-plugin latency specs"
+    )
+    parser.add_argument("--foundry-latency", default="lognormal:150:0.3")
+    parser.add_argument("--rpm", type=float, help="LLM scheduler request quota per minute")
+    parser.add_argument("--tpm", type=float, help="LLM scheduler token quota per minute")
+    parser.add_argument("--no-scheduler", action="store_true", help="Call the stub LLM without the LLMScheduler")
+    parser.add_argument("--workers", type=int, default=8, help="DB connections / thread-pool workers")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Also append the JSON lines to this file")
+    parser.add_argument("--compare", help="Earlier output (JSON lines) to compare against")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="Percent change counted as a regression")
+    parser.add_argument("--log-level", default="WARNING")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,112 @@
+# benchmarks/bench_schema_index.py
+"""
+Build time and query latency of SchemaIndex on a synthetic catalog.
+
+    python -m benchmarks.bench_schema_index                   # 10k tables
+    python -m benchmarks.bench_schema_index --tables 1000 10000 50000
+
+Each table has --columns columns drawn from a business vocabulary and one or two
+foreign keys to earlier tables. Prints one JSON object per catalog size.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from src.text_to_sql_agents.magentic_orchestration.schema_index import SchemaIndex, render_schema
+
+
+DOMAINS = [
+    "customer", "order", "invoice", "payment", "product", "inventory", "shipment", "supplier",
+    "employee", "department", "campaign", "lead", "ticket", "contract", "store", "region",
+    "warehouse", "refund", "subscription", "account", "budget", "forecast", "asset", "vendor",
+]
+QUALIFIERS = ["daily", "monthly", "history", "stage", "archive", "summary", "detail", "audit", "snapshot", "fact"]
+ATTRIBUTES = [
+    "amount", "status", "created_at", "updated_at", "name", "description", "quantity", "price",
+    "currency", "country", "city", "email", "phone", "score", "category", "discount", "tax",
+    "total", "balance", "priority", "channel", "code", "owner", "start_date", "end_date",
+]
+QUESTIONS = [
+    "total refund amount per customer last month",
+    "top 10 products by inventory quantity in each warehouse",
+    "monthly invoice totals by currency",
+    "open tickets by priority and owner",
+    "average payment amount per region for subscriptions",
+    "suppliers with late shipments",
+    "budget versus forecast by department",
+    "campaign leads converted to accounts",
+]
+
+
+def synthetic_snapshot(n_tables: int, n_columns: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    tables = {}
+    names = []
+    for i in range(n_tables):
+        domain = rng.choice(DOMAINS)
+        name = f"{domain}_{rng.choice(QUALIFIERS)}_{i}"
+        full = f"dbo.{name}"
+        columns = [{"name": "id", "type": "INTEGER", "nullable": False, "comment": None}]
+        columns += [
+            {"name": f"{attr}", "type": "VARCHAR", "nullable": True, "comment": None}
+            for attr in rng.sample(ATTRIBUTES, min(n_columns - 1, len(ATTRIBUTES)))
+        ]
+        fks = []
+        for ref in rng.sample(names, min(len(names), rng.randint(1, 2))):
+            col = f"{ref.split('.', 1)[1].split('_', 1)[0]}_id"
+            columns.append({"name": col, "type": "INTEGER", "nullable": True, "comment": None})
+            fks.append({"columns": [col], "referred_table": ref, "referred_columns": ["id"]})
+        tables[full] = {
+            "schema": "dbo",
+            "name": name,
+            "comment": f"{domain} records ({rng.choice(QUALIFIERS)})",
+            "columns": columns,
+            "primary_key": ["id"],
+            "foreign_keys": fks,
+        }
+        names.append(full)
+    return {"tables": tables}
+
+
+def run(n_tables: int, n_columns: int, queries: int) -> dict:
+    snapshot = synthetic_snapshot(n_tables, n_columns)
+    start = time.perf_counter()
+    index = SchemaIndex(snapshot)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    selected = []
+    for i in range(queries):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        start = time.perf_counter()
+        names = index.select(question, k=8, hops=1, max_tables=20)
+        latencies.append((time.perf_counter() - start) * 1000)
+        selected.append(len(names))
+    latencies.sort()
+
+    full_chars = len(render_schema(snapshot))
+    pruned_chars = len(render_schema(index.subset(index.select(QUESTIONS[0]))))
+    return {
+        "tables": n_tables,
+        "terms": len(index.vocabulary),
+        "postings": int(len(index.postings)),
+        "build_ms": round(build_ms, 1),
+        "query_p50_ms": round(statistics.median(latencies), 3),
+        "query_p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+        "tables_selected_avg": round(statistics.mean(selected), 1),
+        "prompt_chars_full": full_chars,
+        "prompt_chars_pruned": pruned_chars,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--columns", type=int, default=15)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+    for n in args.tables:
+        print(json.dumps(run(n, args.columns, args.queries)))
@@ -0,0 +1,134 @@
+# benchmarks/fake_chat_server.py
+"""
+Local stand-in for an (Azure) OpenAI chat-completions endpoint, with tunable latency
+and quota-style throttling, for exercising LLMScheduler without a real deployment.
+
+    python -m benchmarks.fake_chat_server --port 8099 --latency-ms 300 --rpm 60 --tpm 20000
+    python -m benchmarks.fake_chat_server --throttle-rate 0.1 --retry-after 2
+
+Serves POST /v1/chat/completions and /openai/deployments/{name}/chat/completions.
+Over the RPM/TPM quota (sliding --window-seconds), or at random with --throttle-rate,
+it answers 429 with Retry-After / retry-after-ms headers like Azure OpenAI does.
+GET /stats returns request, throttle and peak-concurrency counters.
+The app can also be used in-process: httpx.AsyncClient(transport=httpx.ASGITransport(create_app(...))).
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def create_app(
+    latency_ms: float = 200,
+    jitter_ms: float = 50,
+    rpm: Optional[int] = None,
+    tpm: Optional[int] = None,
+    window_seconds: float = 60.0,
+    throttle_rate: float = 0.0,
+    retry_after: float = 1.0,
+    completion_tokens: int = 50,
+    seed: int = 7,
+) -> FastAPI:
+    app = FastAPI(title="fake chat completions")
+    rng = random.Random(seed)
+    window: Deque[Tuple[float, int]] = deque()  # (accepted at, tokens)
+    stats: Dict[str, Any] = {"requests": 0, "completed": 0, "throttled": 0, "in_flight": 0, "peak_in_flight": 0}
+    app.state.stats = stats
+
+    def _throttle(seconds: float, reason: str) -> JSONResponse:
+        stats["throttled"] += 1
+        seconds = max(seconds, 0.001)
+        return JSONResponse(
+            status_code=429,
+            content={"error": {"code": "429", "message": f"Rate limit exceeded ({reason})."}},
+            headers={"retry-after": str(math.ceil(seconds)), "retry-after-ms": str(int(seconds * 1000))},
+        )
+
+    async def _complete(request: Request):
+        stats["requests"] += 1
+        body = await request.json()
+        prompt = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+        completion = int(body.get("max_tokens") or completion_tokens)
+        tokens = prompt + completion
+
+        now = time.monotonic()
+        while window and window[0][0] <= now - window_seconds:
+            window.popleft()
+        # time until enough of the window has expired to admit this request
+        if rpm is not None and len(window) >= rpm:
+            return _throttle(window[len(window) - rpm][0] + window_seconds - now, "requests")
+        if tpm is not None and sum(t for _, t in window) + tokens > tpm:
+            used, i = sum(t for _, t in window) + tokens, 0
+            while i < len(window) and used > tpm:
+                used -= window[i][1]
+                i += 1
+            return _throttle(window[i - 1][0] + window_seconds - now if i else retry_after, "tokens")
+        if throttle_rate and rng.random() < throttle_rate:
+            return _throttle(retry_after, "injected")
+        window.append((now, tokens))
+
+        stats["in_flight"] += 1
+        stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+        try:
+            await asyncio.sleep(max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000.0)
+        finally:
+            stats["in_flight"] -= 1
+        stats["completed"] += 1
+        return {
+            "id": f"chatcmpl-{stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [
+                {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "SELECT 1"}}
+            ],
+            "usage": {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": tokens},
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        return await _complete(request)
+
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def azure_chat_completions(deployment: str, request: Request):
+        return await _complete(request)
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--rpm", type=int, default=None)
+    parser.add_argument("--tpm", type=int, default=None)
+    parser.add_argument("--window-seconds", type=float, default=60.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            rpm=args.rpm,
+            tpm=args.tpm,
+            window_seconds=args.window_seconds,
+            throttle_rate=args.throttle_rate,
+            retry_after=args.retry_after,
+        ),
+        port=args.port,
+    )
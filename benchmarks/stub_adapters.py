@@ -0,0 +1,191 @@
+# benchmarks/stub_adapters.py
+"""
+Deterministic stand-ins for the Azure side of the pipeline, for offline benchmarks:
+
+- StubKernelAdapter: a SemanticKernelAdapter whose plugin calls sleep for a sampled
+  latency and answer from a fixed question -> SQL mapping (no Semantic Kernel, no model)
+- StubFoundryAdapter: an AzureFoundryAdapter over a fake FoundryAgentService
+  (guardrail verdicts, agent calls and Power BI uploads with their own latency)
+
+Only the service behind each adapter is replaced: the adapters' own code (scheduler,
+deadlines, spans, metrics) runs as in production. Latencies are drawn from seeded
+generators, so a run with the same arguments issues the same calls with the same delays.
+
+Latency specs (milliseconds):  fixed:200   uniform:100:400   normal:300:50   lognormal:250:0.5
+(lognormal takes the median and sigma; normal is clipped at 0).
+"""
+
+import asyncio
+import json
+import math
+import random
+from typing import Any, Callable, Dict, Optional
+
+from src.text_to_sql_agents.magentic_orchestration.adapters.azure_foundry_adapter import AzureFoundryAdapter
+from src.text_to_sql_agents.magentic_orchestration.adapters.semantic_kernel_adapter import SemanticKernelAdapter
+from src.text_to_sql_agents.magentic_orchestration.llm_scheduler import LLMScheduler
+
+
+class LatencyModel:
+    """Seeded latency distribution; sample() returns seconds."""
+
+    KINDS = ("fixed", "uniform", "normal", "lognormal")
+
+    def __init__(self, kind: str = "fixed", a: float = 0.0, b: float = 0.0, seed: int = 7):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution '{kind}' (expected one of {', '.join(self.KINDS)})")
+        self.kind = kind
+        self.a = a
+        self.b = b
+        self._rng = random.Random(seed)
+
+    @classmethod
+    def parse(cls, spec: str, seed: int = 7) -> "LatencyModel":
+        kind, _, params = spec.partition(":")
+        try:
+            values = [float(v) for v in params.split(":")] if params else []
+        except ValueError:
+            raise ValueError(f"Invalid latency spec '{spec}'")
+        if kind == "fixed" and len(values) == 1:
+            return cls(kind, values[0], seed=seed)
+        if kind in ("uniform", "normal", "lognormal") and len(values) == 2:
+            return cls(kind, values[0], values[1], seed=seed)
+        raise ValueError(f"Invalid latency spec '{spec}' (e.g. fixed:200, uniform:100:400, lognormal:250:0.5)")
+
+    def sample_ms(self) -> float:
+        if self.kind == "fixed":
+            return self.a
+        if self.kind == "uniform":
+            return self._rng.uniform(self.a, self.b)
+        if self.kind == "normal":
+            return max(0.0, self._rng.gauss(self.a, self.b))
+        return self.a * math.exp(self._rng.gauss(0.0, self.b))
+
+    def sample(self) -> float:
+        return self.sample_ms() / 1000.0
+
+    def describe(self) -> str:
+        if self.kind == "fixed":
+            return f"fixed:{self.a:g}"
+        return f"{self.kind}:{self.a:g}:{self.b:g}"
+
+
+def latency_models(default: str, overrides: Optional[Dict[str, str]] = None, seed: int = 7) -> Dict[str, LatencyModel]:
+    """Per-plugin models: `default` under "*", plus overrides such as {"generate_sql": "lognormal:900:0.4"}."""
+    models = {"*": LatencyModel.parse(default, seed=seed)}
+    for offset, (name, spec) in enumerate(sorted((overrides or {}).items()), start=1):
+        models[name] = LatencyModel.parse(spec, seed=seed + offset)
+    return models
+
+
+def _row_count(data: Any) -> int:
+    if isinstance(data, dict):
+        return int(data.get("row_count") or 0) if "row_count" in data else _row_count(data.get("rows"))
+    try:
+        return len(data)
+    except TypeError:
+        return 0
+
+
+class StubPluginRegistry:
+    """
+    Answers the plugin calls the AgentRegistry makes (generate_sql, generate_sql_batch,
+    repair_sql, summarize, recommend_chart) after the plugin's sampled latency.
+    Unknown plugins raise KeyError, like the real registry.
+    """
+
+    def __init__(self, answer_sql: Callable[[str], str], latency: Dict[str, LatencyModel]):
+        self.answer_sql = answer_sql
+        self.latency = latency
+        self.calls: Dict[str, int] = {}
+        self._handlers = {
+            "generate_sql": lambda kw: self.answer_sql(kw.get("query") or ""),
+            "generate_sql_batch": self._generate_batch,
+            "repair_sql": lambda kw: kw.get("previous_sql"),
+            "summarize": lambda kw: f"{_row_count(kw.get('data'))} rows answer '{kw.get('query')}'.",
+            "recommend_chart": self._recommend_chart,
+        }
+
+    async def invoke(self, name: str, **kwargs) -> Any:
+        handler = self._handlers.get(name)
+        if handler is None:
+            raise KeyError(f"Plugin '{name}' is not registered.")
+        self.calls[name] = self.calls.get(name, 0) + 1
+        await asyncio.sleep((self.latency.get(name) or self.latency["*"]).sample())
+        return handler(kwargs)
+
+    def _generate_batch(self, kwargs: Dict[str, Any]) -> str:
+        items = json.loads(kwargs.get("items") or "[]")
+        return json.dumps([{"id": item["id"], "sql": self.answer_sql(item["question"])} for item in items])
+
+    @staticmethod
+    def _recommend_chart(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        data = kwargs.get("data")
+        rows = data.get("rows") if isinstance(data, dict) else data
+        columns = list(getattr(rows, "columns", None) or [])
+        numeric = [c for c in columns if rows.is_numeric(c)] if columns else []
+        return {
+            "chart": "bar",
+            "x": columns[0] if columns else None,
+            "y": numeric[-1] if numeric else None,
+        }
+
+
+class StubKernelAdapter(SemanticKernelAdapter):
+    """SemanticKernelAdapter over a StubPluginRegistry (optionally behind an LLMScheduler)."""
+
+    def __init__(
+        self,
+        answer_sql: Callable[[str], str],
+        latency: Optional[Dict[str, LatencyModel]] = None,
+        scheduler: Optional[LLMScheduler] = None,
+    ):
+        super().__init__(kernel=object(), scheduler=scheduler)
+        self._registry = StubPluginRegistry(answer_sql, latency or latency_models("fixed:0"))
+
+    def _ensure(self):
+        # the stub registry is already in place; never build a real kernel
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"calls": dict(self._registry.calls)}
+
+
+class _StubFoundryKernel:
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+
+    async def invoke_function(self, plugin: str, function: str, sql: str) -> str:
+        await asyncio.sleep(self.latency.sample())
+        return "allow"
+
+
+class StubFoundryService:
+    """The parts of FoundryAgentService the adapter uses, with sampled latency."""
+
+    def __init__(self, latency: Optional[LatencyModel] = None):
+        self.latency = latency or LatencyModel("fixed", 0)
+        self.kernel = _StubFoundryKernel(self.latency)
+        self.uploads = 0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def invoke_agent(self, prompt: str, context: Optional[dict] = None) -> Dict[str, Any]:
+        await asyncio.sleep(self.latency.sample())
+        return {"answer": f"stub answer to: {prompt[:80]}"}
+
+    async def upload_powerbi_report(self, pbix_bytes: Any, user_id: Optional[str] = None) -> str:
+        await asyncio.sleep(self.latency.sample())
+        self.uploads += 1
+        return f"https://app.powerbi.example/reports/bench-{self.uploads}"
+
+
+class StubFoundryAdapter(AzureFoundryAdapter):
+    """AzureFoundryAdapter wired to a StubFoundryService."""
+
+    def __init__(self, latency: Optional[LatencyModel] = None):
+        super().__init__(service=StubFoundryService(latency))
@@ -0,0 +1,208 @@
+# benchmarks/warehouse_fixture.py
+"""
+Generated SQLite "warehouse" for offline pipeline benchmarks: a small star schema
+(regions, customers, products, orders) with a configurable number of order rows.
+
+    python -m benchmarks.warehouse_fixture --orders 2000000 --path .cache/bench_warehouse.sqlite
+
+Data is a pure function of the row counts (no randomness), so every run and every
+commit measures the same database. An existing file with the same counts is reused.
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import sqlalchemy
+
+
+FIXTURE_VERSION = 1
+DEFAULT_PATH = ".cache/bench_warehouse.sqlite"
+
+REGIONS = ["North", "South", "East", "West", "Central", "Nordics", "Iberia", "Benelux", "Alps", "Baltics"]
+CATEGORIES = ["Bikes", "Components", "Clothing", "Accessories", "Tools", "Outdoor", "Electronics", "Books"]
+
+_DDL = [
+    "CREATE TABLE regions (region_id INTEGER PRIMARY KEY, name TEXT NOT NULL)",
+    "CREATE TABLE customers (customer_id INTEGER PRIMARY KEY, name TEXT NOT NULL, segment TEXT NOT NULL, "
+    "region_id INTEGER NOT NULL REFERENCES regions(region_id))",
+    "CREATE TABLE products (product_id INTEGER PRIMARY KEY, name TEXT NOT NULL, category TEXT NOT NULL, "
+    "unit_price REAL NOT NULL)",
+    "CREATE TABLE orders (order_id INTEGER PRIMARY KEY, customer_id INTEGER NOT NULL REFERENCES customers(customer_id), "
+    "product_id INTEGER NOT NULL REFERENCES products(product_id), order_date TEXT NOT NULL, "
+    "quantity INTEGER NOT NULL, amount REAL NOT NULL)",
+    "CREATE TABLE fixture_info (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+]
+
+_INDEXES = [
+    "CREATE INDEX ix_orders_customer ON orders(customer_id)",
+    "CREATE INDEX ix_orders_date ON orders(order_date)",
+    "CREATE INDEX ix_customers_region ON customers(region_id)",
+]
+
+# row i -> deterministic values; the recursive CTE keeps generation inside SQLite
+_SERIES = "WITH RECURSIVE r(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM r WHERE i < :n) "
+
+
+def _counts(orders: int) -> Dict[str, int]:
+    return {
+        "regions": len(REGIONS),
+        "customers": max(100, orders // 20),
+        "products": max(50, min(5_000, orders // 500)),
+        "orders": orders,
+    }
+
+
+def _load(conn: sqlalchemy.engine.Connection, counts: Dict[str, int]):
+    text = sqlalchemy.text
+    conn.execute(
+        text("INSERT INTO regions VALUES " + ", ".join(f"({i + 1}, '{name}')" for i, name in enumerate(REGIONS)))
+    )
+    conn.execute(
+        text(
+            _SERIES + "INSERT INTO customers SELECT i, 'Customer ' || i, "
+            "CASE i % 3 WHEN 0 THEN 'Enterprise' WHEN 1 THEN 'SMB' ELSE 'Consumer' END, "
+            "1 + (i * 7) % :regions FROM r"
+        ),
+        {"n": counts["customers"], "regions": counts["regions"]},
+    )
+    conn.execute(
+        text(
+            _SERIES + "INSERT INTO products SELECT i, 'Product ' || i, "
+            + "CASE i % :cats "
+            + " ".join(f"WHEN {k} THEN '{name}'" for k, name in enumerate(CATEGORIES))
+            + " END, 5 + (i * 37) % 995 FROM r"
+        ),
+        {"n": counts["products"], "cats": len(CATEGORIES)},
+    )
+    conn.execute(
+        text(
+            _SERIES + "INSERT INTO orders SELECT i, 1 + (i * 7919) % :customers, 1 + (i * 104729) % :products, "
+            "date('2021-01-01', '+' || ((i * 31) % 1461) || ' days'), 1 + i % 9, "
+            "round((1 + i % 9) * (5 + ((1 + (i * 104729) % :products) * 37) % 995) * (0.8 + (i % 5) / 10.0), 2) "
+            "FROM r"
+        ),
+        {"n": counts["orders"], "customers": counts["customers"], "products": counts["products"]},
+    )
+
+
+def _existing_counts(path: Path) -> Dict[str, Any]:
+    engine = sqlalchemy.create_engine(f"sqlite:///{path}")
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(sqlalchemy.text("SELECT key, value FROM fixture_info")).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+    except sqlalchemy.exc.SQLAlchemyError:
+        return {}
+    finally:
+        engine.dispose()
+
+
+def build_warehouse(path: str = DEFAULT_PATH, orders: int = 2_000_000, rebuild: bool = False) -> Dict[str, Any]:
+    """
+    Create (or reuse) the fixture at `path`. Returns its description: path, SQLAlchemy URL,
+    row counts and the seconds spent building it (0 when an existing file was reused).
+    """
+    target = Path(path)
+    counts = _counts(orders)
+    info = {"path": str(target), "url": f"sqlite:///{target}", "rows": counts}
+    if target.exists() and not rebuild:
+        existing = _existing_counts(target)
+        if existing.get("version") == FIXTURE_VERSION and existing.get("rows") == counts:
+            return {**info, "build_seconds": 0.0}
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(target.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    started = time.perf_counter()
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp}")
+    try:
+        with engine.begin() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=OFF")
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+            for statement in _DDL:
+                conn.execute(sqlalchemy.text(statement))
+            _load(conn, counts)
+            for statement in _INDEXES:
+                conn.execute(sqlalchemy.text(statement))
+            conn.execute(
+                sqlalchemy.text("INSERT INTO fixture_info VALUES (:key, :value)"),
+                [{"key": "version", "value": json.dumps(FIXTURE_VERSION)}, {"key": "rows", "value": json.dumps(counts)}],
+            )
+        with engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE")
+    finally:
+        engine.dispose()
+    # built under a temporary name so an interrupted build is never mistaken for a finished one
+    tmp.replace(target)
+    return {**info, "build_seconds": round(time.perf_counter() - started, 2)}
+
+
+def questions(count: int, offset: int = 0) -> List[Tuple[str, str]]:
+    """
+    `count` distinct (question, SQL) pairs over the fixture, cycling through a few query
+    shapes (joins, grouped aggregates, top-N) with a different parameter each time.
+    Every shape is selective on an indexed column, so the database answers in milliseconds
+    and the orchestration around it stays visible in the measurements.
+    """
+    shapes = [
+        (
+            "Total revenue by region in {month}",
+            "SELECT r.name AS region, SUM(o.amount) AS revenue, COUNT(*) AS orders FROM orders o "
+            "JOIN customers c ON c.customer_id = o.customer_id JOIN regions r ON r.region_id = c.region_id "
+            "WHERE o.order_date BETWEEN '{month}-01' AND '{month}-07' GROUP BY r.name ORDER BY revenue DESC",
+        ),
+        (
+            "Top 10 products by revenue for customers {first} to {last}",
+            "SELECT p.name AS product, p.category, SUM(o.amount) AS revenue FROM orders o "
+            "JOIN products p ON p.product_id = o.product_id WHERE o.customer_id BETWEEN {first} AND {last} "
+            "GROUP BY p.name, p.category ORDER BY revenue DESC LIMIT 10",
+        ),
+        (
+            "Daily {segment} orders in the first week of {month}",
+            "SELECT o.order_date AS day, COUNT(*) AS orders, SUM(o.quantity) AS units FROM orders o "
+            "JOIN customers c ON c.customer_id = o.customer_id "
+            "WHERE c.segment = '{segment}' AND o.order_date BETWEEN '{month}-01' AND '{month}-07' "
+            "GROUP BY o.order_date ORDER BY day",
+        ),
+        (
+            "Average order value by product category for customer {customer}",
+            "SELECT p.category, AVG(o.amount) AS avg_order_value, COUNT(*) AS orders FROM orders o "
+            "JOIN products p ON p.product_id = o.product_id WHERE o.customer_id = {customer} GROUP BY p.category",
+        ),
+    ]
+    segments = ["Enterprise", "SMB", "Consumer"]
+    pairs = []
+    for i in range(offset, offset + count):
+        question, sql = shapes[i % len(shapes)]
+        n = i // len(shapes)
+        params = {
+            "month": f"{2021 + n % 4}-{1 + (n * 5) % 12:02d}",
+            "first": 1 + (n * 97) % 5_000,
+            "last": 1 + (n * 97) % 5_000 + 49,
+            "segment": segments[n % len(segments)],
+            "customer": 1 + (i * 7919) % 5_000,
+        }
+        # the question carries the request number so every request is distinct (no cache hits)
+        pairs.append((f"{question.format(**params)} #{i}", sql.format(**params)))
+    return pairs
+
+
+def large_result_question(rows: int) -> Tuple[str, str]:
+    """A question whose answer is `rows` raw order lines."""
+    return (
+        f"List the first {rows} order lines with their dates and amounts",
+        f"SELECT order_id, customer_id, product_id, order_date, quantity, amount FROM orders "
+        f"WHERE order_id <= {rows}",
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    parser.add_argument("--orders", type=int, default=2_000_000)
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate even if a matching file exists")
+    args = parser.parse_args()
+    print(json.dumps(build_warehouse(args.path, args.orders, rebuild=args.rebuild)))
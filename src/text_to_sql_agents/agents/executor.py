@@ -1,8 +1,384 @@
 from __future__ import annotations
+import hashlib
+import importlib
+import json
+import re
+import threading
 import pandas as pd
 import sqlalchemy
 from loguru import logger
-from typing import Optional
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
+
+from ..models.config_models import PoolSettings
+from ..utils.sql_lexer import table_aliases
+
+
+# Engines (and so their connection pools) are shared process-wide per connection string.
+_ENGINES: Dict[str, sqlalchemy.engine.Engine] = {}
+_ASYNC_ENGINES: Dict[str, Any] = {}
+_ENGINES_LOCK = threading.Lock()
+
+# SQLAlchemy dialect drivers that can run on an AsyncEngine
+ASYNC_DRIVERS = frozenset({"asyncpg", "psycopg_async", "aioodbc", "aiosqlite", "aiomysql", "asyncmy"})
+
+
+def _pool_kwargs(url: sqlalchemy.engine.URL, pool: PoolSettings) -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = {"pool_pre_ping": pool.pool_pre_ping, "pool_recycle": pool.pool_recycle}
+    # in-memory SQLite uses a single-connection pool that takes no sizing arguments
+    if not (url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")):
+        kwargs.update(pool_size=pool.pool_size, max_overflow=pool.max_overflow, pool_timeout=pool.pool_timeout)
+    return kwargs
+
+
+def supports_async(connection_string: str) -> bool:
+    """True when the URL names an async driver and SQLAlchemy's asyncio extension is usable."""
+    if sqlalchemy.engine.make_url(connection_string).get_driver_name() not in ASYNC_DRIVERS:
+        return False
+    try:
+        importlib.import_module("sqlalchemy.ext.asyncio")  # needs greenlet
+    except ImportError as e:
+        logger.warning(f"Async driver requested but SQLAlchemy asyncio is unavailable: {e}")
+        return False
+    return True
+
+
+def get_engine(connection_string: str, pool: Optional[PoolSettings] = None) -> sqlalchemy.engine.Engine:
+    """
+    Return the shared engine for a connection string, creating it on first use.
+    Pool settings only apply to the call that creates the engine.
+    """
+    engine = _ENGINES.get(connection_string)
+    if engine is not None:
+        return engine
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(connection_string)
+        if engine is None:
+            url = sqlalchemy.engine.make_url(connection_string)
+            kwargs = _pool_kwargs(url, pool or PoolSettings())
+            engine = sqlalchemy.create_engine(connection_string, **kwargs)
+            _ENGINES[connection_string] = engine
+            logger.info(f"Created shared SQL engine for {url.get_backend_name()} ({kwargs}).")
+        return engine
+
+
+def get_async_engine(connection_string: str, pool: Optional[PoolSettings] = None):
+    """Shared AsyncEngine per connection string (async driver URLs only)."""
+    engine = _ASYNC_ENGINES.get(connection_string)
+    if engine is not None:
+        return engine
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    with _ENGINES_LOCK:
+        engine = _ASYNC_ENGINES.get(connection_string)
+        if engine is None:
+            url = sqlalchemy.engine.make_url(connection_string)
+            kwargs = _pool_kwargs(url, pool or PoolSettings())
+            engine = create_async_engine(connection_string, **kwargs)
+            _ASYNC_ENGINES[connection_string] = engine
+            logger.info(f"Created shared async SQL engine for {url.get_backend_name()} ({kwargs}).")
+        return engine
+
+
+def dispose_engines():
+    """Close every pooled connection, e.g. on application shutdown."""
+    with _ENGINES_LOCK:
+        for engine in _ENGINES.values():
+            engine.dispose()
+        _ENGINES.clear()
+        for engine in _ASYNC_ENGINES.values():
+            # AsyncEngine.dispose() is a coroutine; the sync pool underneath can be closed directly
+            engine.sync_engine.dispose()
+        _ASYNC_ENGINES.clear()
+
+
+# One cheap catalog query per dialect returning (schema, table, version) rows. The version
+# changes whenever the table's DDL does, so only changed tables need re-introspection.
+_CATALOG_VERSION_QUERIES = {
+    "mssql": (
+        "SELECT s.name AS table_schema, t.name AS table_name, "
+        "CONVERT(varchar(33), t.modify_date, 126) AS version "
+        "FROM sys.tables t JOIN sys.schemas s ON s.schema_id = t.schema_id"
+    ),
+    # LAST_ALTERED also moves on DML; that only costs a re-introspection of the loaded table
+    "snowflake": (
+        "SELECT table_schema, table_name, TO_VARCHAR(last_altered) AS version "
+        "FROM information_schema.tables WHERE table_type = 'BASE TABLE'"
+    ),
+    "postgresql": (
+        "SELECT table_schema, table_name, "
+        "string_agg(column_name || ':' || data_type || ':' || is_nullable, ',' ORDER BY ordinal_position) AS version "
+        "FROM information_schema.columns "
+        "WHERE table_schema NOT IN ('pg_catalog', 'information_schema') "
+        "GROUP BY table_schema, table_name"
+    ),
+    "sqlite": (
+        "SELECT 'main' AS table_schema, name AS table_name, sql AS version "
+        "FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    ),
+}
+
+
+def catalog_versions(conn: sqlalchemy.engine.Connection, schemas: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """
+    {"schema.table": version} for every table, from a single catalog query where the dialect has one.
+    Other dialects fall back to listing table names with an empty version, which
+    detects added/removed tables but not altered ones.
+    """
+    wanted = {s.lower() for s in schemas} if schemas else None
+    query = _CATALOG_VERSION_QUERIES.get(conn.dialect.name)
+    versions: Dict[str, str] = {}
+    if query is not None:
+        for table_schema, table_name, version in conn.exec_driver_sql(query):
+            if wanted is None or str(table_schema).lower() in wanted:
+                digest = hashlib.sha1(str(version).encode("utf-8")).hexdigest()[:16]
+                versions[f"{table_schema}.{table_name}"] = digest
+        return versions
+
+    inspector = sqlalchemy.inspect(conn)
+    for schema in wanted or [inspector.default_schema_name]:
+        for table_name in inspector.get_table_names(schema=schema):
+            versions[f"{schema}.{table_name}"] = ""
+    return versions
+
+
+def introspect_schema(
+    conn: sqlalchemy.engine.Connection,
+    schemas: Optional[Iterable[str]] = None,
+    tables: Optional[Iterable[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Describe tables (columns, primary key, foreign keys, comments) as {"tables": {"schema.table": {...}}}.
+    With `tables`, only those "schema.table" names are introspected.
+    """
+    inspector = sqlalchemy.inspect(conn)
+    if tables is not None:
+        targets = [tuple(name.split(".", 1)) for name in tables]
+    else:
+        targets = [
+            (schema, table_name)
+            for schema in (list(schemas) if schemas else [inspector.default_schema_name])
+            for table_name in inspector.get_table_names(schema=schema)
+        ]
+
+    described: Dict[str, Any] = {}
+    for schema, table_name in targets:
+        # SQLite reports "main" as its default schema but expects schema=None for it
+        schema_arg = None if schema == inspector.default_schema_name else schema
+        try:
+            columns = inspector.get_columns(table_name, schema=schema_arg)
+        except sqlalchemy.exc.NoSuchTableError:
+            continue
+        try:
+            comment = inspector.get_table_comment(table_name, schema=schema_arg).get("text")
+        except NotImplementedError:
+            comment = None
+        described[f"{schema}.{table_name}"] = {
+            "schema": schema,
+            "name": table_name,
+            "comment": comment,
+            "columns": [
+                {
+                    "name": c["name"],
+                    "type": str(c["type"]),
+                    "nullable": bool(c.get("nullable", True)),
+                    "comment": c.get("comment"),
+                }
+                for c in columns
+            ],
+            "primary_key": inspector.get_pk_constraint(table_name, schema=schema_arg).get("constrained_columns") or [],
+            "foreign_keys": [
+                {
+                    "columns": fk["constrained_columns"],
+                    "referred_table": f"{fk.get('referred_schema') or schema}.{fk['referred_table']}",
+                    "referred_columns": fk["referred_columns"],
+                }
+                for fk in inspector.get_foreign_keys(table_name, schema=schema_arg)
+            ],
+        }
+    return {"tables": described}
+
+
+def _sqlite_cost(conn: sqlalchemy.engine.Connection, sql: str) -> Dict[str, Any]:
+    # EXPLAIN QUERY PLAN has no row estimates; a full SCAN counts the table's rows
+    # (MAX(rowid) is an index lookup), an index SEARCH is assumed to read a tenth of them
+    # the plan names a table by its alias when the query gives it one ("SCAN o")
+    aliases = table_aliases(sql)
+    scanned = 0.0
+    steps = []
+    for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"):
+        detail = str(row[-1])
+        steps.append(detail)
+        match = re.match(r"(SCAN|SEARCH) (?:TABLE )?([\w$]+)", detail)
+        if not match:
+            continue
+        table = aliases.get(match.group(2).lower(), match.group(2))
+        quoted = ".".join(f'"{part}"' for part in table.split("."))
+        try:
+            rows = conn.exec_driver_sql(f"SELECT MAX(rowid) FROM {quoted}").scalar() or 0
+        except Exception:
+            continue  # CTE, subquery or WITHOUT ROWID table
+        scanned += rows if match.group(1) == "SCAN" else rows / 10
+    return {"rows_scanned": scanned, "bytes_scanned": None, "plan_cost": None, "plan": steps}
+
+
+def _postgres_cost(conn: sqlalchemy.engine.Connection, sql: str) -> Dict[str, Any]:
+    raw = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+    scanned, width_bytes = 0.0, 0.0
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if "Relation Name" in node:
+            scanned += node.get("Plan Rows", 0)
+            width_bytes += node.get("Plan Rows", 0) * node.get("Plan Width", 0)
+        stack.extend(node.get("Plans", []))
+    return {"rows_scanned": scanned, "bytes_scanned": width_bytes, "plan_cost": plan.get("Total Cost"), "plan": None}
+
+
+def _mssql_cost(conn: sqlalchemy.engine.Connection, sql: str) -> Dict[str, Any]:
+    conn.exec_driver_sql("SET SHOWPLAN_XML ON")
+    try:
+        xml = str(conn.exec_driver_sql(sql).scalar())
+    finally:
+        conn.exec_driver_sql("SET SHOWPLAN_XML OFF")
+    cost = re.search(r'StatementSubTreeCost="([^"]+)"', xml)
+    # rows read by every scan/seek operator in the plan
+    read = [float(v) for v in re.findall(r'EstimatedRowsRead="([^"]+)"', xml)] or [
+        float(v) for v in re.findall(r'TableCardinality="([^"]+)"', xml)
+    ]
+    return {
+        "rows_scanned": sum(read),
+        "bytes_scanned": None,
+        "plan_cost": float(cost.group(1)) if cost else None,
+        "plan": None,
+    }
+
+
+def _snowflake_cost(conn: sqlalchemy.engine.Connection, sql: str) -> Dict[str, Any]:
+    raw = conn.exec_driver_sql(f"EXPLAIN USING JSON {sql}").scalar()
+    stats = json.loads(raw).get("GlobalStats", {})
+    return {
+        "rows_scanned": None,
+        "bytes_scanned": stats.get("bytesAssigned"),
+        "plan_cost": stats.get("partitionsAssigned"),
+        "plan": None,
+    }
+
+
+def _bigquery_cost(conn: sqlalchemy.engine.Connection, sql: str) -> Dict[str, Any]:
+    # dry run through the DB-API connection's client: free, and exact for on-demand billing
+    from google.cloud import bigquery
+
+    client = getattr(conn.connection.dbapi_connection, "_client", None)
+    if client is None:
+        raise NotImplementedError("BigQuery DB-API connection exposes no client for dry runs.")
+    job = client.query(sql, job_config=bigquery.QueryJobConfig(dry_run=True, use_query_cache=False))
+    return {"rows_scanned": None, "bytes_scanned": job.total_bytes_processed, "plan_cost": None, "plan": None}
+
+
+_COST_ESTIMATORS: Dict[str, Callable[[sqlalchemy.engine.Connection, str], Dict[str, Any]]] = {
+    "sqlite": _sqlite_cost,
+    "postgresql": _postgres_cost,
+    "mssql": _mssql_cost,
+    "snowflake": _snowflake_cost,
+    "bigquery": _bigquery_cost,
+}
+
+
+def estimate_cost(conn: sqlalchemy.engine.Connection, sql: str) -> Optional[Dict[str, Any]]:
+    """
+    Planner estimate for a statement without running it: {"rows_scanned", "bytes_scanned",
+    "plan_cost", "plan", "source"}. Fields the provider does not report are None;
+    None overall when the dialect has no estimator.
+    """
+    estimator = _COST_ESTIMATORS.get(conn.dialect.name)
+    if estimator is None:
+        return None
+    estimate = estimator(conn, sql.strip().rstrip(";"))
+    estimate["source"] = conn.dialect.name
+    return estimate
+
+
+def _cancel_driver_statement(dbapi_conn: Any, cursor: Any) -> bool:
+    """
+    Ask the driver to abort the statement running on `dbapi_conn` / `cursor`, from another thread.
+    Cursor-level cancels first (pyodbc, Snowflake, BigQuery), then connection-level ones
+    (psycopg2 / psycopg cancel(), sqlite3 interrupt()). False when the driver offers neither.
+    """
+    if cursor is not None:
+        query_id = getattr(cursor, "sfqid", None)
+        if query_id and hasattr(cursor, "abort_query"):  # snowflake-connector-python
+            cursor.abort_query(query_id)
+            return True
+        job = getattr(cursor, "_query_job", None)
+        if job is not None and hasattr(job, "cancel"):  # google-cloud-bigquery DB-API
+            job.cancel()
+            return True
+        if callable(getattr(cursor, "cancel", None)):  # pyodbc (SQL Server)
+            cursor.cancel()
+            return True
+    for method in ("cancel", "interrupt"):
+        if callable(getattr(dbapi_conn, method, None)):
+            getattr(dbapi_conn, method)()
+            return True
+    return False
+
+
+class StatementCanceller:
+    """
+    Lets the event loop cancel a statement that a worker thread is blocked on:
+    - the thread attaches its connection; the cursor is captured as the statement starts
+    - cancel() (from any thread) issues the driver-level cancel and marks the handle;
+      a statement attached after cancel() is refused before it starts
+    - a cancelled connection is invalidated instead of going back to the pool
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlalchemy.engine.Connection] = None
+        self._dbapi_conn: Any = None
+        self._cursor: Any = None
+        self.cancelled = False
+
+    def attach(self, conn: sqlalchemy.engine.Connection):
+        with self._lock:
+            if self.cancelled:
+                raise RuntimeError("Statement cancelled before it started")
+            self._conn = conn
+            self._dbapi_conn = conn.connection.dbapi_connection
+        sqlalchemy.event.listen(conn, "before_cursor_execute", self._capture_cursor)
+
+    def _capture_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self._cursor = cursor
+
+    def detach(self):
+        with self._lock:
+            conn, self._conn, self._dbapi_conn, self._cursor = self._conn, None, None, None
+        if conn is None:
+            return
+        sqlalchemy.event.remove(conn, "before_cursor_execute", self._capture_cursor)
+        if self.cancelled:
+            # the driver may leave the session mid-statement; do not hand it to the next caller
+            conn.invalidate()
+
+    def cancel(self) -> bool:
+        """Cancel the running statement; True when a driver-level cancel was sent."""
+        with self._lock:
+            self.cancelled = True
+            dbapi_conn, cursor = self._dbapi_conn, self._cursor
+        if dbapi_conn is None:
+            return False
+        try:
+            sent = _cancel_driver_statement(dbapi_conn, cursor)
+        except Exception as e:
+            logger.warning(f"Driver-level statement cancel failed: {e}")
+            return False
+        if sent:
+            logger.info("Sent driver-level cancel for the running statement.")
+        else:
+            logger.warning("Driver has no statement cancel; the statement runs to completion.")
+        return sent
 
 
 class SQLExecutor:
@@ -11,23 +387,94 @@ class SQLExecutor:
     Supports Azure SQL (default) and other backends (Snowflake, BigQuery).
     """
 
-    def __init__(self, connection_string: str):
+    def __init__(self, connection_string: str, pool: Optional[PoolSettings] = None):
         self.connection_string = connection_string
-        self.engine = sqlalchemy.create_engine(self.connection_string)
+        self.engine = get_engine(self.connection_string, pool)
 
-    def execute_query(self, sql: str) -> pd.DataFrame:
+    def execute_query(self, sql: str, canceller: Optional[StatementCanceller] = None) -> pd.DataFrame:
         """
         Execute a SQL query safely and return a pandas DataFrame.
+        With a canceller, another thread can abort the statement while it runs.
         """
         logger.info(f"Executing SQL query:\n{sql}")
         try:
-            df = pd.read_sql(sql, self.engine)
+            if canceller is None:
+                df = pd.read_sql(sql, self.engine)
+            else:
+                with self.engine.connect() as conn:
+                    canceller.attach(conn)
+                    try:
+                        df = pd.read_sql(sql, conn)
+                    finally:
+                        canceller.detach()
             logger.success(f"Query executed successfully. Rows: {len(df)}")
             return df
         except Exception as e:
             logger.error(f"SQL execution error: {e}")
             raise
 
+    def iter_batches(
+        self,
+        sql: str,
+        chunk_size: int = 10_000,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+        canceller: Optional[StatementCanceller] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Execute a SQL query on a server-side cursor and yield it in DataFrame chunks.
+        Stops fetching (and closes the cursor) once max_rows or max_bytes is reached,
+        or as soon as should_stop() returns True; the last chunk is cut to fit max_rows.
+        A canceller can abort a fetch that is blocked in the driver.
+        """
+        logger.info(f"Streaming SQL query (chunk_size={chunk_size}):\n{sql}")
+        rows = 0
+        size = 0
+        with self.engine.connect() as conn:
+            conn = conn.execution_options(stream_results=True, max_row_buffer=chunk_size)
+            if canceller is not None:
+                canceller.attach(conn)
+            chunks = None
+            try:
+                chunks = pd.read_sql(sql, conn, chunksize=chunk_size)
+                for chunk in chunks:
+                    if should_stop is not None and should_stop():
+                        logger.info("Streaming query stopped by caller.")
+                        return
+                    if max_rows is not None and rows + len(chunk) > max_rows:
+                        chunk = chunk.iloc[: max_rows - rows]
+                    rows += len(chunk)
+                    size += int(chunk.memory_usage(index=False, deep=True).sum())
+                    yield chunk
+                    if (max_rows is not None and rows >= max_rows) or (max_bytes is not None and size >= max_bytes):
+                        logger.warning(f"Streaming query hit its budget after {rows} rows / {size} bytes; cancelling.")
+                        return
+            finally:
+                # closing the generator closes the underlying cursor early
+                if chunks is not None:
+                    chunks.close()
+                if canceller is not None:
+                    canceller.detach()
+        logger.success(f"Streaming query finished. Rows: {rows}")
+
+    def generate_schema_snapshot(
+        self, schemas: Optional[List[str]] = None, tables: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Introspect the catalog (or only the given "schema.table" names)."""
+        with self.engine.connect() as conn:
+            return introspect_schema(conn, schemas=schemas, tables=tables)
+
+    def catalog_fingerprint(self, schemas: Optional[List[str]] = None) -> Dict[str, str]:
+        """Cheap per-table version tokens used to decide what to re-introspect."""
+        with self.engine.connect() as conn:
+            return catalog_versions(conn, schemas=schemas)
+
+    def estimate_cost(self, sql: str) -> Optional[Dict[str, Any]]:
+        """EXPLAIN / dry-run estimate for the statement (see estimate_cost())."""
+        with self.engine.connect() as conn:
+            return estimate_cost(conn, sql)
+
     def test_connection(self) -> bool:
         """
         Verify connection to database.
@@ -40,3 +487,74 @@ class SQLExecutor:
         except Exception as e:
             logger.error(f"Database connection failed: {e}")
             return False
+
+
+class AsyncSQLExecutor:
+    """
+    Native asyncio counterpart of SQLExecutor for async drivers (asyncpg, aioodbc, aiosqlite).
+    Rows are streamed from the driver on the event loop, with no thread hand-off.
+    """
+
+    def __init__(self, connection_string: str, pool: Optional[PoolSettings] = None):
+        self.connection_string = connection_string
+        self.engine = get_async_engine(connection_string, pool)
+
+    @staticmethod
+    def _statement(sql: str):
+        # escape ":" so text() does not treat ":name" / "::type" as bind parameters
+        return sqlalchemy.text(sql.replace(":", "\\:"))
+
+    async def execute_query(self, sql: str) -> pd.DataFrame:
+        logger.info(f"Executing SQL query (async):\n{sql}")
+        try:
+            async with self.engine.connect() as conn:
+                result = await conn.execute(self._statement(sql))
+                df = pd.DataFrame.from_records(result.fetchall(), columns=list(result.keys()))
+            logger.success(f"Query executed successfully. Rows: {len(df)}")
+            return df
+        except Exception as e:
+            logger.error(f"SQL execution error: {e}")
+            raise
+
+    async def iter_batches(
+        self,
+        sql: str,
+        chunk_size: int = 10_000,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> AsyncIterator[pd.DataFrame]:
+        """Async version of SQLExecutor.iter_batches: same chunking and budget rules."""
+        logger.info(f"Streaming SQL query (async, chunk_size={chunk_size}):\n{sql}")
+        rows = 0
+        size = 0
+        async with self.engine.connect() as conn:
+            result = await conn.stream(self._statement(sql))
+            columns = list(result.keys())
+            try:
+                async for partition in result.partitions(chunk_size):
+                    if max_rows is not None and rows + len(partition) > max_rows:
+                        partition = partition[: max_rows - rows]
+                    chunk = pd.DataFrame.from_records(partition, columns=columns)
+                    rows += len(chunk)
+                    size += int(chunk.memory_usage(index=False, deep=True).sum())
+                    yield chunk
+                    if (max_rows is not None and rows >= max_rows) or (max_bytes is not None and size >= max_bytes):
+                        logger.warning(f"Streaming query hit its budget after {rows} rows / {size} bytes; cancelling.")
+                        return
+            finally:
+                await result.close()
+        logger.success(f"Streaming query finished. Rows: {rows}")
+
+    async def generate_schema_snapshot(
+        self, schemas: Optional[List[str]] = None, tables: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        async with self.engine.connect() as conn:
+            return await conn.run_sync(lambda sync_conn: introspect_schema(sync_conn, schemas=schemas, tables=tables))
+
+    async def catalog_fingerprint(self, schemas: Optional[List[str]] = None) -> Dict[str, str]:
+        async with self.engine.connect() as conn:
+            return await conn.run_sync(lambda sync_conn: catalog_versions(sync_conn, schemas=schemas))
+
+    async def estimate_cost(self, sql: str) -> Optional[Dict[str, Any]]:
+        async with self.engine.connect() as conn:
+            return await conn.run_sync(lambda sync_conn: estimate_cost(sync_conn, sql))
@@ -1,13 +1,19 @@
-import re
+from typing import Optional
+
 from loguru import logger
 
+from ..utils.sql_guard import GuardrailEngine
+
 
 class GuardrailAgent:
     """
     Agent that ensures the generated SQL is safe to execute.
+    Uses the local single-pass guardrail engine (comment/literal aware, rejects stacked
+    statements); statements it cannot decide are treated as unsafe.
     """
 
-    def __init__(self):
+    def __init__(self, engine: Optional[GuardrailEngine] = None):
+        self.engine = engine or GuardrailEngine(remote_check="never")
         logger.info("GuardrailAgent initialized.")
 
     async def check_safety(self, sql_text: str) -> bool:
@@ -16,19 +22,4 @@ class GuardrailAgent:
         """
 
         logger.debug("Running SQL safety check...")
-
-        forbidden_patterns = [
-            r"\bDROP\b",
-            r"\bDELETE\b",
-            r"\bUPDATE\b",
-            r"\bINSERT\b",
-            r"\bALTER\b",
-            r"\bTRUNCATE\b",
-        ]
-
-        for pattern in forbidden_patterns:
-            if re.search(pattern, sql_text, re.IGNORECASE):
-                logger.warning(f"Unsafe SQL pattern detected: {pattern}")
-                return False
-
-        return True
+        return await self.engine.check(sql_text)
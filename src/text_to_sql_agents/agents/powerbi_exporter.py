@@ -2,9 +2,11 @@ from __future__ import annotations
 import io
 import pandas as pd
 from loguru import logger
-from typing import Optional
+from typing import Optional, Union
 import json
 
+from ..models.result_set import ColumnarResult
+
 
 class PowerBIExporter:
     """
@@ -14,7 +16,7 @@ class PowerBIExporter:
     def __init__(self):
         pass
 
-    def export_to_pbix(self, data: pd.DataFrame, dataset_name: str) -> bytes:
+    def export_to_pbix(self, data: Union[pd.DataFrame, ColumnarResult], dataset_name: str) -> bytes:
         """
         Mock PBIX export for demo purposes.
         In production, you’d call Power BI REST APIs with MSAL authentication.
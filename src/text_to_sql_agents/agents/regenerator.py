@@ -1,16 +1,22 @@
 from __future__ import annotations
+from typing import Optional
+
 from loguru import logger
 from ..service.plugin_registry import PluginRegistry
+from ..utils.sql_validator import SQLValidator, format_errors
 
 
 class SQLRegenerator:
     """
     Agent responsible for regenerating SQL queries based on error feedback.
+    With a validator, each candidate is checked against the schema snapshot locally and
+    its errors become the feedback for the next attempt, without a database round-trip.
     """
 
-    def __init__(self, plugin_registry: PluginRegistry, max_retries: int = 2):
+    def __init__(self, plugin_registry: PluginRegistry, max_retries: int = 2, validator: Optional[SQLValidator] = None):
         self.plugin_registry = plugin_registry
         self.max_retries = max_retries
+        self.validator = validator
 
     async def regenerate_sql(self, query: str, previous_sql: str, error_message: str):
         """
@@ -30,8 +36,12 @@ class SQLRegenerator:
                 error=error_message,
             )
             if sql and "SELECT" in sql.upper():
-                logger.success("SQL regeneration successful.")
-                return sql
+                errors = self.validator.validate(sql) if self.validator else []
+                if not errors:
+                    logger.success("SQL regeneration successful.")
+                    return sql
+                previous_sql, error_message = sql, format_errors(errors)
+                logger.warning(f"Regenerated SQL failed validation: {error_message}")
 
         logger.error("SQL regeneration failed after max retries.")
         raise RuntimeError("Unable to generate a valid SQL statement.")
@@ -1,6 +1,9 @@
+from typing import Any, Dict, List, Union
 
 from loguru import logger
 
+from ..models.result_set import ColumnarResult
+
 
 class SummarizerAgent:
     """
@@ -11,15 +14,15 @@ class SummarizerAgent:
         self.model_name = "gpt-4o"
         logger.info("SummarizerAgent initialized.")
 
-    async def summarize_data(self, rows: list[dict]) -> str:
+    async def summarize_data(self, rows: Union[ColumnarResult, List[Dict[str, Any]]]) -> str:
         """
         Generates a concise textual summary of the result set.
         """
-        if not rows:
+        if not len(rows):
             return "No results were found for your query."
 
         # Simple summary logic placeholder
-        sample = rows[0]
+        sample = rows.to_records(limit=1)[0] if isinstance(rows, ColumnarResult) else rows[0]
         summary = f"Your query returned {len(rows)} rows. " \
                   f"Here’s a sample record: {sample}."
         logger.debug(f"Generated summary: {summary}")
@@ -1,6 +1,7 @@
 # src/text_to_sql_agents/agents/visualization_agent.py
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
 from loguru import logger
+from ..models.result_set import ColumnarResult
 from ..models.visualization_models import VisualizationSpec
 
 
@@ -12,11 +13,11 @@ class VisualizationAgent:
     def __init__(self):
         logger.info("VisualizationAgent initialized.")
 
-    async def recommend_chart(self, rows: List[Dict[str, Any]]) -> VisualizationSpec:
+    async def recommend_chart(self, rows: Union[ColumnarResult, List[Dict[str, Any]]]) -> VisualizationSpec:
         """
         Analyzes result data and recommends a chart type + fields.
         """
-        if not rows:
+        if not len(rows):
             return VisualizationSpec(
                 chart_type="table",
                 fields={},
@@ -24,9 +25,14 @@ class VisualizationAgent:
                 chart_data=[],
             )
 
-        sample_row = rows[0]
-        numeric_fields = [k for k, v in sample_row.items() if isinstance(v, (int, float))]
-        non_numeric_fields = [k for k, v in sample_row.items() if isinstance(v, str)]
+        if isinstance(rows, ColumnarResult):
+            # column dtypes answer this without looking at any row
+            numeric_fields = rows.numeric_columns()
+            non_numeric_fields = rows.text_columns()
+        else:
+            sample_row = rows[0]
+            numeric_fields = [k for k, v in sample_row.items() if isinstance(v, (int, float))]
+            non_numeric_fields = [k for k, v in sample_row.items() if isinstance(v, str)]
 
         if len(numeric_fields) >= 2:
             chart_type = "scatter"
@@ -1,7 +1,11 @@
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional
 from loguru import logger
 
-from ...service.foundry_agent_service import FoundryAgentService
+from ..cassette import Cassette
+from ..tracing import span
+
+if TYPE_CHECKING:  # the service pulls in the Azure SDKs; the adapter only needs an instance
+    from ...service.foundry_agent_service import FoundryAgentService
 
 
 class AzureFoundryAdapter:
@@ -11,12 +15,24 @@ class AzureFoundryAdapter:
       - guardrail_check(sql) -> bool
       - invoke_agent(prompt, context) -> Any
       - upload_powerbi_report(pbix_bytes, user_id) -> Optional[str]
+    With a cassette, calls are recorded to it, or replayed from it without a service.
     """
 
-    def __init__(self, service: Optional[FoundryAgentService] = None):
+    def __init__(self, service: Optional["FoundryAgentService"] = None, cassette: Optional[Cassette] = None):
         self.service = service
+        self.cassette = cassette
         self._started = False
 
+    @property
+    def available(self) -> bool:
+        """Whether calls can be answered: a service is configured, or a cassette replays them."""
+        return self.service is not None or (self.cassette is not None and self.cassette.replaying)
+
+    def attach(self, service: "FoundryAgentService"):
+        """Use a service the app has already initialised (main's foundry stage runs next to the controller's)."""
+        self.service = service
+        self._started = True
+
     async def startup(self):
         if not self.service:
             # lazy instantiate FoundryAgentService using config loader in the service module
@@ -25,8 +41,20 @@ class AzureFoundryAdapter:
             await self.service.initialize()
             self._started = True
 
+    async def _call(self, name: str, args: Dict[str, Any], live: Callable[[], Awaitable[Any]]) -> Any:
+        async def run():
+            await self.startup()
+            return await live()
+
+        if self.cassette is None:
+            return await run()
+        return await self.cassette.call("foundry", name, args, run)
+
     async def guardrail_check(self, sql: str) -> bool:
-        await self.startup()
+        with span("foundry.guardrail_check"):
+            return await self._call("guardrail_check", {"sql": sql}, lambda: self._guardrail_check(sql))
+
+    async def _guardrail_check(self, sql: str) -> bool:
         try:
             # The Foundry service should expose a guardrail skill or check method
             result = await self.service.kernel.invoke_function("guardrail", "check", sql) if getattr(self.service, "kernel", None) else None
@@ -40,13 +68,23 @@ class AzureFoundryAdapter:
             return False
 
     async def invoke_agent(self, prompt: str, context: Optional[dict] = None) -> Any:
-        await self.startup()
-        return await self.service.invoke_agent(prompt, context=context)
+        with span("foundry.invoke_agent"):
+            return await self._call(
+                "invoke_agent",
+                {"prompt": prompt, "context": context},
+                lambda: self.service.invoke_agent(prompt, context=context),
+            )
 
     async def upload_powerbi_report(self, pbix_bytes: bytes, user_id: str) -> Optional[str]:
-        await self.startup()
+        if self.cassette is None or not self.cassette.replaying:
+            await self.startup()  # a missing service is an error, not a failed upload
         try:
-            return await self.service.upload_powerbi_report(pbix_bytes, user_id=user_id)
+            with span("foundry.upload_powerbi_report"):
+                return await self._call(
+                    "upload_powerbi_report",
+                    {"pbix_bytes": pbix_bytes, "user_id": user_id},
+                    lambda: self.service.upload_powerbi_report(pbix_bytes, user_id=user_id),
+                )
         except Exception as e:
             logger.error(f"PowerBI upload failed: {e}")
             return None
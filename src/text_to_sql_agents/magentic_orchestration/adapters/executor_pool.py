@@ -0,0 +1,87 @@
+# src/text_to_sql_agents/magentic_orchestration/adapters/executor_pool.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from loguru import logger
+
+
+class ProviderExecutor:
+    """
+    Bounded thread pool dedicated to one database provider, so blocking DB calls
+    cannot starve the event loop's default executor (or each other across providers).
+    Records how long each call waited for a free worker.
+    """
+
+    def __init__(self, provider: str, max_workers: int):
+        self.provider = provider
+        self.max_workers = max_workers
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"sql-{provider}")
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.in_flight = 0
+        self.queued = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self.submitted += 1
+            self.queued += 1
+
+        def timed():
+            wait = time.perf_counter() - submitted_at
+            with self._lock:
+                self.queued -= 1
+                self.in_flight += 1
+                self.queue_wait_total += wait
+                self.queue_wait_max = max(self.queue_wait_max, wait)
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+
+        return await loop.run_in_executor(self.pool, timed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            started = self.submitted - self.queued
+            return {
+                "provider": self.provider,
+                "workers": self.max_workers,
+                "submitted": self.submitted,
+                "queued": self.queued,
+                "in_flight": self.in_flight,
+                "queue_wait_ms_avg": (self.queue_wait_total / started * 1000) if started else 0.0,
+                "queue_wait_ms_max": self.queue_wait_max * 1000,
+            }
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+_EXECUTORS: Dict[str, ProviderExecutor] = {}
+_EXECUTORS_LOCK = threading.Lock()
+
+
+def get_provider_executor(provider: str, max_workers: int) -> ProviderExecutor:
+    """Process-wide executor per provider; the first caller decides its size."""
+    with _EXECUTORS_LOCK:
+        executor = _EXECUTORS.get(provider)
+        if executor is None:
+            executor = ProviderExecutor(provider, max_workers)
+            _EXECUTORS[provider] = executor
+            logger.info(f"Created SQL executor pool for '{provider}' with {max_workers} workers.")
+        return executor
+
+
+def shutdown_executors():
+    with _EXECUTORS_LOCK:
+        for executor in _EXECUTORS.values():
+            executor.shutdown()
+        _EXECUTORS.clear()
@@ -0,0 +1,78 @@
+# src/text_to_sql_agents/magentic_orchestration/adapters/result_cache.py
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+from ..caching import LRUTTLCache
+from ...models.config_models import ResultCacheSettings
+from ...models.result_set import ColumnarResult
+from ...utils.sql_lexer import WORD, canonicalize_sql, referenced_tables, significant, tokenize
+
+
+def _is_read_only(sql: str) -> bool:
+    toks = significant(tokenize(sql))
+    return bool(toks) and toks[0].kind == WORD and toks[0].upper in ("SELECT", "WITH")
+
+
+class ResultSetCache:
+    """
+    Opt-in cache of SELECT results keyed by canonical SQL + provider + database.
+    - results are stored as the ColumnarResult itself (read-only arrays, shared on hit)
+    - the cache is bounded by an approximate byte budget, not an entry count
+    - the TTL of a query is the smallest TTL configured for any table it reads
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        default_ttl_seconds: float = 300,
+        table_ttl_seconds: Optional[Dict[str, float]] = None,
+    ):
+        self._cache = LRUTTLCache(max_entries=sys.maxsize, max_bytes=max_bytes)
+        self.default_ttl_seconds = default_ttl_seconds
+        self.table_ttl_seconds = {k.lower(): v for k, v in (table_ttl_seconds or {}).items()}
+        self.uncacheable = 0
+
+    @classmethod
+    def from_settings(cls, settings: Optional[ResultCacheSettings]) -> Optional["ResultSetCache"]:
+        if settings is None or not settings.enabled:
+            return None
+        return cls(
+            max_bytes=settings.max_bytes,
+            default_ttl_seconds=settings.default_ttl_seconds,
+            table_ttl_seconds=settings.table_ttl_seconds,
+        )
+
+    def ttl_for(self, sql: str) -> float:
+        ttl = self.default_ttl_seconds
+        for table in referenced_tables(sql):
+            # match "schema.table" first, then the bare table name
+            for name in (table, table.rsplit(".", 1)[-1]):
+                if name in self.table_ttl_seconds:
+                    ttl = min(ttl, self.table_ttl_seconds[name])
+                    break
+        return ttl
+
+    @staticmethod
+    def make_key(sql: str, provider: Optional[str], database: Optional[str]) -> Tuple[str, str, str]:
+        return (provider or "", database or "", canonicalize_sql(sql))
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[ColumnarResult]:
+        return self._cache.get(key)
+
+    def put(self, key: Tuple[str, str, str], sql: str, result: ColumnarResult):
+        if not _is_read_only(sql):
+            return
+        ttl = self.ttl_for(sql)
+        if ttl <= 0:
+            return
+        if not self._cache.set(key, result, ttl_seconds=ttl, size=result.nbytes):
+            self.uncacheable += 1
+            logger.debug("ResultSetCache: result larger than the cache budget, not cached.")
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._cache.stats(), "max_bytes": self._cache.max_bytes, "uncacheable": self.uncacheable}
@@ -0,0 +1,128 @@
+# src/text_to_sql_agents/magentic_orchestration/adapters/schema_cache.py
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+
+Introspect = Callable[[Optional[List[str]]], Awaitable[Dict[str, Any]]]
+Fingerprint = Callable[[], Awaitable[Dict[str, str]]]
+
+
+class SchemaSnapshotStore:
+    """
+    Schema snapshot persisted on local disk and refreshed incrementally.
+    - the file is read lazily, on the first get()
+    - at most every `check_interval_seconds`, a cheap catalog fingerprint (per-table
+      version tokens) is compared with the stored one; only new or changed tables are
+      re-introspected and dropped tables are removed
+    - concurrent callers share a single in-flight refresh
+    """
+
+    def __init__(
+        self,
+        path: str,
+        introspect: Introspect,
+        fingerprint: Fingerprint,
+        check_interval_seconds: float = 60,
+    ):
+        self.path = Path(path)
+        self._introspect = introspect
+        self._fingerprint = fingerprint
+        self.check_interval_seconds = check_interval_seconds
+        self._loaded = False
+        self._snapshot: Dict[str, Any] = {"tables": {}}
+        self._versions: Dict[str, str] = {}
+        self._checked_at: Optional[float] = None
+        self._refreshing: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.tables_reintrospected = 0
+
+    async def get(self, force_refresh: bool = False) -> Dict[str, Any]:
+        if not self._loaded:
+            await asyncio.to_thread(self._load)
+        stale = self._checked_at is None or time.monotonic() - self._checked_at >= self.check_interval_seconds
+        if force_refresh or stale:
+            if self._refreshing is None or self._refreshing.done():
+                self._refreshing = asyncio.create_task(self._refresh())
+            # shield: one caller being cancelled must not cancel the refresh the others wait on
+            await asyncio.shield(self._refreshing)
+        return self._snapshot
+
+    @property
+    def versions(self) -> Dict[str, str]:
+        return dict(self._versions)
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self._snapshot = data.get("snapshot") or {"tables": {}}
+            self._versions = data.get("versions") or {}
+            logger.info(f"Loaded schema snapshot with {len(self._snapshot['tables'])} tables from {self.path}.")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable schema snapshot at {self.path}: {e}")
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "saved_at": datetime.now(timezone.utc).isoformat(),
+            "versions": self._versions,
+            "snapshot": self._snapshot,
+        }
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(payload, default=str), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    async def _refresh(self):
+        started = time.perf_counter()
+        try:
+            current = await self._fingerprint()
+        except Exception as e:
+            if not self._snapshot.get("tables"):
+                raise
+            # keep serving the persisted snapshot; try again after the next interval
+            logger.warning(f"Schema fingerprint failed, serving cached snapshot: {e}")
+            self._checked_at = time.monotonic()
+            return
+        known = self._versions
+        # an empty version means the dialect cannot tell us about DDL changes; keep what we have
+        changed = [t for t, v in current.items() if t not in known or (v and v != known[t])]
+        removed = [t for t in known if t not in current]
+
+        if changed or removed:
+            tables = dict(self._snapshot.get("tables", {}))
+            for t in removed:
+                tables.pop(t, None)
+            if changed:
+                # a cold store introspects everything in one pass rather than table by table
+                fresh = await self._introspect(None if not tables else changed)
+                tables.update(fresh.get("tables", {}))
+            # publish a new object so readers holding the old snapshot are never mutated under them
+            self._snapshot = {"tables": tables}
+            self._versions = current
+            await asyncio.to_thread(self._save)
+            self.tables_reintrospected += len(changed)
+            logger.info(
+                f"Schema snapshot refreshed: {len(changed)} changed, {len(removed)} removed "
+                f"in {(time.perf_counter() - started) * 1000:.0f} ms."
+            )
+        self.refreshes += 1
+        self._checked_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tables": len(self._snapshot.get("tables", {})),
+            "refreshes": self.refreshes,
+            "tables_reintrospected": self.tables_reintrospected,
+            "path": str(self.path),
+        }
@@ -1,9 +1,15 @@
 
+import asyncio
+import time
 from typing import Any, Optional
 from loguru import logger
 
-from ...service.kernel_factory import KernelFactory
-from ...service.plugin_registry import PluginRegistry
+from ..cancellation import record_cancelled
+from ..cassette import Cassette
+from ..deadline import within_deadline
+from ..llm_scheduler import LLMScheduler, estimate_tokens, usage_tokens
+from ..metrics import LLM_CALL_SECONDS, LLM_TOKENS
+from ..tracing import span
 
 
 class SemanticKernelAdapter:
@@ -11,23 +17,70 @@ class SemanticKernelAdapter:
     Thin adapter over KernelFactory + PluginRegistry exposing:
       - load_plugins()
       - invoke_plugin(name, **kwargs)
+    With a scheduler, every plugin call waits for the RPM/TPM budget in its priority class.
+    Calls (including time queued in the scheduler) are bounded by the plan deadline;
+    a cancelled caller drops its queued or in-flight call and is counted as such.
+    Each call is timed, traced as an `llm.call` span and its token use (estimate and
+    provider-reported usage) counted per plugin.
+    With a cassette, calls are recorded to it, or replayed from it without a kernel.
     """
 
-    def __init__(self, kernel: Optional[Any] = None):
+    def __init__(
+        self,
+        kernel: Optional[Any] = None,
+        scheduler: Optional[LLMScheduler] = None,
+        cassette: Optional[Cassette] = None,
+    ):
         self._kernel = kernel
         self._registry = None
+        self.scheduler = scheduler
+        self.cassette = cassette
 
     def _ensure(self):
+        # imported here so the adapter (and the controller) load without the Semantic Kernel SDK,
+        # e.g. with an injected registry in the offline benchmarks
+        from ...service.kernel_factory import KernelFactory
+        from ...service.plugin_registry import PluginRegistry
+
         if self._kernel is None:
             self._kernel = KernelFactory.create_kernel(config=KernelFactory.__dict__.get("config", None)) if hasattr(KernelFactory, "create_kernel") else KernelFactory.create_kernel  # defensive
         if self._registry is None:
             self._registry = PluginRegistry(self._kernel)
 
     async def load_plugins(self):
+        if self.cassette is not None and self.cassette.replaying:
+            logger.info("SemanticKernelAdapter: replaying from a cassette, no plugins to load.")
+            return
         self._ensure()
         await self._registry.load_all_plugins()
         logger.info("SemanticKernelAdapter: plugins loaded.")
 
     async def invoke_plugin(self, name: str, **kwargs) -> Any:
+        started = time.perf_counter()
+        try:
+            with span("llm.call", plugin=name), LLM_CALL_SECONDS.time(name):
+                if self.scheduler is None:
+                    result = await within_deadline(self._call(name, kwargs))
+                else:
+                    tokens = estimate_tokens(kwargs, self.scheduler.max_output_tokens)
+                    LLM_TOKENS.inc(tokens, name, "estimated")
+                    result = await within_deadline(
+                        self.scheduler.submit(lambda: self._call(name, kwargs), tokens=tokens)
+                    )
+        except asyncio.CancelledError:
+            record_cancelled("llm_calls", time.perf_counter() - started)
+            raise
+        used = usage_tokens(result)
+        if used is not None:
+            LLM_TOKENS.inc(used, name, "reported")
+        return result
+
+    async def _call(self, name: str, kwargs: dict) -> Any:
+        # inside the scheduler slot: a recorded latency is the model's, not the queue's
+        if self.cassette is None:
+            return await self._invoke_live(name, kwargs)
+        return await self.cassette.call("llm", name, kwargs, lambda: self._invoke_live(name, kwargs))
+
+    async def _invoke_live(self, name: str, kwargs: dict) -> Any:
         self._ensure()
         return await self._registry.invoke(name, **kwargs)
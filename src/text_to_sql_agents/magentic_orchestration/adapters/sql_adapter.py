@@ -1,47 +1,283 @@
 import asyncio
-from typing import Any, Dict, List, Optional
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional
 from loguru import logger
 
-# try to import existing project's SQLExecutor
-try:
-    from ...agents.executor import SQLExecutor
-except Exception:
-    from ...agents.executor_agent import SQLExecutor  # fallback if different naming
+from .executor_pool import get_provider_executor
+from .result_cache import ResultSetCache
+from .schema_cache import SchemaSnapshotStore
+from .streaming import RunningAggregates, iterate_in_thread
+from ..cancellation import record_cancelled
+from ..deadline import DeadlineExceeded, remaining_time, within_deadline
+from ..metrics import DB_BYTES, DB_QUERY_SECONDS, DB_ROWS
+from ..tracing import span
+from ...models.config_models import PoolSettings, SchemaCacheSettings, StreamingSettings
+from ...models.result_set import ColumnarResult
+
+if TYPE_CHECKING:
+    from ...agents.executor import AsyncSQLExecutor, StatementCanceller
+
+
+def _executor_module():
+    # SQLAlchemy and pandas load with the first adapter that has a connection, not at app import
+    from ...agents import executor
+
+    return executor
 
 
 class SQLAdapter:
     """
-    Async wrapper over the project's SQLExecutor.
+    Async wrapper over the project's SQLExecutor (or AsyncSQLExecutor for async drivers).
     Exposes:
-      - execute_query(sql) -> list[dict]
-      - generate_schema_snapshot() -> dict
+      - execute_query(sql) -> ColumnarResult
+      - stream_query(sql) -> async iterator of ColumnarResult batches
+      - execute_query_bounded(sql) -> dict (first N rows + running aggregates)
+      - estimate_cost(sql) -> dict (EXPLAIN / dry-run estimate, no execution)
+      - generate_schema_snapshot() -> dict (served from the on-disk SchemaSnapshotStore when configured)
+      - cache_stats() -> dict (when a ResultSetCache is configured)
+      - executor_stats() -> dict (queue wait of the provider's dedicated thread pool)
+    With an async driver URL (async_mode "auto"/"on") queries run natively on the event loop;
+    otherwise blocking calls run on a bounded per-provider thread pool, not the loop's default executor.
+    Queries give up with DeadlineExceeded once the running plan's deadline passes.
+    Cancelling the awaiting task (client gone, deadline) cancels the statement in the driver
+    instead of leaving it running on the worker thread.
+    Statements are timed and traced (`db.*` spans); fetched rows / bytes are counted per provider.
     """
 
-    def __init__(self, connection_string: Optional[str] = None):
+    def __init__(
+        self,
+        connection_string: Optional[str] = None,
+        provider: Optional[str] = None,
+        database: Optional[str] = None,
+        result_cache: Optional[ResultSetCache] = None,
+        streaming: Optional[StreamingSettings] = None,
+        pool: Optional[PoolSettings] = None,
+        async_mode: str = "auto",
+        schema_cache: Optional[SchemaCacheSettings] = None,
+    ):
         self._conn_str = connection_string
-        self._executor = SQLExecutor(connection_string) if connection_string else None
+        self.pool = pool or PoolSettings()
+        self._executor = None
+        self._async_executor: Optional["AsyncSQLExecutor"] = None
+        if connection_string:
+            executor = _executor_module()
+            use_async = async_mode != "off" and executor.supports_async(connection_string)
+            if async_mode == "on" and not use_async:
+                raise RuntimeError("async_mode='on' requires an async driver URL and SQLAlchemy asyncio support.")
+            if use_async:
+                self._async_executor = executor.AsyncSQLExecutor(connection_string, pool=self.pool)
+            else:
+                self._executor = executor.SQLExecutor(connection_string, pool=self.pool)
+        self.provider = provider
+        self.database = database
+        self.result_cache = result_cache
+        self.streaming = streaming or StreamingSettings()
+        self._threads = get_provider_executor(provider or "default", self.pool.executor_workers)
+        self.schema_schemas = list(schema_cache.schemas) if schema_cache else []
+        self.schema_store: Optional[SchemaSnapshotStore] = None
+        if schema_cache is not None and schema_cache.enabled and connection_string:
+            self.schema_store = SchemaSnapshotStore(
+                schema_cache.path,
+                introspect=self.introspect_schema,
+                fingerprint=self.catalog_fingerprint,
+                check_interval_seconds=schema_cache.check_interval_seconds,
+            )
+
+    @property
+    def metrics_provider(self) -> str:
+        return self.provider or "default"
+
+    def _count_fetched(self, rows: int, size: Optional[int]):
+        DB_ROWS.inc(rows, self.metrics_provider)
+        if size:
+            DB_BYTES.inc(size, self.metrics_provider)
 
-    async def execute_query(self, sql: str) -> List[Dict[str, Any]]:
-        if not self._executor:
+    @property
+    def is_async(self) -> bool:
+        return self._async_executor is not None
+
+    def _require_executor(self):
+        if not self._executor and not self._async_executor:
             raise RuntimeError("SQLExecutor not initialized with a connection string.")
-        loop = asyncio.get_running_loop()
+
+    async def execute_query(self, sql: str) -> ColumnarResult:
+        self._require_executor()
+
+        cache_key = None
+        if self.result_cache is not None:
+            cache_key = self.result_cache.make_key(sql, self.provider, self.database)
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                logger.debug("SQLAdapter: result served from cache.")
+                return cached
+
+        provider = self.metrics_provider
+        with span("db.query", provider=provider), DB_QUERY_SECONDS.time(provider, "query"):
+            result = await within_deadline(self._execute_uncached(sql))
+        self._count_fetched(len(result), result.nbytes)
+        if cache_key is not None:
+            self.result_cache.put(cache_key, sql, result)
+        return result
+
+    async def _execute_uncached(self, sql: str) -> ColumnarResult:
+        started = time.perf_counter()
+        if self._async_executor is not None:
+            try:
+                return ColumnarResult.from_dataframe(await self._async_executor.execute_query(sql))
+            except asyncio.CancelledError:
+                # async drivers cancel the statement themselves when the awaiting task is cancelled
+                record_cancelled("db_statements", time.perf_counter() - started)
+                raise
+
+        canceller = _executor_module().StatementCanceller()
 
         def run():
-            df = self._executor.execute_query(sql)
+            df = self._executor.execute_query(sql, canceller=canceller)
             if df is None:
-                return []
-            return df.to_dict(orient="records")
+                return ColumnarResult({})
+            return ColumnarResult.from_dataframe(df)
 
-        return await loop.run_in_executor(None, run)
+        try:
+            return await self._threads.run(run)
+        except asyncio.CancelledError:
+            self._cancel_statement(canceller, started)
+            raise
+
+    @staticmethod
+    def _cancel_statement(canceller: "StatementCanceller", started: float):
+        if canceller.cancel():
+            record_cancelled("db_statements", time.perf_counter() - started)
+
+    def _df_batches(
+        self, sql: str, chunk_size: int, max_rows: Optional[int], max_bytes: Optional[int]
+    ) -> AsyncIterator[Any]:
+        """DataFrame chunks from the async driver directly, or from the sync executor via a worker thread."""
+        if self._async_executor is not None:
+            return self._async_executor.iter_batches(
+                sql, chunk_size=chunk_size, max_rows=max_rows, max_bytes=max_bytes
+            )
+        canceller = _executor_module().StatementCanceller()
+        started = time.perf_counter()
+        return iterate_in_thread(
+            lambda should_stop: self._executor.iter_batches(
+                sql,
+                chunk_size=chunk_size,
+                max_rows=max_rows,
+                max_bytes=max_bytes,
+                should_stop=should_stop,
+                canceller=canceller,
+            ),
+            run_blocking=self._threads.run,
+            on_cancel=lambda: self._cancel_statement(canceller, started),
+        )
+
+    async def stream_query(
+        self,
+        sql: str,
+        chunk_size: Optional[int] = None,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> AsyncIterator[ColumnarResult]:
+        """
+        Yield the result in row batches without materialising it. Budgets default to the
+        streaming settings; breaking out of the loop cancels the cursor.
+        """
+        self._require_executor()
+        batches = self._df_batches(
+            sql,
+            chunk_size=chunk_size or self.streaming.chunk_size,
+            max_rows=max_rows if max_rows is not None else self.streaming.max_rows,
+            max_bytes=max_bytes if max_bytes is not None else self.streaming.max_bytes,
+        )
+        async for df in batches:
+            batch = ColumnarResult.from_dataframe(df)
+            self._count_fetched(len(batch), batch.nbytes)
+            yield batch
+
+    async def execute_query_bounded(self, sql: str, preview_rows: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Stream the query within the row/byte budget and keep only what downstream agents need:
+        the first `preview_rows` rows (as a ColumnarResult) plus per-column aggregates
+        over everything fetched.
+        """
+        self._require_executor()
+        preview_rows = self.streaming.preview_rows if preview_rows is None else preview_rows
+        max_rows = self.streaming.max_rows
+        max_bytes = self.streaming.max_bytes
+        aggregates = RunningAggregates()
+        preview: List[ColumnarResult] = []
+        previewed = 0
+        row_count = 0
+        size = 0
+
+        provider = self.metrics_provider
+        batches = self._df_batches(sql, self.streaming.chunk_size, max_rows, max_bytes)
+        with span("db.query_bounded", provider=provider), DB_QUERY_SECONDS.time(provider, "bounded"):
+            async for df in batches:
+                remaining = remaining_time()
+                if remaining is not None and remaining <= 0:
+                    # leaving the loop cancels the cursor
+                    raise DeadlineExceeded("Plan deadline exceeded while fetching rows")
+                aggregates.update(df)
+                row_count += len(df)
+                size += int(df.memory_usage(index=False, deep=True).sum())
+                if previewed < preview_rows:
+                    part = ColumnarResult.from_dataframe(df.head(preview_rows - previewed))
+                    preview.append(part)
+                    previewed += len(part)
+        self._count_fetched(row_count, size)
+
+        truncated = (max_rows is not None and row_count >= max_rows) or (max_bytes is not None and size >= max_bytes)
+        return {
+            "rows": ColumnarResult.concat(preview),
+            "row_count": row_count,
+            "truncated": truncated,
+            "aggregates": aggregates.result(),
+        }
+
+    @property
+    def dialect(self) -> Optional[str]:
+        """SQLAlchemy backend name of the configured database (e.g. "mssql", "sqlite")."""
+        executor = self._async_executor or self._executor
+        engine = getattr(executor, "engine", None)
+        return engine.dialect.name if engine is not None else None
+
+    async def estimate_cost(self, sql: str) -> Optional[Dict[str, Any]]:
+        """Provider EXPLAIN / dry-run estimate, or None when the backend has no estimator."""
+        self._require_executor()
+        with span("db.estimate_cost", provider=self.metrics_provider):
+            if self._async_executor is not None:
+                return await self._async_executor.estimate_cost(sql)
+            return await self._threads.run(self._executor.estimate_cost, sql)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.result_cache.stats() if self.result_cache is not None else {}
+
+    def executor_stats(self) -> Dict[str, Any]:
+        return self._threads.stats()
 
     async def generate_schema_snapshot(self) -> Dict[str, Any]:
-        if not self._executor:
+        if not self._executor and not self._async_executor:
             return {}
-        loop = asyncio.get_running_loop()
+        if self.schema_store is not None:
+            return await self.schema_store.get()
+        return await self.introspect_schema()
+
+    async def introspect_schema(self, tables: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Live catalog introspection, optionally limited to some "schema.table" names."""
+        schemas = self.schema_schemas or None
+        if self._async_executor is not None:
+            return await self._async_executor.generate_schema_snapshot(schemas=schemas, tables=tables)
 
         def run():
             if hasattr(self._executor, "generate_schema_snapshot"):
-                return self._executor.generate_schema_snapshot()
+                return self._executor.generate_schema_snapshot(schemas=schemas, tables=tables)
             return {}
 
-        return await loop.run_in_executor(None, run)
+        return await self._threads.run(run)
+
+    async def catalog_fingerprint(self) -> Dict[str, str]:
+        schemas = self.schema_schemas or None
+        if self._async_executor is not None:
+            return await self._async_executor.catalog_fingerprint(schemas=schemas)
+        return await self._threads.run(lambda: self._executor.catalog_fingerprint(schemas=schemas))
@@ -0,0 +1,103 @@
+# src/text_to_sql_agents/magentic_orchestration/adapters/streaming.py
+import asyncio
+import threading
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional
+
+if TYPE_CHECKING:  # batches are DataFrames, so pandas is loaded by the time they arrive
+    import pandas as pd
+
+
+_DONE = object()
+
+
+async def iterate_in_thread(
+    make_iterator: Callable[[Callable[[], bool]], Iterator[Any]],
+    max_buffered: int = 2,
+    run_blocking: Optional[Callable[[Callable[[], Any]], Awaitable[Any]]] = None,
+    on_cancel: Optional[Callable[[], Any]] = None,
+) -> AsyncIterator[Any]:
+    """
+    Drive a blocking iterator on a worker thread and yield its items on the event loop.
+    run_blocking submits the producer to a specific pool (default: the loop's executor).
+    make_iterator receives a should_stop() callable so it can stop fetching early.
+    At most max_buffered items wait in the queue; a slow consumer blocks the producer.
+    Leaving the async for loop early (break, exception, cancellation) stops the producer;
+    on cancellation on_cancel() is called first, to unblock a producer stuck in the driver.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered)
+    stop = threading.Event()
+
+    def put(item: Any):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def produce():
+        try:
+            for item in make_iterator(stop.is_set):
+                if stop.is_set():
+                    break
+                put(item)
+        except BaseException as e:  # handed over to the consumer
+            put(e)
+            return
+        put(_DONE)
+
+    if run_blocking is not None:
+        producer = asyncio.ensure_future(run_blocking(produce))
+    else:
+        producer = loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    except asyncio.CancelledError:
+        if on_cancel is not None:
+            on_cancel()
+        raise
+    finally:
+        stop.set()
+        # unblock a producer waiting on a full queue until it notices the stop flag
+        while not producer.done():
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.wait([producer], timeout=0.05)
+
+
+class RunningAggregates:
+    """
+    Per-column aggregates updated one batch at a time, so callers never need the full result:
+    count / nulls for every column, plus min / max / sum / mean for numeric columns.
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def update(self, batch: "pd.DataFrame"):
+        from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+        for column in batch.columns:
+            series = batch[column]
+            stats = self._stats.setdefault(column, {"count": 0, "nulls": 0})
+            nulls = int(series.isna().sum())
+            stats["nulls"] += nulls
+            stats["count"] += len(series) - nulls
+            if is_numeric_dtype(series) and not is_bool_dtype(series):
+                if nulls == len(series):
+                    continue
+                lo, hi, total = series.min(), series.max(), series.sum()
+                stats["min"] = lo if "min" not in stats else min(stats["min"], lo)
+                stats["max"] = hi if "max" not in stats else max(stats["max"], hi)
+                stats["sum"] = stats.get("sum", 0) + total
+
+    def result(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for column, stats in self._stats.items():
+            stats = {k: (v.item() if hasattr(v, "item") else v) for k, v in stats.items()}
+            if "sum" in stats and stats["count"]:
+                stats["mean"] = stats["sum"] / stats["count"]
+            out[column] = stats
+        return out
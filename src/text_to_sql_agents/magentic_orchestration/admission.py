@@ -0,0 +1,278 @@
+# src/text_to_sql_agents/magentic_orchestration/admission.py
+import asyncio
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional
+
+from .llm_scheduler import BATCH, INTERACTIVE, PRIORITY_NAMES, percentile_ms
+from .metrics import METRICS
+from ..models.config_models import AdmissionSettings
+
+
+ADMISSION_WAIT_SECONDS = METRICS.histogram(
+    "admission_queue_wait_seconds", "Time admitted plan runs waited for a slot.", ("class",)
+)
+ADMISSION_REJECTED = METRICS.counter(
+    "admission_rejected_total", "Plan runs turned away by admission control.", ("class", "reason")
+)
+
+# reason -> HTTP status: the caller's own excess is 429, server overload is 503
+REJECTION_STATUS = {"user_limit": 429, "queue_full": 503, "queue_wait": 503, "queue_timeout": 503}
+
+
+class AdmissionRejected(RuntimeError):
+    """A plan run was not admitted; `status_code` (429 / 503) and `retry_after` (seconds) tell the client when to retry."""
+
+    def __init__(self, message: str, reason: str, retry_after: float):
+        super().__init__(message)
+        self.reason = reason
+        self.status_code = REJECTION_STATUS[reason]
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "user_id", "plan", "grant")
+
+    def __init__(self, priority: int, seq: int, user_id: str, plan: str, grant: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.user_id = user_id
+        self.plan = plan
+        self.grant = grant
+
+
+class AdmissionController:
+    """
+    Gate in front of run_plan, so a traffic spike queues (or is turned away) at the door
+    instead of degrading the event loop, DB pool and LLM quota for every run at once:
+    - at most `max_concurrency` plan runs at a time, and per user / per plan limits on top
+    - waiting runs are granted by priority class (interactive before batch), then to the
+      user with the fewest running plans (fair share), then in arrival order
+    - fast rejection instead of a long wait, with a Retry-After hint:
+        429 user_limit   the user already has per_user_concurrency + per_user_queue runs
+        503 queue_full   max_queue runs are already waiting
+        503 queue_wait   the estimated wait (backlog / capacity x mean run time)
+                         exceeds the class's max queue wait
+        503 queue_timeout the run did wait that long without getting a slot
+    - a caller cancelled while queued (client gone) leaves the queue without running
+    - stats(): running / queued counts, per-class counters and queue-wait percentiles
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        max_queue: int = 200,
+        per_user_concurrency: int = 4,
+        per_user_queue: int = 8,
+        per_plan_concurrency: Optional[Dict[str, int]] = None,
+        max_queue_wait: Optional[Dict[int, Optional[float]]] = None,
+        default_retry_after: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.per_user_concurrency = max(1, per_user_concurrency)
+        self.per_user_queue = max(0, per_user_queue)
+        self.per_plan_concurrency = dict(per_plan_concurrency or {})
+        self.max_queue_wait = {INTERACTIVE: 2.0, BATCH: None, **(max_queue_wait or {})}
+        self.default_retry_after = default_retry_after
+        self._clock = clock
+        self._seq = itertools.count()
+        self._waiting: List[_Waiter] = []
+        self.running = 0
+        self._running_by_user: Dict[str, int] = {}
+        self._running_by_plan: Dict[str, int] = {}
+        self._queued_by_user: Dict[str, int] = {}
+        # mean plan run time (EWMA), for the wait estimate; unknown until a run finished
+        self.service_seconds: Optional[float] = None
+        self._waits: Dict[int, Deque[float]] = {p: deque(maxlen=2048) for p in PRIORITY_NAMES}
+        self._counts: Dict[int, Dict[str, int]] = {
+            p: {"admitted": 0, "completed": 0, "cancelled_queued": 0, "rejected": 0} for p in PRIORITY_NAMES
+        }
+
+    @classmethod
+    def from_settings(cls, settings: Optional[AdmissionSettings]) -> Optional["AdmissionController"]:
+        if settings is None or not settings.enabled:
+            return None
+        return cls(
+            max_concurrency=settings.max_concurrency,
+            max_queue=settings.max_queue,
+            per_user_concurrency=settings.per_user_concurrency,
+            per_user_queue=settings.per_user_queue,
+            per_plan_concurrency=settings.per_plan_concurrency,
+            max_queue_wait={
+                INTERACTIVE: settings.max_queue_wait_ms / 1000.0 if settings.max_queue_wait_ms else None,
+                BATCH: settings.batch_max_queue_wait_ms / 1000.0 if settings.batch_max_queue_wait_ms else None,
+            },
+            default_retry_after=settings.default_retry_after_seconds,
+        )
+
+    def _starts_now(self, user_id: str, plan: str, priority: int) -> bool:
+        # a free slot, and no waiter of the same or a higher class that could take it instead
+        return self._can_start(user_id, plan) and not any(
+            w.priority <= priority and self._can_start(w.user_id, w.plan) for w in self._waiting
+        )
+
+    def _can_start(self, user_id: str, plan: str) -> bool:
+        if self.running >= self.max_concurrency:
+            return False
+        if self._running_by_user.get(user_id, 0) >= self.per_user_concurrency:
+            return False
+        plan_limit = self.per_plan_concurrency.get(plan)
+        return plan_limit is None or self._running_by_plan.get(plan, 0) < plan_limit
+
+    def estimated_wait(self, priority: int = INTERACTIVE) -> Optional[float]:
+        """Seconds a run of this class arriving now would wait, or None before any run finished."""
+        if self.service_seconds is None:
+            return None
+        ahead = sum(1 for w in self._waiting if w.priority <= priority)
+        # runs that must finish before this one starts, drained max_concurrency at a time
+        backlog = self.running + ahead + 1 - self.max_concurrency
+        return max(0, backlog) / self.max_concurrency * self.service_seconds
+
+    def _retry_after(self, priority: int) -> float:
+        wait = self.estimated_wait(priority)
+        return max(self.default_retry_after, wait or 0.0)
+
+    def _reject(self, priority: int, reason: str, message: str, retry_after: float) -> AdmissionRejected:
+        self._counts[priority]["rejected"] += 1
+        ADMISSION_REJECTED.inc(1, PRIORITY_NAMES[priority], reason)
+        return AdmissionRejected(message, reason, retry_after)
+
+    def check(self, user_id: str, plan: str, priority: int = INTERACTIVE):
+        """
+        Raise AdmissionRejected if a run arriving now would be turned away. Lets a streaming
+        endpoint answer 429 / 503 before it commits to a 200 response; slot() checks again.
+        """
+        priority = priority if priority in PRIORITY_NAMES else BATCH
+        outstanding = self._running_by_user.get(user_id, 0) + self._queued_by_user.get(user_id, 0)
+        if outstanding >= self.per_user_concurrency + self.per_user_queue:
+            raise self._reject(
+                priority,
+                "user_limit",
+                f"Too many plan runs in flight for user '{user_id}' ({outstanding})",
+                max(self.default_retry_after, self.service_seconds or 0.0),
+            )
+        if self._starts_now(user_id, plan, priority):
+            return
+        if len(self._waiting) >= self.max_queue:
+            raise self._reject(
+                priority, "queue_full", f"Admission queue is full ({self.max_queue} waiting)", self._retry_after(priority)
+            )
+        wait = self.estimated_wait(priority)
+        limit = self.max_queue_wait.get(priority)
+        if wait is not None and limit is not None and wait > limit:
+            raise self._reject(
+                priority,
+                "queue_wait",
+                f"Estimated queue wait {wait:.1f}s exceeds {limit:.1f}s",
+                wait,
+            )
+
+    @asynccontextmanager
+    async def slot(self, user_id: str, plan: str, priority: int = INTERACTIVE) -> AsyncIterator[None]:
+        """Hold one plan-run slot for the body; waits in the queue first, or raises AdmissionRejected."""
+        priority = priority if priority in PRIORITY_NAMES else BATCH
+        await self._acquire(user_id, plan, priority)
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self._release(user_id, plan, priority, self._clock() - started)
+
+    async def _acquire(self, user_id: str, plan: str, priority: int):
+        self.check(user_id, plan, priority)
+        now = self._clock()
+        waiter = _Waiter(priority, next(self._seq), user_id, plan, asyncio.get_running_loop().create_future())
+        self._waiting.append(waiter)
+        self._queued_by_user[user_id] = self._queued_by_user.get(user_id, 0) + 1
+        self._dispatch()
+        if not waiter.grant.done():
+            limit = self.max_queue_wait.get(priority)
+            try:
+                await asyncio.wait({waiter.grant}, timeout=limit)
+            except asyncio.CancelledError:
+                if waiter.grant.done():
+                    # granted just before the caller went away: hand the slot on
+                    self._release(user_id, plan, priority, None)
+                else:
+                    self._leave_queue(waiter)
+                self._counts[priority]["cancelled_queued"] += 1
+                raise
+            if not waiter.grant.done():
+                self._leave_queue(waiter)
+                raise self._reject(
+                    priority,
+                    "queue_timeout",
+                    f"No plan-run slot within {limit:.1f}s",
+                    self._retry_after(priority),
+                )
+        waited = self._clock() - now
+        self._waits[priority].append(waited)
+        ADMISSION_WAIT_SECONDS.observe(waited, PRIORITY_NAMES[priority])
+
+    def _leave_queue(self, waiter: _Waiter):
+        waiter.grant.cancel()
+        self._waiting.remove(waiter)
+        self._queued_by_user[waiter.user_id] -= 1
+        if not self._queued_by_user[waiter.user_id]:
+            del self._queued_by_user[waiter.user_id]
+
+    def _dispatch(self):
+        """Grant free slots to the best eligible waiters: priority class, fewest running for the user, arrival."""
+        while self._waiting and self.running < self.max_concurrency:
+            best = None
+            for waiter in self._waiting:
+                if not self._can_start(waiter.user_id, waiter.plan):
+                    continue
+                rank = (waiter.priority, self._running_by_user.get(waiter.user_id, 0), waiter.seq)
+                if best is None or rank < best[0]:
+                    best = (rank, waiter)
+            if best is None:
+                return
+            waiter = best[1]
+            self._waiting.remove(waiter)
+            self._queued_by_user[waiter.user_id] -= 1
+            if not self._queued_by_user[waiter.user_id]:
+                del self._queued_by_user[waiter.user_id]
+            self.running += 1
+            self._running_by_user[waiter.user_id] = self._running_by_user.get(waiter.user_id, 0) + 1
+            self._running_by_plan[waiter.plan] = self._running_by_plan.get(waiter.plan, 0) + 1
+            self._counts[waiter.priority]["admitted"] += 1
+            waiter.grant.set_result(None)
+
+    def _release(self, user_id: str, plan: str, priority: int, elapsed: Optional[float]):
+        self.running -= 1
+        for counts, key in ((self._running_by_user, user_id), (self._running_by_plan, plan)):
+            counts[key] -= 1
+            if not counts[key]:
+                del counts[key]
+        if elapsed is not None:
+            self._counts[priority]["completed"] += 1
+            self.service_seconds = elapsed if self.service_seconds is None else 0.8 * self.service_seconds + 0.2 * elapsed
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for waiter in self._waiting:
+            queued[PRIORITY_NAMES[waiter.priority]] += 1
+        classes = {}
+        for priority, name in PRIORITY_NAMES.items():
+            waits = sorted(self._waits[priority])
+            classes[name] = dict(
+                self._counts[priority],
+                queued=queued[name],
+                queue_ms_p50=percentile_ms(waits, 0.50),
+                queue_ms_p95=percentile_ms(waits, 0.95),
+                queue_ms_max=percentile_ms(waits, 1.0),
+            )
+        return {
+            "running": self.running,
+            "queued": len(self._waiting),
+            "users_active": len(set(self._running_by_user) | set(self._queued_by_user)),
+            "service_ms": round(self.service_seconds * 1000, 1) if self.service_seconds is not None else None,
+            "estimated_wait_ms": round((self.estimated_wait(INTERACTIVE) or 0.0) * 1000, 1),
+            "classes": classes,
+        }
@@ -1,15 +1,37 @@
 # src/text_to_sql_agents/magentic_orchestration/agent_registry.py
+import time
 from typing import Any, Callable, Dict, Optional
 from loguru import logger
 
 from .adapters.semantic_kernel_adapter import SemanticKernelAdapter
 from .adapters.azure_foundry_adapter import AzureFoundryAdapter
 from .adapters.sql_adapter import SQLAdapter
+from .caching import LRUTTLCache
+from .cost_gate import CostGate
+from .cost_tracking import record_cost
+from .llm_batching import GenerationBatcher, grouping_requested
+from .metrics import AGENT_SECONDS, DB_QUERY_SECONDS
+from .plan_events import current_step, current_stream
+from .retry_policy import DETERMINISTIC, classify_error
+from .schema_index import SchemaIndex, render_schema
+from .single_flight import SingleFlight, flight_key
+from .sql_cache import SemanticSQLCache
+from .tracing import span
+from ..models.config_models import SchemaIndexSettings
+from ..models.result_set import ColumnarResult
+from ..utils.sql_guard import GuardrailEngine
+from ..utils.sql_validator import SQLValidationFailed, SQLValidator, format_errors
 
 
 class AgentRegistry:
     """
     Map declarative agent names used in plans to adapter functions that run them.
+    The latest schema snapshot is kept here: generate_sql / repair_sql receive only the
+    tables relevant to the question (see SchemaIndex) instead of the whole catalog.
+    Identical concurrent invocations (same agent, same payload) share one call; with a
+    GenerationBatcher, generate_sql calls made under grouped_llm_calls() share one prompt.
+    With a SemanticSQLCache, SQL that passed validate_sql answers later generate_sql calls
+    for the same normalised question.
     """
 
     def __init__(
@@ -17,10 +39,30 @@ class AgentRegistry:
         kernel_adapter: Optional[SemanticKernelAdapter] = None,
         foundry_adapter: Optional[AzureFoundryAdapter] = None,
         sql_adapter: Optional[SQLAdapter] = None,
+        sql_cache: Optional[SemanticSQLCache] = None,
+        schema_index: Optional[SchemaIndexSettings] = None,
+        guardrail: Optional[GuardrailEngine] = None,
+        max_repairs: int = 2,
+        cost_gate: Optional[CostGate] = None,
+        coalesce: bool = True,
+        batcher: Optional[GenerationBatcher] = None,
     ):
         self.kernel = kernel_adapter or SemanticKernelAdapter()
         self.foundry = foundry_adapter or AzureFoundryAdapter()
         self.sql = sql_adapter or SQLAdapter()
+        self.sql_cache = sql_cache
+        self.schema_index_settings = schema_index or SchemaIndexSettings()
+        self.guardrail = guardrail or GuardrailEngine()
+        self.max_repairs = max_repairs
+        self._validator: Optional[SQLValidator] = None
+        self.cost_gate = cost_gate or CostGate()
+        # estimates from plan_sql, picked up by execute_sql to record estimated vs actual
+        self._estimates = LRUTTLCache(max_entries=256, ttl_seconds=600)
+        self.coalesce = coalesce
+        self.flights = SingleFlight("steps")
+        self.batcher = batcher
+        self._schema_snapshot: Optional[Dict[str, Any]] = None
+        self._schema_index: Optional[SchemaIndex] = None
 
         self._mapping: Dict[str, Callable[[Dict[str, Any]], Any]] = {
             "generate_sql": self._invoke_generate_sql,
@@ -29,29 +71,85 @@ class AgentRegistry:
             "recommend_chart": self._invoke_recommend_chart,
             "guardrail_check": self._invoke_guardrail,
             "powerbi_upload": self._invoke_powerbi_upload,
+            "validate_sql": self._invoke_validate_sql,
+            "plan_sql": self._invoke_plan_sql,
             "execute_sql": self._invoke_execute_sql,
             "schema_snapshot": self._invoke_schema_snapshot,
         }
 
-    async def invoke(self, agent_name: str, payload: Dict[str, Any]) -> Any:
+    async def invoke(self, agent_name: str, payload: Dict[str, Any], refs: Optional[Dict[int, str]] = None) -> Any:
+        """
+        Run an agent on a resolved step input. `refs` (id -> fingerprint of upstream step
+        outputs) lets identical concurrent calls be matched without walking those outputs.
+        """
         func = self._mapping.get(agent_name)
         if not func:
             raise KeyError(f"Agent '{agent_name}' is not registered.")
         logger.debug(f"AgentRegistry invoking '{agent_name}' with payload keys: {list(payload.keys())}")
-        return await func(payload)
+        with AGENT_SECONDS.time(agent_name):
+            if not self.coalesce:
+                return await func(payload)
+            return await self.flights.do(flight_key(agent_name, payload, known=refs), lambda: func(payload))
+
+    def _use_schema(self, snapshot: Optional[Dict[str, Any]]):
+        # the schema store hands back the same object until the catalog changes
+        if snapshot is None or snapshot is self._schema_snapshot:
+            return
+        self._schema_snapshot = snapshot
+        # a changed snapshot invalidates SQL generated against the old schema
+        if self.sql_cache is not None:
+            self.sql_cache.set_schema(snapshot)
+        settings = self.schema_index_settings
+        tables = snapshot.get("tables", {}) if isinstance(snapshot, dict) else {}
+        self._validator = SQLValidator(snapshot) if tables else None
+        if settings.enabled and len(tables) > settings.min_tables:
+            self._schema_index = SchemaIndex(snapshot)
+            logger.info(f"Schema index built over {len(self._schema_index)} tables.")
+        else:
+            self._schema_index = None
+
+    def _schema_context(self, question: Optional[str]) -> Optional[str]:
+        """Prompt text for the tables relevant to the question; None when no schema is known."""
+        snapshot = self._schema_snapshot
+        if not isinstance(snapshot, dict) or not snapshot.get("tables"):
+            return None
+        if self._schema_index is None or not question:
+            return render_schema(snapshot)
+        settings = self.schema_index_settings
+        names = self._schema_index.select(
+            question, k=settings.top_k, hops=settings.hops, max_tables=settings.max_tables
+        )
+        logger.debug(f"Schema pruned to {len(names)} of {len(self._schema_index)} tables.")
+        return render_schema(self._schema_index.subset(names))
 
     # Semantic Kernel plugin wrappers
     async def _invoke_generate_sql(self, payload: Dict[str, Any]):
         query = payload.get("query")
-        return await self.kernel.invoke_plugin("generate_sql", query=query)
+        self._use_schema(payload.get("schema"))
+        if query and self.sql_cache is not None:
+            cached = self.sql_cache.get(query)
+            if cached is not None:
+                logger.debug("generate_sql served from semantic cache.")
+                return cached
+        schema = self._schema_context(query)
+        if self.batcher is not None and query and grouping_requested():
+            result = await self.batcher.generate(query, schema)
+        else:
+            kwargs = {"query": query}
+            if schema is not None:
+                kwargs["schema"] = schema
+            result = await self.kernel.invoke_plugin("generate_sql", **kwargs)
+        # cached by validate_sql once the statement has passed the guardrail and the schema check
+        return None if result is None else str(result)
 
     async def _invoke_repair_sql(self, payload: Dict[str, Any]):
-        return await self.kernel.invoke_plugin(
-            "repair_sql",
-            query=payload.get("query"),
-            previous_sql=payload.get("previous_sql"),
-            error=payload.get("error"),
-        )
+        query = payload.get("query")
+        self._use_schema(payload.get("schema"))
+        kwargs = {"query": query, "previous_sql": payload.get("previous_sql"), "error": payload.get("error")}
+        schema = self._schema_context(query)
+        if schema is not None:
+            kwargs["schema"] = schema
+        return await self.kernel.invoke_plugin("repair_sql", **kwargs)
 
     async def _invoke_summarize(self, payload: Dict[str, Any]):
         return await self.kernel.invoke_plugin("summarize", query=payload.get("query"), data=payload.get("data"))
@@ -59,10 +157,52 @@ class AgentRegistry:
     async def _invoke_recommend_chart(self, payload: Dict[str, Any]):
         return await self.kernel.invoke_plugin("recommend_chart", data=payload.get("data"))
 
+    async def _invoke_validate_sql(self, payload: Dict[str, Any]):
+        """
+        Check the SQL against the schema snapshot before it reaches the database.
+        Structured errors go straight to repair_sql (up to max_repairs times); every
+        repaired statement is put through the guardrail again. Returns the SQL to execute,
+        which is what the semantic cache keeps for the question.
+        """
+        sql = str(payload.get("sql") or "")
+        if payload.get("allowed") is False:
+            raise ValueError("SQL was rejected by the guardrail; not executing it.")
+        self._use_schema(payload.get("schema"))
+        query = payload.get("query")
+        if self._validator is None:
+            # no snapshot to check against; the database will tell (execute_sql evicts on failure)
+            self._cache_sql(query, sql)
+            return sql
+        for attempt in range(self.max_repairs + 1):
+            errors = self._validator.validate(sql)
+            if not errors:
+                # the statement that passed, not the one that needed repairing
+                self._cache_sql(query, sql)
+                return sql
+            logger.warning(f"SQL failed validation (attempt {attempt + 1}): {format_errors(errors)}")
+            if attempt == self.max_repairs:
+                break
+            repaired = await self._invoke_repair_sql(
+                {"query": query, "previous_sql": sql, "error": format_errors(errors)}
+            )
+            if repaired is None:
+                break
+            sql = str(repaired)
+            if not await self._invoke_guardrail({"sql": sql}):
+                raise ValueError("Repaired SQL was rejected by the guardrail.")
+        raise SQLValidationFailed(errors)
+
+    def _cache_sql(self, query: Optional[str], sql: str):
+        if query and self.sql_cache is not None:
+            self.sql_cache.put(query, sql)
+
     # Foundry / Tool wrappers
     async def _invoke_guardrail(self, payload: Dict[str, Any]):
         sql = payload.get("sql")
-        return await self.foundry.guardrail_check(sql)
+        # local verdict first; Foundry is only asked about statements the local engine cannot decide
+        available = getattr(self.foundry, "available", getattr(self.foundry, "service", None))
+        remote = self.foundry.guardrail_check if available else None
+        return await self.guardrail.check(str(sql or ""), remote=remote)
 
     async def _invoke_powerbi_upload(self, payload: Dict[str, Any]):
         pbix_bytes = payload.get("pbix_bytes")
@@ -70,9 +210,58 @@ class AgentRegistry:
         return await self.foundry.upload_powerbi_report(pbix_bytes, user_id=user_id)
 
     # SQL adapter wrappers
+    async def _invoke_plan_sql(self, payload: Dict[str, Any]):
+        """Cost gate: row limit + EXPLAIN / dry-run budget check. Returns the SQL to execute."""
+        sql = str(payload.get("sql") or "")
+        gated, cost = await self.cost_gate.gate(self.sql, sql, dialect=payload.get("dialect"))
+        if cost:
+            record_cost(**cost)
+            self._estimates.set(gated, cost.get("estimated"))
+        return gated
+
     async def _invoke_execute_sql(self, payload: Dict[str, Any]):
         sql = payload.get("sql")
-        return await self.sql.execute_query(sql)
+        started = time.perf_counter()
+        try:
+            result, actual = await self._execute(sql, payload)
+        except Exception as e:
+            query = payload.get("query")
+            # SQL the database rejects must not be served again from the semantic cache
+            cache = self.sql_cache
+            if query and cache is not None and classify_error(e) == DETERMINISTIC and cache.discard(query):
+                logger.info("Dropped cached SQL for the question after the database rejected it.")
+            raise
+        actual["duration_ms"] = (time.perf_counter() - started) * 1000
+        record_cost(estimated=self._estimates.get(sql), actual=actual)
+        return result
+
+    async def _execute(self, sql: str, payload: Dict[str, Any]):
+        if payload.get("stream"):
+            # bounded mode: first N rows + aggregates instead of the full result set
+            result = await self.sql.execute_query_bounded(sql, preview_rows=payload.get("preview_rows"))
+            actual = {"rows": result["row_count"], "truncated": result["truncated"]}
+        elif current_stream() is not None:
+            result = await self._stream_rows(sql)
+            actual = {"rows": len(result), "bytes": result.nbytes}
+        else:
+            result = await self.sql.execute_query(sql)
+            actual = {"rows": len(result), "bytes": getattr(result, "nbytes", None)}
+        return result, actual
+
+    async def _stream_rows(self, sql: str) -> ColumnarResult:
+        """Read the result batch by batch (within the streaming budgets), sending each batch to the event stream."""
+        events, step = current_stream(), current_step()
+        parts = []
+        offset = 0
+        provider = self.sql.provider or "default"
+        with span("db.stream_query", provider=provider), DB_QUERY_SECONDS.time(provider, "stream"):
+            async for batch in self.sql.stream_query(sql):
+                events.emit_rows(step, batch, offset)
+                offset += len(batch)
+                parts.append(batch)
+        return ColumnarResult.concat(parts)
 
     async def _invoke_schema_snapshot(self, payload: Dict[str, Any]):
-        return await self.sql.generate_schema_snapshot()
+        snapshot = await self.sql.generate_schema_snapshot()
+        self._use_schema(snapshot)
+        return snapshot
@@ -0,0 +1,131 @@
+# src/text_to_sql_agents/magentic_orchestration/cancellation.py
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+
+class RunCancelled(RuntimeError):
+    """The run was cancelled (client disconnected or cancel requested) before it finished."""
+
+
+class CancellationStats:
+    """
+    Process-wide counters of work given up because its caller went away (or asked to stop):
+    - plans / steps: runs and plan steps cancelled while running, with the time they had used
+    - steps_skipped: steps that never started because their plan was cancelled
+    - db_statements: statements aborted by a driver-level cancel (or natively by an async driver)
+    - llm_calls: LLM calls abandoned while queued or in flight
+    Time figures are what the cancelled work had already spent, i.e. what stopped growing.
+    """
+
+    KINDS = ("plans", "steps", "steps_skipped", "db_statements", "llm_calls")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {kind: 0 for kind in self.KINDS}
+        self._seconds: Dict[str, float] = {kind: 0.0 for kind in self.KINDS}
+        self.requests: Dict[str, int] = {"disconnected": 0, "cancel_requested": 0}
+
+    def record(self, kind: str, elapsed: float = 0.0, count: int = 1):
+        if kind not in self._counts:
+            raise KeyError(f"Unknown cancellation kind '{kind}'")
+        with self._lock:
+            self._counts[kind] += count
+            self._seconds[kind] += elapsed
+
+    def record_request(self, reason: str):
+        with self._lock:
+            self.requests[reason] = self.requests.get(reason, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": dict(self.requests),
+                **{
+                    kind: {"count": self._counts[kind], "elapsed_ms": round(self._seconds[kind] * 1000, 1)}
+                    for kind in self.KINDS
+                },
+            }
+
+
+CANCELLATIONS = CancellationStats()
+
+
+def record_cancelled(kind: str, elapsed: float = 0.0, count: int = 1):
+    CANCELLATIONS.record(kind, elapsed, count)
+
+
+def cancellation_stats() -> Dict[str, Any]:
+    return CANCELLATIONS.stats()
+
+
+class RunRegistry:
+    """
+    In-flight HTTP runs by run id, so POST /query/{run_id}/cancel can reach the task
+    running the plan. Cancelling the task cancels its whole tree: step tasks, the
+    statements they are waiting on and queued / in-flight LLM calls.
+    """
+
+    def __init__(self):
+        self._runs: Dict[str, Dict[str, Any]] = {}
+
+    def register(self, run_id: str, task: asyncio.Future, kind: str = "query"):
+        if run_id in self._runs:
+            raise ValueError(f"Run '{run_id}' is already in flight")
+        self._runs[run_id] = {"task": task, "kind": kind, "started": time.monotonic()}
+        task.add_done_callback(lambda _: self._runs.pop(run_id, None))
+
+    def __contains__(self, run_id: str) -> bool:
+        return run_id in self._runs
+
+    def cancel(self, run_id: str, reason: str = "cancel_requested") -> bool:
+        run = self._runs.get(run_id)
+        if run is None or run["task"].done():
+            return False
+        logger.info(f"Cancelling run '{run_id}' ({reason}).")
+        CANCELLATIONS.record_request(reason)
+        run["task"].cancel()
+        return True
+
+    def active(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {"run_id": run_id, "kind": run["kind"], "running_ms": round((now - run["started"]) * 1000, 1)}
+            for run_id, run in self._runs.items()
+        ]
+
+
+async def cancel_on_disconnect(
+    task: asyncio.Future,
+    is_disconnected: Callable[[], Awaitable[bool]],
+    poll_seconds: float = 0.25,
+    run_id: Optional[str] = None,
+) -> Any:
+    """
+    Await `task`, checking every `poll_seconds` whether the client is still there;
+    cancel the task once it is not. Raises RunCancelled when the task ended cancelled
+    (disconnect or RunRegistry.cancel). If the awaiting request handler is itself
+    cancelled (some servers do that on disconnect), the task is cancelled too.
+    """
+    disconnected = False
+    try:
+        while not task.done():
+            await asyncio.wait([task], timeout=poll_seconds)
+            if not task.done() and await is_disconnected():
+                logger.info(f"Client disconnected; cancelling run '{run_id}'.")
+                CANCELLATIONS.record_request("disconnected")
+                disconnected = True
+                task.cancel()
+                break
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if not (disconnected or task.cancelled()):
+                raise
+        raise RunCancelled(f"Run '{run_id}' was cancelled")
+    finally:
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,299 @@
+# src/text_to_sql_agents/magentic_orchestration/cassette.py
+import asyncio
+import builtins
+import gzip
+import json
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type
+
+import numpy as np
+from loguru import logger
+
+from .deadline import DeadlineExceeded
+from .llm_scheduler import LLMThrottled, retry_after_seconds, usage_tokens
+from .retry_policy import DEADLINE, DETERMINISTIC, THROTTLED, TIMEOUT, TRANSIENT, classify_error
+from .step_store import input_digest
+from ..models.config_models import CassetteSettings
+from ..models.result_set import ColumnarResult, is_dataframe
+
+
+CASSETTE_VERSION = 1
+MODES = ("off", "record", "replay")
+
+
+class CassetteMiss(KeyError):
+    """Replay found no recorded response for the call; like an unknown plugin, retrying will not help."""
+
+
+class ReplayedResult:
+    """Recorded LLM output that was not plain data (e.g. an SK FunctionResult): its text and token usage."""
+
+    __slots__ = ("text", "metadata")
+
+    def __init__(self, text: str, usage: Optional[int] = None):
+        self.text = text
+        self.metadata = {"usage": {"total_tokens": usage}} if usage is not None else {}
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        return f"ReplayedResult({self.text[:60]!r})"
+
+
+# base of a stand-in for a recorded error class that cannot be rebuilt, by its error class
+_REPLAY_BASES: Dict[Optional[str], Type[Exception]] = {
+    TRANSIENT: ConnectionError,
+    TIMEOUT: TimeoutError,
+    THROTTLED: LLMThrottled,
+    DETERMINISTIC: ValueError,
+    DEADLINE: DeadlineExceeded,
+}
+_ERROR_TYPES: Dict[Tuple[str, Optional[str]], Type[Exception]] = {}
+
+
+def _encode_error(exc: Exception) -> Dict[str, Any]:
+    error: Dict[str, Any] = {
+        "type": type(exc).__name__,
+        "message": str(exc),
+        "args": _jsonable(list(exc.args)),
+        "class": classify_error(exc),
+    }
+    retry_after = retry_after_seconds(exc)
+    if retry_after is not None:
+        error["retry_after"] = retry_after
+    return error
+
+
+def _replayed_error(error: Dict[str, Any]) -> Exception:
+    """
+    The recorded error, raised again so classify_error() and the retry policies treat it as
+    they did when it was recorded: built-in exceptions as their own type, anything else as a
+    stand-in of the same name whose base (and 429 status / Retry-After) gives the recorded class.
+    """
+    type_name = error.get("type") or "RuntimeError"
+    message = error.get("message", "")
+    error_class = error.get("class")
+    builtin = getattr(builtins, type_name, None)
+    if isinstance(builtin, type) and issubclass(builtin, Exception):
+        try:
+            exc = builtin(*error["args"]) if "args" in error else builtin(message)
+        except TypeError:
+            exc = builtin(message)
+        if error_class is None or classify_error(exc) == error_class:
+            return exc
+    cls = _ERROR_TYPES.get((type_name, error_class))
+    if cls is None:
+        base = _REPLAY_BASES.get(error_class, RuntimeError)
+        cls = _ERROR_TYPES[(type_name, error_class)] = type(type_name, (base,), {"__module__": __name__})
+    exc = cls(message)
+    if error.get("retry_after") is not None:
+        # read back by retry_after_seconds(), like the provider's HTTP 429
+        exc.status_code = 429
+        exc.headers = {"retry-after-ms": str(float(error["retry_after"]) * 1000)}
+    return exc
+
+
+def _jsonable(value: Any) -> Any:
+    """Readable copy of a call argument for the cassette; result sets and payloads are summarised."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, ColumnarResult):
+        return {"columns": value.columns, "row_count": len(value)}
+    if is_dataframe(value):
+        return {"columns": [str(c) for c in value.columns], "row_count": len(value)}
+    if isinstance(value, (bytes, bytearray, np.ndarray)):
+        return {"bytes": len(value) if not isinstance(value, np.ndarray) else value.nbytes}
+    return str(value)[:500]
+
+
+def _encode_response(result: Any) -> Dict[str, Any]:
+    if result is None or isinstance(result, (bool, int, float, str)):
+        return {"value": result}
+    if isinstance(result, (dict, list)):
+        try:
+            json.dumps(result)
+            return {"value": result}
+        except (TypeError, ValueError):
+            pass
+    encoded: Dict[str, Any] = {"text": str(result)}
+    used = usage_tokens(result)
+    if used is not None:
+        encoded["usage"] = used
+    return encoded
+
+
+def _decode_response(encoded: Dict[str, Any]) -> Any:
+    if "value" in encoded:
+        return encoded["value"]
+    return ReplayedResult(encoded.get("text", ""), encoded.get("usage"))
+
+
+class Cassette:
+    """
+    Records LLM / Foundry calls to a gzipped JSON-lines file, or serves them back from it:
+    - record: every call goes to the service; its arguments (prompt), response or error
+      and observed latency are appended to the file
+    - replay: calls are answered from the file by a hash of (kind, name, arguments), without
+      touching the network. A prompt recorded several times replays its responses in order
+      (cycling once exhausted), errors included, so throttling / failure sequences come back too.
+      The recorded latency is slept scaled by `latency_scale` (1 = as recorded, 0.1 = ten
+      times faster, 0 = no delay). A call that was never recorded fails with CassetteMiss,
+      or with on_miss "live" is made for real.
+    Arguments named in `ignore_args` (e.g. the schema text a new build prunes differently)
+    are kept in the file but left out of the hash.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = "replay",
+        record_prompts: bool = True,
+        ignore_args: Optional[List[str]] = None,
+        latency_scale: float = 1.0,
+        on_miss: str = "error",
+        flush_every: int = 100,
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode '{mode}' (expected record or replay)")
+        if on_miss not in ("error", "live"):
+            raise ValueError(f"Unknown cassette on_miss '{on_miss}' (expected error or live)")
+        self.path = Path(path)
+        self.mode = mode
+        self.record_prompts = record_prompts
+        self.ignore_args = frozenset(ignore_args or ())
+        self.latency_scale = max(0.0, latency_scale)
+        self.on_miss = on_miss
+        self.flush_every = max(1, flush_every)
+        self._file = None
+        self._unflushed = 0
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._position: Dict[str, int] = {}
+        self.recorded = 0
+        self.hits = 0
+        self.misses = 0
+        if mode == "replay":
+            self._load()
+
+    @classmethod
+    def from_settings(cls, settings: Optional[CassetteSettings]) -> Optional["Cassette"]:
+        if settings is None or settings.mode == "off":
+            return None
+        return cls(
+            settings.path,
+            mode=settings.mode,
+            record_prompts=settings.record_prompts,
+            ignore_args=settings.ignore_args,
+            latency_scale=settings.latency_scale,
+            on_miss=settings.on_miss,
+        )
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def key(self, kind: str, name: str, args: Dict[str, Any]) -> str:
+        keyed = {k: v for k, v in args.items() if k not in self.ignore_args}
+        return input_digest([kind, name, keyed])
+
+    def _load(self):
+        if not self.path.exists():
+            raise FileNotFoundError(f"Cassette not found: {self.path}")
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if "key" in entry:
+                    self._entries.setdefault(entry["key"], []).append(entry)
+        logger.info(
+            f"Cassette '{self.path}': {sum(map(len, self._entries.values()))} recorded calls "
+            f"({len(self._entries)} distinct) loaded for replay."
+        )
+
+    async def call(self, kind: str, name: str, args: Dict[str, Any], live: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `live()` (recording it), or answer the call from the cassette, depending on the mode."""
+        key = self.key(kind, name, args)
+        if self.replaying:
+            entries = self._entries.get(key)
+            if entries:
+                self.hits += 1
+                return await self._replay(entries, key)
+            self.misses += 1
+            if self.on_miss == "error":
+                raise CassetteMiss(f"No recorded {kind} call '{name}' for these arguments (key {key[:12]})")
+            return await live()
+
+        started = time.perf_counter()
+        try:
+            result = await live()
+        except Exception as e:
+            self._record(kind, name, key, args, started, error=_encode_error(e))
+            raise
+        self._record(kind, name, key, args, started, response=_encode_response(result))
+        return result
+
+    async def _replay(self, entries: List[Dict[str, Any]], key: str) -> Any:
+        position = self._position.get(key, 0)
+        self._position[key] = position + 1
+        entry = entries[position % len(entries)]
+        delay = entry.get("latency_ms", 0.0) / 1000.0 * self.latency_scale
+        if delay > 0:
+            await asyncio.sleep(delay)
+        error = entry.get("error")
+        if error is not None:
+            raise _replayed_error(error)
+        return _decode_response(entry.get("response") or {})
+
+    def _record(
+        self,
+        kind: str,
+        name: str,
+        key: str,
+        args: Dict[str, Any],
+        started: float,
+        response: Optional[Dict[str, Any]] = None,
+        error: Optional[Dict[str, Any]] = None,
+    ):
+        entry: Dict[str, Any] = {
+            "kind": kind,
+            "name": name,
+            "key": key,
+            "ts": round(time.time(), 3),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        if self.record_prompts:
+            entry["args"] = _jsonable(args)
+        if error is not None:
+            entry["error"] = error
+        else:
+            entry["response"] = response
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # appending adds a gzip member; readers see one continuous stream
+            self._file = gzip.open(self.path, "at", encoding="utf-8")
+            self._file.write(json.dumps({"cassette": CASSETTE_VERSION, "started": entry["ts"]}) + "\n")
+        self._file.write(json.dumps(entry, separators=(",", ":"), default=str) + "\n")
+        self.recorded += 1
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self._file.flush()
+            self._unflushed = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._unflushed = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "recorded": self.recorded,
+            "hits": self.hits,
+            "misses": self.misses,
+            "distinct_calls": len(self._entries),
+        }
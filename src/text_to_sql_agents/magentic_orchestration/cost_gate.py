@@ -0,0 +1,95 @@
+# src/text_to_sql_agents/magentic_orchestration/cost_gate.py
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from .adapters.sql_adapter import SQLAdapter
+from ..models.config_models import CostGateSettings
+from ..models.sql_models import SQLQuery
+from ..utils.sql_rewrite import apply_row_limit, dialect_for_backend
+
+
+class CostBudgetExceeded(RuntimeError):
+    """The planner estimate is over budget and the query could not be rewritten under it."""
+
+    def __init__(self, reasons: List[str], estimate: Optional[Dict[str, Any]]):
+        super().__init__(f"Query rejected by cost gate: {'; '.join(reasons)}")
+        self.reasons = reasons
+        self.estimate = estimate
+
+
+class CostGate:
+    """
+    Planning stage in front of execute_sql:
+    - injects a dialect-correct LIMIT / TOP (from SQLQuery.dialect) when the query has none
+    - asks the provider for an estimate (EXPLAIN / dry run) without running the query
+    - over budget: with on_exceed "limit", tightens the row limit and re-estimates;
+      still over (or "reject"), raises CostBudgetExceeded
+    Providers without an estimator pass through with only the row limit applied.
+    """
+
+    def __init__(self, settings: Optional[CostGateSettings] = None):
+        self.settings = settings or CostGateSettings()
+        if self.settings.on_exceed not in ("limit", "reject"):
+            raise ValueError(f"Unknown cost_gate.on_exceed: {self.settings.on_exceed}")
+        self.rejected = 0
+        self.rewritten = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.enabled
+
+    def over_budget(self, estimate: Optional[Dict[str, Any]]) -> List[str]:
+        if not estimate:
+            return []
+        s = self.settings
+        reasons = []
+        for field, budget in (
+            ("rows_scanned", s.max_rows_scanned),
+            ("bytes_scanned", s.max_bytes_scanned),
+            ("plan_cost", s.max_plan_cost),
+        ):
+            value = estimate.get(field)
+            if budget is not None and value is not None and value > budget:
+                reasons.append(f"estimated {field} {value:,.0f} > budget {budget:,.0f}")
+        return reasons
+
+    @staticmethod
+    async def _estimate(sql_adapter: SQLAdapter, sql: str) -> Optional[Dict[str, Any]]:
+        try:
+            return await sql_adapter.estimate_cost(sql)
+        except Exception as e:
+            # an estimate we cannot get is not a reason to refuse the query
+            logger.warning(f"Cost estimate failed, executing without one: {e}")
+            return None
+
+    async def gate(
+        self, sql_adapter: SQLAdapter, sql: str, dialect: Optional[str] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Returns the SQL to execute and the cost record (estimate, limit applied, dialect)."""
+        if not self.enabled:
+            return sql, {}
+        s = self.settings
+        query = SQLQuery(text=sql, dialect=dialect or dialect_for_backend(sql_adapter.dialect))
+        limit_applied = None
+        if s.row_limit:
+            query, changed = apply_row_limit(query, s.row_limit)
+            limit_applied = s.row_limit if changed else None
+
+        estimate = await self._estimate(sql_adapter, query.text)
+        reasons = self.over_budget(estimate)
+        if reasons and s.on_exceed == "limit":
+            tighter, changed = apply_row_limit(query, s.fallback_limit)
+            if changed:
+                retry = await self._estimate(sql_adapter, tighter.text)
+                if not self.over_budget(retry):
+                    logger.info(f"Cost gate: over budget ({'; '.join(reasons)}), limited to {s.fallback_limit} rows.")
+                    self.rewritten += 1
+                    query, estimate, reasons, limit_applied = tighter, retry, [], s.fallback_limit
+        if reasons:
+            self.rejected += 1
+            raise CostBudgetExceeded(reasons, estimate)
+        return query.text, {"estimated": estimate, "limit_applied": limit_applied, "dialect": query.dialect}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "rejected": self.rejected, "rewritten": self.rewritten}
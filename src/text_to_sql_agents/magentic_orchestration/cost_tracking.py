@@ -0,0 +1,25 @@
+# src/text_to_sql_agents/magentic_orchestration/cost_tracking.py
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+
+# Cost record of the plan step currently running in this task; set by the controller.
+_STEP_COST: ContextVar[Optional[Dict[str, Any]]] = ContextVar("step_cost", default=None)
+
+
+def begin_step_cost():
+    """Start an empty cost record for the current step; returns the token for end_step_cost()."""
+    return _STEP_COST.set({})
+
+
+def end_step_cost(token) -> Dict[str, Any]:
+    record = _STEP_COST.get() or {}
+    _STEP_COST.reset(token)
+    return record
+
+
+def record_cost(**fields: Any):
+    """Attach cost fields (estimated / actual / limit_applied ...) to the running step, if any."""
+    record = _STEP_COST.get()
+    if record is not None:
+        record.update(fields)
@@ -0,0 +1,60 @@
+# src/text_to_sql_agents/magentic_orchestration/deadline.py
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Optional
+
+
+class DeadlineExceeded(RuntimeError):
+    """The plan-wide deadline passed; raised instead of starting (or continuing) work."""
+
+
+class StepTimeout(asyncio.TimeoutError):
+    """A step attempt ran past its own timeout_ms."""
+
+
+# Monotonic time by which the running plan must finish; set by the controller, read by adapters.
+_DEADLINE: ContextVar[Optional[float]] = ContextVar("plan_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Run the block under a deadline `seconds` from now; a tighter enclosing deadline wins."""
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _DEADLINE.get()
+    token = _DEADLINE.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the plan deadline; None when no deadline is set."""
+    deadline = _DEADLINE.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+async def within_deadline(awaitable: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """
+    Await with the tighter of `timeout` and the plan deadline. Raises DeadlineExceeded when the
+    deadline is what ran out, StepTimeout when `timeout` was.
+    """
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("Plan deadline exceeded")
+    limit = timeout if remaining is None else (remaining if timeout is None else min(timeout, remaining))
+    if limit is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, limit)
+    except asyncio.TimeoutError as e:
+        if timeout is None or (remaining is not None and remaining <= timeout):
+            raise DeadlineExceeded("Plan deadline exceeded") from e
+        raise StepTimeout(f"Timed out after {timeout:.3f}s") from e
@@ -0,0 +1,108 @@
+# src/text_to_sql_agents/magentic_orchestration/input_resolver.py
+import re
+from typing import Any, Callable, Dict, List, Set, Union
+
+
+Resolver = Callable[[Dict[str, Any]], Any]
+
+_TOKEN_RE = re.compile(r"\$\{([^}]*)\}")
+_MISSING = object()
+
+
+def extract_references(raw: Any) -> Set[str]:
+    """Return the root names of every ${root.path} token found in a step input."""
+    refs: Set[str] = set()
+    if isinstance(raw, dict):
+        for v in raw.values():
+            refs |= extract_references(v)
+    elif isinstance(raw, list):
+        for v in raw:
+            refs |= extract_references(v)
+    elif isinstance(raw, str):
+        for token in _TOKEN_RE.findall(raw):
+            refs.add(token.split(".", 1)[0].strip())
+    return refs
+
+
+def get_from_context(token: str, context: Dict[str, Any]) -> Any:
+    parts = token.split(".")
+    cur = context
+    for p in parts:
+        if isinstance(cur, dict) and p in cur:
+            cur = cur[p]
+        else:
+            raise KeyError(f"Context token '{token}' not found")
+    return cur
+
+
+def _lookup(token: str) -> Resolver:
+    parts = tuple(p.strip() for p in token.split("."))
+
+    def resolve(context: Dict[str, Any]) -> Any:
+        cur: Any = context
+        for p in parts:
+            if isinstance(cur, dict) and p in cur:
+                cur = cur[p]
+            else:
+                return _MISSING
+        return cur
+
+    return resolve
+
+
+def compile_input(raw: Any) -> Resolver:
+    """
+    Compile a step input into a resolver closure, once, at plan load time.
+
+    - "${a.b}" as the whole value resolves to the referenced object itself (no copy, no str());
+      a missing reference resolves to None
+    - "text ${a.b} text" is a real template and renders to a string; missing tokens render empty
+    - dicts/lists without any token are returned as-is on every call
+    """
+    if isinstance(raw, dict):
+        compiled = {k: compile_input(v) for k, v in raw.items()}
+        if not extract_references(raw):
+            return lambda context: raw
+        return lambda context: {k: r(context) for k, r in compiled.items()}
+
+    if isinstance(raw, list):
+        compiled_items = [compile_input(v) for v in raw]
+        if not extract_references(raw):
+            return lambda context: raw
+        return lambda context: [r(context) for r in compiled_items]
+
+    if not isinstance(raw, str) or "${" not in raw:
+        return lambda context: raw
+
+    whole = _TOKEN_RE.fullmatch(raw.strip())
+    if whole:
+        lookup = _lookup(whole.group(1))
+
+        def resolve_reference(context: Dict[str, Any]) -> Any:
+            value = lookup(context)
+            return None if value is _MISSING else value
+
+        return resolve_reference
+
+    parts: List[Union[str, Resolver]] = []
+    pos = 0
+    for m in _TOKEN_RE.finditer(raw):
+        if m.start() > pos:
+            parts.append(raw[pos : m.start()])
+        parts.append(_lookup(m.group(1)))
+        pos = m.end()
+    if pos < len(raw):
+        parts.append(raw[pos:])
+
+    def render(context: Dict[str, Any]) -> str:
+        out = []
+        for part in parts:
+            if isinstance(part, str):
+                out.append(part)
+                continue
+            value = part(context)
+            if value is not _MISSING:
+                out.append(str(value))
+        return "".join(out)
+
+    return render
@@ -0,0 +1,150 @@
+# src/text_to_sql_agents/magentic_orchestration/llm_batching.py
+import asyncio
+import json
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+# Set by callers that issue many questions at once (/query/batch); inherited by the tasks they start.
+_GROUP_LLM_CALLS: ContextVar[bool] = ContextVar("group_llm_calls", default=False)
+
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+
+
+@contextmanager
+def grouped_llm_calls(enabled: bool = True):
+    """Within this block, generate_sql calls may be grouped with concurrent ones."""
+    token = _GROUP_LLM_CALLS.set(enabled)
+    try:
+        yield
+    finally:
+        _GROUP_LLM_CALLS.reset(token)
+
+
+def grouping_requested() -> bool:
+    return _GROUP_LLM_CALLS.get()
+
+
+def parse_batch_output(raw: Any) -> Dict[int, str]:
+    """
+    Read the generate_sql_batch answer: a JSON list of {"id": n, "sql": "..."} (or an
+    {"n": "..."} object), optionally inside a code fence. Unusable entries are dropped.
+    """
+    text = _FENCE_RE.sub("", str(raw or ""))
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return {}
+    if isinstance(data, dict):
+        data = [{"id": k, "sql": v} for k, v in data.items()]
+    out: Dict[int, str] = {}
+    for item in data if isinstance(data, list) else []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            idx = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        sql = item.get("sql")
+        if isinstance(sql, str) and sql.strip():
+            out[idx] = sql.strip()
+    return out
+
+
+class GenerationBatcher:
+    """
+    Groups generate_sql calls that arrive within `window_ms` of each other into one
+    generate_sql_batch prompt (up to `max_group_size` questions).
+    - questions the batch answer leaves out, or a failed batch call, fall back to
+      one generate_sql call each
+    - if the backend has no generate_sql_batch skill, grouping switches itself off
+    """
+
+    def __init__(self, kernel: Any, max_group_size: int = 8, window_ms: float = 20):
+        self.kernel = kernel
+        self.max_group_size = max(1, max_group_size)
+        self.window = window_ms / 1000.0
+        self.available = True
+        self._pending: List[Tuple[str, Optional[str], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.batches = 0
+        self.grouped = 0
+        self.fallbacks = 0
+
+    async def generate(self, query: str, schema: Optional[str] = None) -> Any:
+        if not self.available or self.max_group_size == 1:
+            return await self._single(query, schema)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, schema, future))
+        if len(self._pending) >= self.max_group_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        group, self._pending = self._pending, []
+        if group:
+            asyncio.ensure_future(self._run(group))
+
+    async def _single(self, query: str, schema: Optional[str]) -> Any:
+        kwargs = {"query": query}
+        if schema is not None:
+            kwargs["schema"] = schema
+        return await self.kernel.invoke_plugin("generate_sql", **kwargs)
+
+    async def _resolve(self, future: asyncio.Future, query: str, schema: Optional[str]):
+        try:
+            result = await self._single(query, schema)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    async def _run(self, group: List[Tuple[str, Optional[str], asyncio.Future]]):
+        live = [item for item in group if not item[2].done()]
+        answers: Dict[int, str] = {}
+        if len(live) > 1 and self.available:
+            items = [{"id": i, "question": q, "schema": s or ""} for i, (q, s, _) in enumerate(live)]
+            try:
+                raw = await self.kernel.invoke_plugin("generate_sql_batch", items=json.dumps(items))
+                answers = parse_batch_output(raw)
+                self.batches += 1
+            except KeyError:
+                logger.warning("generate_sql_batch is not available; generating SQL one question at a time.")
+                self.available = False
+            except Exception as e:
+                logger.warning(f"Grouped generate_sql call failed, falling back per question: {e}")
+
+        retry = []
+        for i, (query, schema, future) in enumerate(live):
+            if future.done():
+                continue
+            if i in answers:
+                self.grouped += 1
+                future.set_result(answers[i])
+            else:
+                if len(live) > 1:
+                    self.fallbacks += 1
+                retry.append(self._resolve(future, query, schema))
+        if retry:
+            await asyncio.gather(*retry)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "available": self.available,
+            "batches": self.batches,
+            "grouped": self.grouped,
+            "fallbacks": self.fallbacks,
+            "pending": len(self._pending),
+        }
@@ -0,0 +1,331 @@
+# src/text_to_sql_agents/magentic_orchestration/llm_scheduler.py
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from loguru import logger
+
+
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+# Priority of LLM calls made from this task; /query/batch lowers it for everything it starts.
+_PRIORITY: ContextVar[int] = ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: int):
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+class LLMQueueFull(RuntimeError):
+    """Backpressure: the scheduler queue is at max_queue."""
+
+
+class LLMThrottled(RuntimeError):
+    """The provider kept answering 429 after max_throttle_retries waits."""
+
+
+def _parse_retry_after(headers: Any) -> Optional[float]:
+    if not headers:
+        return None
+    ms = headers.get("retry-after-ms")
+    if ms:
+        try:
+            return float(ms) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after_seconds(exc: BaseException, default: float = 1.0) -> Optional[float]:
+    """
+    Seconds to back off if `exc` (or an exception it wraps) is a 429, else None.
+    Understands httpx / openai errors (.response.status_code, .response.headers) and
+    errors carrying .status_code / .headers directly; honours retry-after-ms and
+    retry-after (seconds or HTTP date).
+    """
+    seen = 0
+    while exc is not None and seen < 6:
+        response = getattr(exc, "response", None)
+        status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+        if status == 429:
+            headers = getattr(response, "headers", None) or getattr(exc, "headers", None)
+            delay = _parse_retry_after(headers)
+            return default if delay is None else delay
+        exc = exc.__cause__ or exc.__context__
+        seen += 1
+    return None
+
+
+def estimate_tokens(kwargs: Dict[str, Any], max_output_tokens: int) -> int:
+    """Rough prompt size (4 characters per token) plus the completion allowance."""
+    chars = sum(len(str(v)) for v in kwargs.values() if v is not None)
+    return chars // 4 + max_output_tokens
+
+
+def usage_tokens(result: Any) -> Optional[int]:
+    """total_tokens reported with a completion (SK FunctionResult metadata or a raw response), if any."""
+    usage = None
+    metadata = getattr(result, "metadata", None)
+    if isinstance(metadata, dict):
+        usage = metadata.get("usage")
+    elif isinstance(result, dict):
+        usage = result.get("usage")
+    if isinstance(usage, dict):
+        total = usage.get("total_tokens")
+    else:
+        total = getattr(usage, "total_tokens", None)
+    return int(total) if isinstance(total, (int, float)) else None
+
+
+def percentile_ms(sorted_seconds: List[float], q: float) -> float:
+    if not sorted_seconds:
+        return 0.0
+    index = min(len(sorted_seconds) - 1, int(q * len(sorted_seconds)))
+    return round(sorted_seconds[index] * 1000, 1)
+
+
+class TokenBucket:
+    """Refills `per_period` units every `period_seconds`, continuously; holds at most one period's worth."""
+
+    def __init__(self, per_period: float, period_seconds: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(per_period)
+        self.rate = self.capacity / period_seconds
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)  # an oversized request waits for a full bucket, not forever
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        """Charge (or refund, when negative) the difference between estimated and actual use."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class LLMScheduler:
+    """
+    Central gate for LLM calls:
+    - requests-per-minute and tokens-per-minute token buckets; a call is dispatched once
+      both can cover it (token estimate first, corrected with reported usage afterwards)
+    - strict priority between classes (interactive before batch), FIFO within a class
+    - a 429 pauses all dispatch for its Retry-After and the call is queued again
+      (up to max_throttle_retries), instead of every caller retrying on its own
+    - backpressure: submit() raises LLMQueueFull once max_queue calls are waiting
+    - a caller cancelled while queued leaves the queue without using budget
+    - stats(): queue depth, queue-time percentiles per class, throttle and cancel counters
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_queue: int = 1000,
+        max_throttle_retries: int = 5,
+        default_retry_after: float = 1.0,
+        max_output_tokens: int = 800,
+        period_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._clock = clock
+        self.rpm = TokenBucket(requests_per_minute, period_seconds, clock) if requests_per_minute else None
+        self.tpm = TokenBucket(tokens_per_minute, period_seconds, clock) if tokens_per_minute else None
+        self.max_queue = max_queue
+        self.max_throttle_retries = max_throttle_retries
+        self.default_retry_after = default_retry_after
+        self.max_output_tokens = max_output_tokens
+        self._queue: List[list] = []
+        self._seq = itertools.count()
+        self._pause_until = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._waits: Dict[int, Deque[float]] = {p: deque(maxlen=2048) for p in PRIORITY_NAMES}
+        self._counts: Dict[int, Dict[str, int]] = {
+            p: {"submitted": 0, "completed": 0, "failed": 0, "cancelled_queued": 0, "cancelled_in_flight": 0}
+            for p in PRIORITY_NAMES
+        }
+        self.throttled = 0
+        self.rejected = 0
+        self.in_flight = 0
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional["LLMScheduler"]:
+        if settings is None or not settings.enabled:
+            return None
+        return cls(
+            requests_per_minute=settings.requests_per_minute,
+            tokens_per_minute=settings.tokens_per_minute,
+            max_queue=settings.max_queue,
+            max_throttle_retries=settings.max_throttle_retries,
+            default_retry_after=settings.default_retry_after_seconds,
+            max_output_tokens=settings.max_output_tokens,
+        )
+
+    async def submit(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        tokens: Optional[int] = None,
+        priority: Optional[int] = None,
+    ) -> Any:
+        """Run `call` when the budget allows; `tokens` is the estimated total token use."""
+        priority = _PRIORITY.get() if priority is None else priority
+        priority = priority if priority in self._counts else BATCH
+        tokens = self.max_output_tokens if tokens is None else tokens
+        counts = self._counts[priority]
+        counts["submitted"] += 1
+        for attempt in range(self.max_throttle_retries + 1):
+            queued_at = self._clock()
+            try:
+                await self._acquire(tokens, priority)
+            except asyncio.CancelledError:
+                counts["cancelled_queued"] += 1
+                raise
+            self._waits[priority].append(self._clock() - queued_at)
+            self.in_flight += 1
+            try:
+                result = await call()
+            except asyncio.CancelledError:
+                counts["cancelled_in_flight"] += 1
+                raise
+            except Exception as e:
+                delay = retry_after_seconds(e, self.default_retry_after)
+                if delay is None:
+                    counts["failed"] += 1
+                    raise
+                self.throttled += 1
+                self._pause(delay)
+                if attempt == self.max_throttle_retries:
+                    counts["failed"] += 1
+                    raise LLMThrottled(f"LLM still throttled after {attempt + 1} attempts") from e
+                logger.warning(f"LLM call throttled; pausing dispatch for {delay:.2f}s (attempt {attempt + 1}).")
+                continue
+            finally:
+                self.in_flight -= 1
+            used = usage_tokens(result)
+            if used is not None and self.tpm is not None:
+                self.tpm.adjust(used - tokens)
+            counts["completed"] += 1
+            return result
+
+    async def _acquire(self, tokens: int, priority: int):
+        if len(self._queue) >= self.max_queue:
+            self.rejected += 1
+            raise LLMQueueFull(f"LLM queue is full ({self.max_queue} waiting)")
+        grant = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, [priority, next(self._seq), tokens, grant])
+        self._kick()
+        try:
+            await grant
+        except asyncio.CancelledError:
+            if grant.done() and not grant.cancelled():
+                # granted just before the caller went away: give the budget back
+                self._refund(tokens)
+            raise
+
+    def _kick(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+    def _pause(self, delay: float):
+        self._pause_until = max(self._pause_until, self._clock() + delay)
+        self._kick()
+
+    def _refund(self, tokens: int):
+        if self.rpm is not None:
+            self.rpm.adjust(-1)
+        if self.tpm is not None:
+            self.tpm.adjust(-tokens)
+
+    def _wait_for(self, tokens: int) -> float:
+        wait = self._pause_until - self._clock()
+        if self.rpm is not None:
+            wait = max(wait, self.rpm.wait_time(1))
+        if self.tpm is not None:
+            wait = max(wait, self.tpm.wait_time(tokens))
+        return wait
+
+    async def _dispatch(self):
+        while self._queue:
+            head = self._queue[0]
+            grant = head[3]
+            if grant.done():  # caller cancelled while queued
+                heapq.heappop(self._queue)
+                continue
+            wait = self._wait_for(head[2])
+            if wait > 0:
+                self._wakeup.clear()
+                try:
+                    # woken early by a new (possibly higher-priority) call or a new pause
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._queue)
+            if self.rpm is not None:
+                self.rpm.take(1)
+            if self.tpm is not None:
+                self.tpm.take(head[2])
+            grant.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, _, grant in self._queue:
+            if not grant.done():
+                queued[PRIORITY_NAMES[priority]] += 1
+        classes = {}
+        for priority, name in PRIORITY_NAMES.items():
+            waits = sorted(self._waits[priority])
+            classes[name] = dict(
+                self._counts[priority],
+                queued=queued[name],
+                queue_ms_p50=percentile_ms(waits, 0.50),
+                queue_ms_p95=percentile_ms(waits, 0.95),
+                queue_ms_max=percentile_ms(waits, 1.0),
+            )
+        return {
+            "in_flight": self.in_flight,
+            "queued": sum(queued.values()),
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+            "paused_for_ms": round(max(0.0, self._pause_until - self._clock()) * 1000, 1),
+            "rpm_available": round(self.rpm.tokens, 1) if self.rpm else None,
+            "tpm_available": round(self.tpm.tokens, 1) if self.tpm else None,
+            "classes": classes,
+        }
@@ -1,12 +1,34 @@
 import asyncio
+import time
 import yaml
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 from loguru import logger
 
 from .agent_registry import AgentRegistry
+from .cancellation import record_cancelled
+from .cassette import Cassette
+from .cost_gate import CostGate
+from .cost_tracking import begin_step_cost, end_step_cost
+from .deadline import DeadlineExceeded, deadline_scope, remaining_time, within_deadline
+from .input_resolver import compile_input, get_from_context
+from .llm_batching import GenerationBatcher
+from .llm_scheduler import LLMScheduler
+from .metrics import METRICS, PLAN_SECONDS, STEP_RETRIES, STEP_SECONDS, MetricsRegistry
+from .plan_events import PlanEventStream, current_stream, describe_result, enter_step
+from .plan_graph import PlanGraph
+from .retry_policy import classify_error
+from .single_flight import SingleFlight, flight_key
+from .step_store import StepStore, input_digest
+from .sql_cache import SemanticSQLCache
+from .tracing import span
+from ..models.config_models import AppConfig, BatchQuerySettings, CoalescingSettings, SchemaIndexSettings
+from ..models.result_set import ColumnarResult
+from ..utils.config_loader import database_url
+from ..utils.sql_guard import GuardrailEngine
 from .adapters.semantic_kernel_adapter import SemanticKernelAdapter
 from .adapters.azure_foundry_adapter import AzureFoundryAdapter
+from .adapters.result_cache import ResultSetCache
 from .adapters.sql_adapter import SQLAdapter
 
 
@@ -14,9 +36,19 @@ class MagenticController:
     """
     Lightweight Magentic-style controller:
       - load declarative plans (YAML)
-      - resolve inputs referencing previous step outputs (${step.key})
+      - compile step inputs once at load time; ${step.key} references pass objects by reference
       - invoke agents via AgentRegistry
-      - handle per-step retries
+      - run independent steps concurrently following the plan's dependency graph
+      - retry steps per their RetryPolicy (error classes, jittered exponential backoff,
+        per-attempt timeout) within the plan-wide deadline
+      - with a StepStore, skip steps whose result for the same input is already stored
+      - report step progress and result rows to the caller's PlanEventStream, if any
+      - coalesce identical concurrent runs (plan name + normalised inputs) into one execution
+      - stop at once when the run is cancelled: running steps are cancelled, the rest never
+        start, and the cancelled work is counted in cancellation_stats()
+      - record per-step timings, plus estimated / actual cost for steps that report one
+      - export plan / step latency, retries and its components' stats to the metrics registry,
+        and trace plans and steps as spans when tracing is on
     """
 
     def __init__(
@@ -24,12 +56,121 @@ class MagenticController:
         kernel_adapter: Optional[SemanticKernelAdapter] = None,
         foundry_adapter: Optional[AzureFoundryAdapter] = None,
         sql_adapter: Optional[SQLAdapter] = None,
+        max_concurrency: int = 4,
+        sql_cache: Optional[SemanticSQLCache] = None,
+        schema_index: Optional[SchemaIndexSettings] = None,
+        guardrail: Optional[GuardrailEngine] = None,
+        max_repairs: int = 2,
+        cost_gate: Optional[CostGate] = None,
+        coalescing: Optional[CoalescingSettings] = None,
+        batch: Optional[BatchQuerySettings] = None,
+        llm_scheduler: Optional[LLMScheduler] = None,
+        step_store: Optional[StepStore] = None,
+        cassette: Optional[Cassette] = None,
     ):
-        self.kernel = kernel_adapter or SemanticKernelAdapter()
-        self.foundry = foundry_adapter or AzureFoundryAdapter()
+        # the scheduler and cassette apply to the default adapters; caller-supplied ones bring their own
+        self.kernel = kernel_adapter or SemanticKernelAdapter(scheduler=llm_scheduler, cassette=cassette)
+        self.batch = batch or BatchQuerySettings()
+        batcher = None
+        if self.batch.group_llm_calls:
+            batcher = GenerationBatcher(
+                self.kernel, max_group_size=self.batch.max_group_size, window_ms=self.batch.group_window_ms
+            )
+        self.foundry = foundry_adapter or AzureFoundryAdapter(cassette=cassette)
         self.sql = sql_adapter or SQLAdapter()
-        self.registry = AgentRegistry(self.kernel, self.foundry, self.sql)
+        self.registry = AgentRegistry(
+            self.kernel,
+            self.foundry,
+            self.sql,
+            sql_cache=sql_cache,
+            schema_index=schema_index,
+            guardrail=guardrail,
+            max_repairs=max_repairs,
+            cost_gate=cost_gate,
+            coalesce=(coalescing or CoalescingSettings()).steps,
+            batcher=batcher,
+        )
+        self.coalescing = coalescing or CoalescingSettings()
+        self.flights = SingleFlight("plans")
+        self._retry_stats: Dict[str, Dict[str, Any]] = {}
+        self.step_store = step_store if step_store is not None and step_store.enabled else None
+        self.max_concurrency = max_concurrency
         self._plans: Dict[str, Any] = {}
+        self._graphs: Dict[str, PlanGraph] = {}
+        self.register_metrics(METRICS)
+
+    @classmethod
+    def from_settings(
+        cls,
+        settings: AppConfig,
+        cassette: Optional[Cassette] = None,
+        guardrail: Optional[GuardrailEngine] = None,
+    ) -> "MagenticController":
+        """
+        The controller and its adapters as configured by the app settings (what main.py runs).
+        Pass `guardrail` to share one engine (and its verdict cache) with other users of it.
+        """
+        orchestration = settings.orchestration
+        database = settings.database
+        scheduler = LLMScheduler.from_settings(orchestration.llm_scheduler)
+        provider_settings = getattr(database, database.provider, None)
+        sql_adapter = SQLAdapter(
+            connection_string=database_url(database),
+            provider=database.provider,
+            database=getattr(provider_settings, "database", None) or getattr(provider_settings, "dataset", None),
+            result_cache=ResultSetCache.from_settings(database.result_cache),
+            streaming=database.streaming,
+            pool=database.pool,
+            async_mode=database.async_mode,
+            schema_cache=database.schema_cache,
+        )
+        return cls(
+            kernel_adapter=SemanticKernelAdapter(scheduler=scheduler, cassette=cassette),
+            foundry_adapter=AzureFoundryAdapter(cassette=cassette),
+            sql_adapter=sql_adapter,
+            sql_cache=SemanticSQLCache.from_settings(orchestration.sql_cache),
+            schema_index=orchestration.schema_index,
+            guardrail=guardrail or GuardrailEngine.from_settings(orchestration.guardrail),
+            cost_gate=CostGate(database.cost_gate),
+            coalescing=orchestration.coalescing,
+            batch=orchestration.batch,
+            step_store=StepStore.from_settings(orchestration.step_store),
+            llm_scheduler=scheduler,
+            cassette=cassette,
+        )
+
+    def register_metrics(self, registry: MetricsRegistry):
+        """Expose the components' stats() at scrape time (a later controller replaces these sources)."""
+        for scope, flights in (("plans", self.flights), ("steps", self.registry.flights)):
+            registry.add_source(f"coalescing.{scope}", flights.stats, labels={"scope": scope}, name="coalescing")
+        if self.registry.sql_cache is not None:
+            registry.add_source("sql_cache", self.registry.sql_cache.stats)
+        registry.add_source("guardrail_cache", self.registry.guardrail.stats)
+        registry.add_source("cost_gate", self.registry.cost_gate.stats)
+        # adapters are duck-typed; export whatever stats the configured one has
+        provider = {"provider": getattr(self.sql, "provider", None) or "default"}
+        for key, attr in (("result_cache", "cache_stats"), ("sql_executor", "executor_stats")):
+            if hasattr(self.sql, attr):
+                registry.add_source(key, getattr(self.sql, attr), labels=provider)
+        schema_store = getattr(self.sql, "schema_store", None)
+        if schema_store is not None:
+            registry.add_source("schema_store", schema_store.stats, labels=provider)
+        if self.step_store is not None:
+            registry.add_source("step_store", self.step_store.stats)
+        if self.registry.batcher is not None:
+            registry.add_source("llm_batching", self.registry.batcher.stats)
+        cassette = getattr(self.kernel, "cassette", None) or getattr(self.foundry, "cassette", None)
+        if cassette is not None:
+            registry.add_source("cassette", cassette.stats)
+        scheduler = getattr(self.kernel, "scheduler", None)
+        if scheduler is not None:
+            registry.add_source(
+                "llm_scheduler", lambda: {k: v for k, v in scheduler.stats().items() if k != "classes"}
+            )
+            registry.add_source(
+                "llm_scheduler.classes", lambda: scheduler.stats()["classes"], nested_label="class",
+                name="llm_scheduler_class",
+            )
 
     def load_plan_file(self, path: str):
         p = Path(path)
@@ -37,7 +178,14 @@ class MagenticController:
             raise FileNotFoundError(f"Workflow plan not found: {path}")
         with p.open("r", encoding="utf-8") as f:
             data = yaml.safe_load(f)
-        self._plans = data.get("plans", {}) if isinstance(data, dict) else {}
+        plans = data.get("plans", {}) if isinstance(data, dict) else {}
+        # build every graph before swapping anything in, so a bad file leaves the old plans usable
+        graphs = {
+            name: PlanGraph(name, plan.get("steps", []), retry_defaults=plan.get("retry_defaults"))
+            for name, plan in plans.items()
+        }
+        self._plans = plans
+        self._graphs = graphs
         logger.info(f"Loaded plans from: {path}. Plans: {list(self._plans.keys())}")
 
     def get_plan(self, plan_name: str) -> Dict[str, Any]:
@@ -48,78 +196,259 @@ class MagenticController:
             raise KeyError(f"Plan '{plan_name}' not found.")
         return plan
 
-    async def run_plan(self, plan_name: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    def get_graph(self, plan_name: str) -> PlanGraph:
+        self.get_plan(plan_name)
+        return self._graphs[plan_name]
+
+    async def run_plan(
+        self, plan_name: str, inputs: Dict[str, Any], deadline_ms: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Run a plan. While an identical run (same plan, same inputs after whitespace
+        normalisation) is in flight, callers share its result; treat it as read-only.
+        The run is bounded by `deadline_ms`, else the plan's own `deadline_ms`.
+        Inside plan_events(...) the run reports progress events and is never coalesced.
+        """
         plan = self.get_plan(plan_name)
-        steps: List[Dict[str, Any]] = plan.get("steps", [])
+        deadline_ms = deadline_ms if deadline_ms is not None else plan.get("deadline_ms")
+        if not self.coalescing.plans or current_stream() is not None:
+            return await self._execute_plan(plan_name, inputs, deadline_ms)
+        return await self.flights.do(
+            flight_key(plan_name, inputs), lambda: self._execute_plan(plan_name, inputs, deadline_ms)
+        )
+
+    async def _execute_plan(
+        self, plan_name: str, inputs: Dict[str, Any], deadline_ms: Optional[float] = None
+    ) -> Dict[str, Any]:
+        with span("plan", plan=plan_name), PLAN_SECONDS.time(plan_name):
+            with deadline_scope(deadline_ms / 1000.0 if deadline_ms else None):
+                return await self._run_graph(plan_name, inputs)
+
+    async def _run_graph(self, plan_name: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        plan = self.get_plan(plan_name)
+        graph = self._graphs[plan_name]
+        limit = asyncio.Semaphore(max(1, int(plan.get("max_concurrency", self.max_concurrency))))
         context: Dict[str, Any] = {"inputs": inputs}
         results: Dict[str, Any] = {}
+        timings: Dict[str, Dict[str, Any]] = {}
+        step_keys: Dict[int, str] = {}  # id(step result) -> its step-store key
+        refs: Dict[int, str] = {}  # id(step result) -> fingerprint in step coalescing keys
+        started: set = set()
+        running: Dict[asyncio.Task, str] = {}
+        plan_start = time.perf_counter()
+
+        try:
+            while len(results) < len(graph.order):
+                for step_id in graph.ready(set(results), started):
+                    started.add(step_id)
+                    task = asyncio.create_task(
+                        self._run_step(graph, step_id, context, limit, plan_start, timings, step_keys, refs)
+                    )
+                    running[task] = step_id
+
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                # collect in plan order so results/context stay deterministic
+                for task in sorted(done, key=lambda t: graph.order.index(running[t])):
+                    step_id = running.pop(task)
+                    step_result = task.result()
+                    results[step_id] = step_result
+                    # expose step result in context: both as value and as mapping if it's dict-like
+                    context[step_id] = step_result
+                    # downstream calls are then coalesced without walking this result (a
+                    # schema snapshot can be large); the schema store shares one snapshot
+                    # object across runs, so identity is a stable fingerprint for it
+                    fingerprint = step_keys.get(id(step_result)) or f"id:{id(step_result):x}"
+                    self._remember_key(refs, step_result, fingerprint)
+        except asyncio.CancelledError:
+            logger.warning(f"Plan '{plan_name}' cancelled; {len(graph.order) - len(started)} step(s) not started.")
+            record_cancelled("plans", time.perf_counter() - plan_start)
+            record_cancelled("steps_skipped", count=len(graph.order) - len(started))
+            raise
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        critical_path = graph.critical_path(timings)
+        total_ms = (time.perf_counter() - plan_start) * 1000
+        logger.info(f"Plan '{plan_name}' finished in {total_ms:.1f} ms. Critical path: {' -> '.join(critical_path)}")
+
+        return {
+            "plan": plan_name,
+            "results": {step_id: results[step_id] for step_id in graph.order},
+            "context": context,
+            "timings": timings,
+            "critical_path": {"steps": critical_path, "duration_ms": total_ms},
+        }
+
+    async def _run_step(self, graph: PlanGraph, step_id: str, *args: Any) -> Any:
+        # one span per step, waiting for a concurrency slot included; adapter calls nest under it
+        with span("step", plan=graph.plan_name, step=step_id, agent=graph.steps[step_id].get("agent")):
+            return await self._execute_step(graph, step_id, *args)
+
+    async def _execute_step(
+        self,
+        graph: PlanGraph,
+        step_id: str,
+        context: Dict[str, Any],
+        limit: asyncio.Semaphore,
+        plan_start: float,
+        timings: Dict[str, Dict[str, Any]],
+        step_keys: Dict[int, str],
+        refs: Dict[int, str],
+    ) -> Any:
+        step = graph.steps[step_id]
+        agent_name = step.get("agent")
+        policy = graph.policies[step_id]
+        events = current_stream()
+        enter_step(step_id)
 
-        for step in steps:
-            step_id = step.get("id")
-            agent_name = step.get("agent")
-            raw_input = step.get("input", {})
-            retries = int(step.get("retries", 0))
+        async with limit:
+            step_start = time.perf_counter()
+            # resolved once and reused by every retry attempt
+            resolved_input = graph.resolvers[step_id](context)
 
-            resolved_input = self._resolve_input(raw_input, context)
+            memo_key = digest = None
+            if self.step_store is not None and step.get("memoize", True):
+                digest = input_digest(resolved_input, step_keys)
+                memo_key = self.step_store.key(graph.plan_name, step_id, agent_name, digest)
+                entry = await self.step_store.get(memo_key)
+                if entry is not None:
+                    logger.info(f"Step '{step_id}' restored from the step store.")
+                    self._remember_key(step_keys, entry["value"], memo_key)
+                    step_end = time.perf_counter()
+                    timings[step_id] = {
+                        "start_ms": (step_start - plan_start) * 1000,
+                        "end_ms": (step_end - plan_start) * 1000,
+                        "duration_ms": (step_end - step_start) * 1000,
+                        "attempts": 0,
+                        "memoized": True,
+                    }
+                    STEP_SECONDS.observe(step_end - step_start, graph.plan_name, step_id, agent_name, "memoized")
+                    if events is not None:
+                        self._emit_completed(events, step_id, entry["value"], timings[step_id])
+                    return entry["value"]
 
-            logger.info(f"Running step '{step_id}' -> agent '{agent_name}' (retries={retries})")
+            logger.info(f"Running step '{step_id}' -> agent '{agent_name}' (max_attempts={policy.max_attempts})")
+            if events is not None:
+                events.emit("step_started", step=step_id, agent=agent_name)
             attempt = 0
+            retry_s = 0.0  # failed attempts plus backoff
+            errors: List[str] = []
             step_result = None
-            while attempt <= retries:
-                attempt += 1
-                try:
-                    step_result = await self.registry.invoke(agent_name, resolved_input)
-                    logger.info(f"Step '{step_id}' succeeded on attempt {attempt}.")
-                    break
-                except Exception as e:
-                    logger.warning(f"Step '{step_id}' attempt {attempt} failed: {e}")
-                    if attempt > retries:
-                        logger.error(f"Step '{step_id}' exhausted retries and failed.")
-                        raise
-                    await asyncio.sleep(0.5 * attempt)
-
-            results[step_id] = step_result
-            # expose step result in context: both as value and as mapping if it's dict-like
-            context[step_id] = step_result
-
-        return {"plan": plan_name, "results": results, "context": context}
-
-    def _resolve_input(self, raw: Any, context: Dict[str, Any]) -> Any:
-        """Recursively resolve strings containing ${...} tokens against the context."""
-        if isinstance(raw, dict):
-            return {k: self._resolve_input(v, context) for k, v in raw.items()}
-        if isinstance(raw, list):
-            return [self._resolve_input(v, context) for v in raw]
-        if isinstance(raw, str):
-            if "${" in raw and "}" in raw:
-                out = raw
-                start = 0
+            succeeded = cancelled = False
+            cost_token = begin_step_cost()
+            try:
                 while True:
-                    s = out.find("${", start)
-                    if s == -1:
-                        break
-                    e = out.find("}", s)
-                    if e == -1:
-                        break
-                    token = out[s + 2 : e]
+                    attempt += 1
+                    attempt_start = time.perf_counter()
                     try:
-                        val = self._get_from_context(token, context)
-                        out = out[:s] + str(val) + out[e + 1 :]
-                        start = s + len(str(val))
-                    except Exception:
-                        # if token missing, remove placeholder
-                        out = out[:s] + out[e + 1 :]
-                        start = s
-                return out
-            return raw
-        return raw
+                        step_result = await within_deadline(
+                            self.registry.invoke(agent_name, resolved_input, refs), policy.timeout
+                        )
+                        logger.info(f"Step '{step_id}' succeeded on attempt {attempt}.")
+                        succeeded = True
+                        break
+                    except Exception as e:
+                        error_class = classify_error(e)
+                        errors.append(error_class)
+                        logger.warning(f"Step '{step_id}' attempt {attempt} failed ({error_class}): {e}")
+                        if not policy.should_retry(error_class, attempt):
+                            logger.error(f"Step '{step_id}' failed after {attempt} attempt(s) ({error_class}).")
+                            if events is not None:
+                                events.emit("step_failed", step=step_id, error=str(e), error_class=error_class)
+                            raise
+                        delay = policy.backoff(attempt, e)
+                        remaining = remaining_time()
+                        if remaining is not None and delay >= remaining:
+                            logger.error(f"Step '{step_id}': no time left before the plan deadline to retry.")
+                            raise DeadlineExceeded(f"Plan deadline leaves no time to retry step '{step_id}'") from e
+                        STEP_RETRIES.inc(1, graph.plan_name, step_id, error_class)
+                        await asyncio.sleep(delay)
+                        retry_s += time.perf_counter() - attempt_start
+            except asyncio.CancelledError:
+                logger.warning(f"Step '{step_id}' cancelled during attempt {attempt}.")
+                cancelled = True
+                record_cancelled("steps", time.perf_counter() - step_start)
+                if events is not None:
+                    events.emit("step_cancelled", step=step_id)
+                raise
+            finally:
+                step_end = time.perf_counter()
+                timings[step_id] = {
+                    "start_ms": (step_start - plan_start) * 1000,
+                    "end_ms": (step_end - plan_start) * 1000,
+                    "duration_ms": (step_end - step_start) * 1000,
+                    "attempts": attempt,
+                    "retries": max(0, attempt - 1),
+                    "retry_ms": retry_s * 1000,
+                }
+                if errors:
+                    timings[step_id]["errors"] = errors
+                if cancelled:
+                    timings[step_id]["cancelled"] = True
+                cost = end_step_cost(cost_token)
+                if cost:
+                    timings[step_id]["cost"] = cost
+                outcome = "ok" if succeeded else ("cancelled" if cancelled else "error")
+                STEP_SECONDS.observe(step_end - step_start, graph.plan_name, step_id, agent_name, outcome)
+                self._record_retries(
+                    f"{graph.plan_name}.{step_id}", attempt, retry_s, errors, failed=not (succeeded or cancelled)
+                )
+
+            if memo_key is not None:
+                await self.step_store.put(
+                    memo_key, step_result, graph.plan_name, step_id, agent_name, digest,
+                    ttl_seconds=step.get("memo_ttl_seconds"),
+                )
+                self._remember_key(step_keys, step_result, memo_key)
+            if events is not None:
+                self._emit_completed(events, step_id, step_result, timings[step_id])
+        return step_result
+
+    @staticmethod
+    def _emit_completed(events: PlanEventStream, step_id: str, result: Any, timing: Dict[str, Any]):
+        # rows are normally streamed by execute_sql as they arrive; memoized or shared
+        # (coalesced) results are sent here instead
+        rows = result.get("rows") if isinstance(result, dict) else result
+        if isinstance(rows, ColumnarResult) and step_id not in events.rows_sent:
+            events.emit_rows(step_id, rows)
+        events.emit(
+            "step_completed",
+            step=step_id,
+            duration_ms=round(timing["duration_ms"], 1),
+            attempts=timing["attempts"],
+            memoized=timing.get("memoized", False),
+            result=describe_result(result),
+        )
+
+    @staticmethod
+    def _remember_key(step_keys: Dict[int, str], value: Any, key: str):
+        # downstream inputs then hash this result by its key instead of its content;
+        # scalars are skipped, their ids are shared with unrelated values
+        if value is not None and not isinstance(value, (bool, int, float, str)):
+            step_keys[id(value)] = key
+
+    def _record_retries(self, key: str, attempts: int, retry_s: float, errors: List[str], failed: bool):
+        stats = self._retry_stats.setdefault(
+            key, {"runs": 0, "attempts": 0, "retries": 0, "retry_ms": 0.0, "failures": 0, "errors": {}}
+        )
+        stats["runs"] += 1
+        stats["attempts"] += attempts
+        stats["retries"] += max(0, attempts - 1)
+        stats["retry_ms"] += retry_s * 1000
+        stats["failures"] += int(failed)
+        for error_class in errors:
+            stats["errors"][error_class] = stats["errors"].get(error_class, 0) + 1
+
+    def retry_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per plan step ("plan.step"): runs, attempts, retries, time spent retrying, failures, error classes."""
+        return {key: dict(stats, errors=dict(stats["errors"])) for key, stats in self._retry_stats.items()}
+
+    def _resolve_input(self, raw: Any, context: Dict[str, Any]) -> Any:
+        """Resolve an uncompiled input against the context (plans use their precompiled resolvers)."""
+        return compile_input(raw)(context)
 
     def _get_from_context(self, token: str, context: Dict[str, Any]) -> Any:
-        parts = token.split(".")
-        cur = context
-        for p in parts:
-            if isinstance(cur, dict) and p in cur:
-                cur = cur[p]
-            else:
-                raise KeyError(f"Context token '{token}' not found")
-        return cur
+        return get_from_context(token, context)
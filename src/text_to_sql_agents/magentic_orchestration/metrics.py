@@ -0,0 +1,315 @@
+# src/text_to_sql_agents/magentic_orchestration/metrics.py
+import asyncio
+import math
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+
+PREFIX = "text_to_sql"
+
+# seconds; covers cache hits (ms) up to warehouse queries and LLM calls (tens of seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic count per label set; inc() is a dict update, nothing more."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, *labels: str):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in list(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    """Current value per label set."""
+
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+
+class _Timer:
+    """Observes the block's duration; the last label is the outcome (ok / error / cancelled)."""
+
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: "Histogram", labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            outcome = "ok"
+        elif issubclass(exc_type, asyncio.CancelledError):
+            outcome = "cancelled"
+        else:
+            outcome = "error"
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels, outcome)
+        return False
+
+
+class Histogram(_Metric):
+    """
+    Fixed-bucket histogram per label set. observe() is one bisect and three additions;
+    buckets are made cumulative only when rendered.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, list] = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def time(self, *labels: str) -> _Timer:
+        """with histogram.time("label"): ... ; the histogram's last label name must be `outcome`."""
+        return _Timer(self, labels)
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = []
+        for labels, series in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+def _flatten(
+    stats: Dict[str, Any], name: str, labels: Dict[str, str], nested_label: Optional[str]
+) -> Iterable[Tuple[str, Dict[str, str], float]]:
+    for key, value in stats.items():
+        if isinstance(value, (bool, int, float)):
+            yield f"{name}_{key}", labels, float(value)
+        elif isinstance(value, dict):
+            if nested_label is not None:
+                # first nesting level becomes a label: {"classes": {"batch": {...}}} -> {class="batch"}
+                yield from _flatten(value, name, {**labels, nested_label: key}, None)
+            else:
+                yield from _flatten(value, f"{name}_{key}", labels, None)
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics in the Prometheus text exposition format (no client library needed):
+    - counters / gauges / histograms updated on the hot path (plain dict updates, event-loop thread)
+    - stats sources: components' existing stats() dicts (caches, coalescing, scheduler, pools...),
+      read only at scrape time and exported as gauges, so they cost nothing between scrapes
+    """
+
+    def __init__(self, prefix: str = PREFIX):
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+        # key -> (stats callable, labels, nested_label, metric name)
+        self._sources: Dict[str, Tuple[Callable[[], Any], Dict[str, str], Optional[str], str]] = {}
+
+    def _register(self, metric: _Metric) -> Any:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                raise ValueError(f"Metric '{metric.name}' is already registered with a different type or labels")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(f"{self.prefix}_{name}", documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(f"{self.prefix}_{name}", documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(f"{self.prefix}_{name}", documentation, labelnames, buckets))
+
+    def add_source(
+        self,
+        key: str,
+        stats: Callable[[], Optional[Dict[str, Any]]],
+        labels: Optional[Dict[str, str]] = None,
+        nested_label: Optional[str] = None,
+        name: Optional[str] = None,
+    ):
+        """
+        Export the numeric fields of stats() as `<prefix>_<name>_<field>` gauges at scrape time.
+        Sources are keyed by `key`: registering the same key again replaces the previous one.
+        """
+        self._sources[key] = (stats, dict(labels or {}), nested_label, name or key)
+
+    def remove_source(self, key: str):
+        self._sources.pop(key, None)
+
+    def _source_lines(self) -> List[str]:
+        families: Dict[str, List[str]] = {}
+        for key, (stats, labels, nested_label, name) in list(self._sources.items()):
+            try:
+                values = stats() or {}
+            except Exception as e:
+                logger.warning(f"Metrics source '{key}' failed: {e}")
+                continue
+            for metric, metric_labels, value in _flatten(values, f"{self.prefix}_{name}", labels, nested_label):
+                label_text = _format_labels(list(metric_labels), list(metric_labels.values()))
+                families.setdefault(metric, []).append(f"{metric}{label_text} {_format_value(value)}")
+        lines = []
+        for metric, samples in sorted(families.items()):
+            lines.append(f"# TYPE {metric} gauge")
+            lines.extend(samples)
+        return lines
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            samples = metric.render()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        lines.extend(self._source_lines())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+PLAN_SECONDS = METRICS.histogram("plan_duration_seconds", "Wall time of plan runs.", ("plan", "outcome"))
+STEP_SECONDS = METRICS.histogram(
+    "step_duration_seconds",
+    "Wall time of plan steps, retries included (outcome memoized: restored from the step store).",
+    ("plan", "step", "agent", "outcome"),
+)
+STEP_RETRIES = METRICS.counter(
+    "step_retries_total", "Step attempts that failed and were retried.", ("plan", "step", "error_class")
+)
+AGENT_SECONDS = METRICS.histogram(
+    "agent_duration_seconds", "Latency of agent invocations as seen by the caller.", ("agent", "outcome")
+)
+LLM_CALL_SECONDS = METRICS.histogram(
+    "llm_call_duration_seconds", "LLM plugin calls, scheduler queueing included.", ("plugin", "outcome")
+)
+LLM_TOKENS = METRICS.counter(
+    "llm_tokens_total", "LLM tokens: pre-call estimates and provider-reported usage.", ("plugin", "kind")
+)
+DB_QUERY_SECONDS = METRICS.histogram(
+    "db_query_duration_seconds", "Database statements (result cache hits excluded).", ("provider", "mode", "outcome")
+)
+DB_ROWS = METRICS.counter("db_rows_fetched_total", "Rows fetched from the database.", ("provider",))
+DB_BYTES = METRICS.counter("db_bytes_fetched_total", "In-memory bytes of fetched result sets.", ("provider",))
+LOOP_LAG_SECONDS = METRICS.histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer: time spent blocked by CPU or sync calls.",
+    buckets=LAG_BUCKETS,
+)
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: a task sleeps `interval` seconds and records how much later
+    than that it was woken. Lag means something blocked the loop (sync I/O, heavy CPU).
+    """
+
+    def __init__(self, interval: float = 0.5, histogram: Histogram = LOOP_LAG_SECONDS):
+        self.interval = interval
+        self.histogram = histogram
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - started - self.interval)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.histogram.observe(lag)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"last_seconds": self.last_lag, "max_seconds": self.max_lag}
@@ -0,0 +1,83 @@
+# src/text_to_sql_agents/magentic_orchestration/plan_events.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Set
+
+from ..models.result_set import ColumnarResult
+
+
+class PlanEventStream:
+    """
+    Receives progress events of one plan run (for /query/stream):
+    - step_started / step_completed / step_failed / step_cancelled, emitted by the controller
+    - rows: result batches, emitted by execute_sql while the cursor is being read
+    Events are plain dicts handed to `callback`; it must not block.
+    """
+
+    def __init__(self, callback: Callable[[Dict[str, Any]], None], batch_rows: int = 500):
+        self.callback = callback
+        self.batch_rows = max(1, batch_rows)
+        self.rows_sent: Set[str] = set()
+        self._seq = 0
+
+    def emit(self, event: str, step: Optional[str] = None, **data: Any):
+        self._seq += 1
+        self.callback({"event": event, "seq": self._seq, "step": step, **data})
+
+    def emit_rows(self, step: Optional[str], batch: ColumnarResult, offset: int = 0):
+        """Send a result batch as one or more `rows` events of at most batch_rows rows."""
+        self.rows_sent.add(step)
+        records = batch.to_records()
+        for start in range(0, len(records), self.batch_rows):
+            self.emit(
+                "rows",
+                step=step,
+                offset=offset + start,
+                columns=batch.columns,
+                rows=records[start : start + self.batch_rows],
+            )
+
+
+_STREAM: ContextVar[Optional[PlanEventStream]] = ContextVar("plan_event_stream", default=None)
+_STEP: ContextVar[Optional[str]] = ContextVar("plan_event_step", default=None)
+
+
+@contextmanager
+def plan_events(stream: PlanEventStream):
+    """Tasks started inside the block (a run_plan call) report their progress to `stream`."""
+    token = _STREAM.set(stream)
+    try:
+        yield stream
+    finally:
+        _STREAM.reset(token)
+
+
+def current_stream() -> Optional[PlanEventStream]:
+    return _STREAM.get()
+
+
+def enter_step(step_id: str):
+    """Mark the calling task as running `step_id` (each plan step runs in its own task)."""
+    _STEP.set(step_id)
+
+
+def current_step() -> Optional[str]:
+    return _STEP.get()
+
+
+def describe_result(value: Any, max_chars: int = 4000) -> Any:
+    """JSON-friendly view of a step result for step_completed events; row data goes out as `rows` events."""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return value[:max_chars]
+    if isinstance(value, ColumnarResult):
+        return {"row_count": len(value), "columns": value.columns}
+    if isinstance(value, dict) and isinstance(value.get("rows"), ColumnarResult):
+        # bounded execution: preview rows + aggregates
+        return {k: v for k, v in value.items() if k != "rows"}
+    if isinstance(value, dict) and "tables" in value:
+        return {"tables": len(value.get("tables") or {})}
+    if isinstance(value, (dict, list)):
+        return value
+    return str(value)[:max_chars]
@@ -0,0 +1,103 @@
+# src/text_to_sql_agents/magentic_orchestration/plan_graph.py
+from typing import Any, Dict, List, Optional, Set
+
+from .input_resolver import Resolver, compile_input, extract_references
+from .retry_policy import RetryPolicy
+
+
+class PlanGraph:
+    """
+    Dependency graph of a plan's steps, built once when the plan is loaded.
+    Edges come from ${step...} references in step inputs plus an optional
+    explicit `depends_on` list. Each step input is compiled to a resolver here too,
+    and each step's retry/timeout settings to a RetryPolicy.
+    """
+
+    def __init__(
+        self,
+        plan_name: str,
+        steps: List[Dict[str, Any]],
+        retry_defaults: Optional[Dict[str, Any]] = None,
+    ):
+        self.plan_name = plan_name
+        self.order: List[str] = []
+        self.steps: Dict[str, Dict[str, Any]] = {}
+
+        for step in steps:
+            step_id = step.get("id")
+            if not step_id:
+                raise ValueError(f"Plan '{plan_name}' has a step without an 'id'.")
+            if step_id in self.steps:
+                raise ValueError(f"Plan '{plan_name}' declares step '{step_id}' more than once.")
+            self.order.append(step_id)
+            self.steps[step_id] = step
+
+        self.resolvers: Dict[str, Resolver] = {
+            step_id: compile_input(step.get("input", {})) for step_id, step in self.steps.items()
+        }
+        self.policies: Dict[str, RetryPolicy] = {
+            step_id: RetryPolicy.from_step(step, retry_defaults) for step_id, step in self.steps.items()
+        }
+
+        self.dependencies: Dict[str, Set[str]] = {}
+        for step_id, step in self.steps.items():
+            deps = {ref for ref in extract_references(step.get("input", {})) if ref in self.steps}
+            explicit = step.get("depends_on") or []
+            if isinstance(explicit, str):
+                explicit = [explicit]
+            for dep in explicit:
+                if dep not in self.steps:
+                    raise ValueError(f"Step '{step_id}' in plan '{plan_name}' depends on unknown step '{dep}'.")
+                deps.add(dep)
+            if step_id in deps:
+                raise ValueError(f"Step '{step_id}' in plan '{plan_name}' depends on itself.")
+            self.dependencies[step_id] = deps
+
+        self.dependents: Dict[str, Set[str]] = {step_id: set() for step_id in self.order}
+        for step_id, deps in self.dependencies.items():
+            for dep in deps:
+                self.dependents[dep].add(step_id)
+
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        remaining = {step_id: len(deps) for step_id, deps in self.dependencies.items()}
+        queue = [step_id for step_id in self.order if remaining[step_id] == 0]
+        seen = 0
+        while queue:
+            step_id = queue.pop()
+            seen += 1
+            for child in self.dependents[step_id]:
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    queue.append(child)
+        if seen != len(self.order):
+            cyclic = sorted(step_id for step_id, count in remaining.items() if count > 0)
+            raise ValueError(f"Plan '{self.plan_name}' has a dependency cycle between steps: {cyclic}")
+
+    def ready(self, completed: Set[str], started: Set[str]) -> List[str]:
+        """Steps whose dependencies are all completed and that have not started yet, in plan order."""
+        return [
+            step_id
+            for step_id in self.order
+            if step_id not in started and self.dependencies[step_id] <= completed
+        ]
+
+    def critical_path(self, timings: Dict[str, Dict[str, float]]) -> List[str]:
+        """
+        Walk back from the last step to finish, following at each hop the dependency
+        that finished latest, i.e. the chain that actually bounded the run's latency.
+        """
+        finished = [step_id for step_id in self.order if step_id in timings]
+        if not finished:
+            return []
+        current = max(finished, key=lambda s: timings[s]["end_ms"])
+        path = [current]
+        while True:
+            deps = [d for d in self.dependencies[current] if d in timings]
+            if not deps:
+                break
+            current = max(deps, key=lambda s: timings[s]["end_ms"])
+            path.append(current)
+        path.reverse()
+        return path
@@ -0,0 +1,130 @@
+# src/text_to_sql_agents/magentic_orchestration/retry_policy.py
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Optional
+
+from .deadline import DeadlineExceeded
+from .llm_scheduler import LLMThrottled, retry_after_seconds
+
+
+# error classes a policy can retry on
+TRANSIENT = "transient"        # connection drops, operational DB errors, HTTP transport errors
+TIMEOUT = "timeout"            # the step (or an adapter) ran past its timeout
+THROTTLED = "throttled"        # 429 / rate limiting
+UNKNOWN = "unknown"            # anything not classified; retried by default, as before
+DETERMINISTIC = "deterministic"  # will fail the same way again: never retried
+DEADLINE = "deadline"          # the plan is out of time: never retried
+ERROR_CLASSES = frozenset({TRANSIENT, TIMEOUT, THROTTLED, UNKNOWN, DETERMINISTIC, DEADLINE})
+DEFAULT_RETRY_ON = frozenset({TRANSIENT, TIMEOUT, THROTTLED, UNKNOWN})
+
+# matched by class name along the MRO, so optional client libraries need not be importable
+_TRANSIENT_NAMES = frozenset({
+    "OperationalError", "InterfaceError", "DisconnectionError", "TimeoutError",
+    "TransportError", "ConnectError", "ReadTimeout", "WriteTimeout", "PoolTimeout", "RemoteProtocolError",
+    "APIConnectionError", "APITimeoutError", "InternalServerError", "ServiceUnavailableError",
+    "ServiceRequestError", "ServiceResponseError",
+})
+_DETERMINISTIC_NAMES = frozenset({
+    "ProgrammingError", "IntegrityError", "DataError", "NotSupportedError",
+    "BadRequestError", "AuthenticationError", "PermissionDeniedError", "NotFoundError",
+    "CostBudgetExceeded", "LLMQueueFull",
+})
+# malformed model output (JSON, structured-output validation): another sample may parse, so
+# these stay retryable even though most are ValueError subclasses
+_UNPARSED_OUTPUT_NAMES = frozenset({"JSONDecodeError", "ValidationError", "OutputParserException", "OutputParserError"})
+_DETERMINISTIC_TYPES = (
+    KeyError, ValueError, TypeError, AttributeError, NotImplementedError, PermissionError, FileNotFoundError,
+)
+
+
+def classify_error(exc: BaseException) -> str:
+    """Error class of `exc`, used to decide whether a retry can help."""
+    if isinstance(exc, DeadlineExceeded):
+        return DEADLINE
+    if isinstance(exc, LLMThrottled) or retry_after_seconds(exc) is not None:
+        return THROTTLED
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError)):
+        return TIMEOUT
+    names = {cls.__name__ for cls in type(exc).__mro__}
+    if names & _UNPARSED_OUTPUT_NAMES:
+        return UNKNOWN
+    if names & _DETERMINISTIC_NAMES:
+        return DETERMINISTIC
+    if names & _TRANSIENT_NAMES:
+        return TRANSIENT
+    if isinstance(exc, _DETERMINISTIC_TYPES):
+        return DETERMINISTIC
+    if isinstance(exc, (ConnectionError, OSError)):
+        return TRANSIENT
+    return UNKNOWN
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Retry behaviour of one plan step, read from its YAML:
+        retries: 2                    # shorthand for retry.max_attempts = retries + 1
+        timeout_ms: 30000             # per attempt
+        retry:
+          max_attempts: 3
+          retry_on: [transient, timeout, throttled]
+          initial_backoff_ms: 200
+          multiplier: 2.0
+          max_backoff_ms: 5000
+          jitter: full                # full | equal | none
+    Plan-level `retry_defaults` supply the retry block for steps that leave keys out.
+    """
+
+    max_attempts: int = 1
+    retry_on: FrozenSet[str] = DEFAULT_RETRY_ON
+    initial_backoff_ms: float = 200.0
+    multiplier: float = 2.0
+    max_backoff_ms: float = 5000.0
+    jitter: str = "full"
+    timeout_ms: Optional[float] = None
+
+    @classmethod
+    def from_step(cls, step: Dict[str, Any], defaults: Optional[Dict[str, Any]] = None) -> "RetryPolicy":
+        spec = dict(defaults or {})
+        spec.update(step.get("retry") or {})
+        where = f"step '{step.get('id')}'"
+        unknown = set(spec) - {"max_attempts", "retry_on", "initial_backoff_ms", "multiplier", "max_backoff_ms", "jitter"}
+        if unknown:
+            raise ValueError(f"Unknown retry settings in {where}: {sorted(unknown)}")
+        if "max_attempts" not in (step.get("retry") or {}) and "retries" in step:
+            spec["max_attempts"] = int(step["retries"]) + 1
+        retry_on = frozenset(spec.get("retry_on", DEFAULT_RETRY_ON))
+        if retry_on - ERROR_CLASSES:
+            raise ValueError(f"Unknown error classes in {where}: {sorted(retry_on - ERROR_CLASSES)}")
+        jitter = spec.get("jitter", "full")
+        if jitter not in ("full", "equal", "none"):
+            raise ValueError(f"Unknown jitter '{jitter}' in {where}")
+        return cls(
+            max_attempts=max(1, int(spec.get("max_attempts", 1))),
+            retry_on=retry_on - {DETERMINISTIC, DEADLINE},
+            initial_backoff_ms=float(spec.get("initial_backoff_ms", 200.0)),
+            multiplier=float(spec.get("multiplier", 2.0)),
+            max_backoff_ms=float(spec.get("max_backoff_ms", 5000.0)),
+            jitter=jitter,
+            timeout_ms=float(step["timeout_ms"]) if step.get("timeout_ms") is not None else None,
+        )
+
+    @property
+    def timeout(self) -> Optional[float]:
+        return None if self.timeout_ms is None else self.timeout_ms / 1000.0
+
+    def should_retry(self, error_class: str, attempt: int) -> bool:
+        return attempt < self.max_attempts and error_class in self.retry_on
+
+    def backoff(self, attempt: int, exc: Optional[BaseException] = None, rng: Any = random) -> float:
+        """Seconds to wait after failed attempt number `attempt` (1-based); at least any Retry-After."""
+        base = min(self.max_backoff_ms, self.initial_backoff_ms * self.multiplier ** (attempt - 1)) / 1000.0
+        if self.jitter == "full":
+            delay = rng.uniform(0, base)
+        elif self.jitter == "equal":
+            delay = base / 2 + rng.uniform(0, base / 2)
+        else:
+            delay = base
+        retry_after = retry_after_seconds(exc) if exc is not None else None
+        return max(delay, retry_after or 0.0)
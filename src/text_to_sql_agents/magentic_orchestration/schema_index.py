@@ -0,0 +1,185 @@
+# src/text_to_sql_agents/magentic_orchestration/schema_index.py
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+from .sql_cache import STOP_WORDS
+
+
+_SPLIT_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+# field boosts: a match on the table name says more than one on a column comment
+TABLE_NAME_WEIGHT = 3
+COLUMN_NAME_WEIGHT = 1
+COMMENT_WEIGHT = 1
+FOREIGN_KEY_WEIGHT = 1
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def index_terms(text: Optional[str]) -> List[str]:
+    """
+    Terms used on both sides of the index: identifiers are split on case changes,
+    digits and separators (CustomerID, customer_id -> customer, id), lower-cased,
+    stop-words dropped and plurals folded.
+    """
+    if not text:
+        return []
+    words = (w.lower() for w in _SPLIT_RE.findall(str(text)))
+    return [_stem(w) for w in words if w not in STOP_WORDS]
+
+
+class SchemaIndex:
+    """
+    BM25 index over a schema snapshot, one document per table.
+    - documents hold the table name, column names, comments and foreign-key targets
+    - postings are stored term-major in flat NumPy arrays (CSC layout): scoring a question
+      touches only the postings of its terms
+    - select() returns the top-k tables plus their foreign-key neighbourhood so the
+      generated SQL has the join paths it needs
+    """
+
+    def __init__(self, snapshot: Dict[str, Any], k1: float = 1.2, b: float = 0.75):
+        self.tables: Dict[str, Any] = dict((snapshot or {}).get("tables", {}))
+        self.names: List[str] = list(self.tables)
+        self._row = {name: i for i, name in enumerate(self.names)}
+        self.vocabulary: Dict[str, int] = {}
+
+        doc_ids: List[int] = []
+        term_ids: List[int] = []
+        counts: List[int] = []
+        lengths = np.zeros(len(self.names), dtype=np.float64)
+        for i, name in enumerate(self.names):
+            tf = self._document(self.tables[name])
+            lengths[i] = sum(tf.values())
+            for term, count in tf.items():
+                doc_ids.append(i)
+                term_ids.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                counts.append(count)
+
+        docs = np.asarray(doc_ids, dtype=np.int32)
+        terms = np.asarray(term_ids, dtype=np.int32)
+        tf = np.asarray(counts, dtype=np.float64)
+        order = np.argsort(terms, kind="stable")
+        self.postings = docs[order]
+        df = np.bincount(terms, minlength=len(self.vocabulary))
+        self.term_ptr = np.concatenate(([0], np.cumsum(df))).astype(np.int64)
+
+        # BM25 weight of every posting is fixed at build time; a query only sums them
+        n = max(len(self.names), 1)
+        idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5))
+        avgdl = lengths.mean() if len(lengths) else 1.0
+        norm = k1 * (1.0 - b + b * lengths[docs] / (avgdl or 1.0))
+        weights = idf[terms] * tf * (k1 + 1.0) / (tf + norm)
+        self.weights = weights[order]
+
+        self.neighbours: List[Set[int]] = [set() for _ in self.names]
+        for i, name in enumerate(self.names):
+            for fk in self.tables[name].get("foreign_keys", []):
+                j = self._row.get(str(fk.get("referred_table", "")))
+                if j is not None and j != i:
+                    self.neighbours[i].add(j)
+                    self.neighbours[j].add(i)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @staticmethod
+    def _document(table: Dict[str, Any]) -> Counter:
+        tf: Counter = Counter()
+        for term in index_terms(table.get("name")):
+            tf[term] += TABLE_NAME_WEIGHT
+        for term in index_terms(table.get("comment")):
+            tf[term] += COMMENT_WEIGHT
+        for column in table.get("columns", []):
+            for term in index_terms(column.get("name")):
+                tf[term] += COLUMN_NAME_WEIGHT
+            for term in index_terms(column.get("comment")):
+                tf[term] += COMMENT_WEIGHT
+        for fk in table.get("foreign_keys", []):
+            for term in index_terms(str(fk.get("referred_table", "")).rsplit(".", 1)[-1]):
+                tf[term] += FOREIGN_KEY_WEIGHT
+        return tf
+
+    def scores(self, question: str) -> np.ndarray:
+        out = np.zeros(len(self.names), dtype=np.float64)
+        for term, count in Counter(index_terms(question)).items():
+            t = self.vocabulary.get(term)
+            if t is None:
+                continue
+            start, end = self.term_ptr[t], self.term_ptr[t + 1]
+            # each table appears at most once per term, so plain fancy-index addition is safe
+            out[self.postings[start:end]] += count * self.weights[start:end]
+        return out
+
+    def search(self, question: str, k: int = 8) -> List[str]:
+        """Names of the k best-matching tables, best first (tables with no match are left out)."""
+        scores = self.scores(question)
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [self.names[i] for i in hits]
+
+    def select(self, question: str, k: int = 8, hops: int = 1, max_tables: int = 20) -> List[str]:
+        """Top-k tables for the question, widened by `hops` foreign-key steps, capped at max_tables."""
+        scores = self.scores(question)
+        seeds = [self._row[name] for name in self.search(question, k)]
+        if not seeds:
+            # nothing matched: fall back to the most connected tables
+            degree = np.fromiter((len(n) for n in self.neighbours), dtype=np.int64, count=len(self.names))
+            seeds = list(np.argsort(-degree, kind="stable")[:k])
+
+        chosen = list(dict.fromkeys(int(i) for i in seeds))[:max_tables]
+        seen = set(chosen)
+        frontier = list(chosen)
+        for _ in range(hops):
+            candidates = {j for i in frontier for j in self.neighbours[i]} - seen
+            # keep the most relevant neighbours when the cap bites
+            ranked = sorted(candidates, key=lambda j: (-scores[j], self.names[j]))
+            room = max_tables - len(chosen)
+            frontier = ranked[:room]
+            chosen.extend(frontier)
+            seen.update(frontier)
+            if not frontier:
+                break
+        return [self.names[i] for i in chosen]
+
+    def subset(self, names: List[str]) -> Dict[str, Any]:
+        """Snapshot restricted to the given tables, in the same shape as the input snapshot."""
+        return {"tables": {name: self.tables[name] for name in names if name in self.tables}}
+
+
+def render_schema(snapshot: Dict[str, Any]) -> str:
+    """
+    Compact, prompt-friendly text for a snapshot, one line per table:
+    sales.orders(id INTEGER PK, customer_id INTEGER -> sales.customers.id, ...) -- comment
+    """
+    lines = []
+    for name, table in (snapshot or {}).get("tables", {}).items():
+        pk = set(table.get("primary_key") or [])
+        refs = {}
+        for fk in table.get("foreign_keys", []):
+            for col, ref in zip(fk.get("columns", []), fk.get("referred_columns", [])):
+                refs[col] = f"{fk.get('referred_table')}.{ref}"
+        columns = []
+        for column in table.get("columns", []):
+            text = f"{column['name']} {column.get('type', '')}".rstrip()
+            if column["name"] in pk:
+                text += " PK"
+            if column["name"] in refs:
+                text += f" -> {refs[column['name']]}"
+            columns.append(text)
+        line = f"{name}({', '.join(columns)})"
+        if table.get("comment"):
+            line += f" -- {table['comment']}"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,94 @@
+# src/text_to_sql_agents/magentic_orchestration/single_flight.py
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+def _frozen(value: Any, known: Dict[int, str]) -> Any:
+    """
+    JSON-able stand-in for a request value. Strings are whitespace-normalised; objects listed
+    in `known` (upstream step outputs such as the schema snapshot) are keyed by their
+    fingerprint instead of being walked, and objects that are not plain data (result sets)
+    by identity, which is stable while the call is in flight and shared by coalesced callers.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return " ".join(value.split())
+    ref = known.get(id(value))
+    if ref is not None:
+        return ["<ref>", ref]
+    if isinstance(value, dict):
+        if all(isinstance(k, str) for k in value):
+            return {k: _frozen(v, known) for k, v in sorted(value.items())}
+        return ["<id>", id(value)]
+    if isinstance(value, (list, tuple)):
+        return [_frozen(v, known) for v in value]
+    return ["<id>", id(value)]
+
+
+def flight_key(*parts: Any, known: Optional[Dict[int, str]] = None) -> str:
+    """
+    Stable key for a call, e.g. flight_key(plan_name, inputs). `known` maps id(object) to a
+    fingerprint for large values that should not be re-read on every call.
+    """
+    raw = json.dumps([_frozen(p, known or {}) for p in parts], separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls into one execution.
+    - the first caller for a key starts the work as a task; callers arriving while it runs
+      await the same task and receive the same result (or exception)
+    - a caller that is cancelled only stops waiting; the work is cancelled when no one waits
+    - nothing is cached: once the task finishes the next call for the key runs again
+    """
+
+    def __init__(self, name: str = "single_flight"):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self.calls = 0
+        self.executions = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and self._waiters.get(key) == 1:
+                task.cancel()
+            raise
+        finally:
+            if self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._waiters[key]
+        if not task.cancelled():
+            # retrieved here so an error nobody awaited any more is not reported as unhandled
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.calls - self.executions,
+            "in_flight": len(self._inflight),
+        }
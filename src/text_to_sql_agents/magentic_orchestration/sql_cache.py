@@ -0,0 +1,147 @@
+# src/text_to_sql_agents/magentic_orchestration/sql_cache.py
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from .caching import LRUTTLCache
+from ..models.config_models import SQLCacheSettings
+
+
+# Words that do not change what a question asks for. Deliberately conservative:
+# anything that can alter the result (top, by, not, per, before, ...) is kept.
+STOP_WORDS = frozenset(
+    {
+        "a", "an", "the", "please", "show", "me", "give", "list", "get", "find", "display",
+        "return", "tell", "what", "which", "is", "are", "was", "were", "i", "we", "want",
+        "would", "like", "to", "see", "can", "could", "you", "us", "our", "my", "of", "all",
+    }
+)
+
+_NUMBER_RE = re.compile(r"(?<![\w.])\d+(?:\.\d+)?(?![\w.])")
+_WORD_RE = re.compile(r"<num>|[a-z0-9_]+")
+_NUM_TOKEN = "<num>"
+
+
+def normalize_question(question: str) -> Tuple[str, List[str]]:
+    """
+    Normalise a natural-language question for cache lookup.
+    Returns the normalised text, with numeric literals replaced by <num>,
+    and the numeric literals in order of appearance.
+    """
+    text = question.lower()
+    numbers = _NUMBER_RE.findall(text)
+    text = _NUMBER_RE.sub(f" {_NUM_TOKEN} ", text)
+    words = [w for w in _WORD_RE.findall(text) if w not in STOP_WORDS]
+    return " ".join(words), numbers
+
+
+def fingerprint_schema(snapshot: Any) -> str:
+    """Stable short hash of a schema snapshot; any change to the snapshot changes it."""
+    payload = json.dumps(snapshot, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _parameterize_sql(sql: str, numbers: List[str]) -> Optional[str]:
+    """
+    Turn generated SQL into a template over the question's numeric literals.
+    Only done when every literal is distinct and appears exactly once in the SQL,
+    so substitution can never touch an unrelated constant.
+    """
+    if not numbers or len(set(numbers)) != len(numbers):
+        return None
+    escaped = sql.replace("{", "{{").replace("}", "}}")
+    spans = []
+    for i, num in enumerate(numbers):
+        pattern = re.compile(r"(?<![\w.])" + re.escape(num) + r"(?![\w.])")
+        matches = list(pattern.finditer(escaped))
+        if len(matches) != 1:
+            return None
+        spans.append((matches[0].start(), matches[0].end(), i))
+    template, pos = [], 0
+    for start, end, i in sorted(spans):
+        template.append(escaped[pos:start])
+        template.append("{" + str(i) + "}")
+        pos = end
+    template.append(escaped[pos:])
+    return "".join(template)
+
+
+class SemanticSQLCache:
+    """
+    Cache of generated SQL keyed on the normalised question plus a schema fingerprint.
+    - questions differing only in case, whitespace, punctuation or stop-words share an entry
+    - numeric literals are parameters: "top 5 customers" can serve "top 10 customers"
+      when the SQL uses the number exactly once
+    - entries for an old schema are dropped when the fingerprint changes
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = 3600):
+        self._cache = LRUTTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.schema_fingerprint: str = ""
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls, settings: Optional[SQLCacheSettings]) -> Optional["SemanticSQLCache"]:
+        if settings is None or not settings.enabled:
+            return None
+        return cls(max_entries=settings.max_entries, ttl_seconds=settings.ttl_seconds)
+
+    def set_schema(self, snapshot: Any) -> str:
+        """Record the current schema; invalidates entries generated against any other schema."""
+        fingerprint = fingerprint_schema(snapshot)
+        if fingerprint != self.schema_fingerprint:
+            dropped = self._cache.evict_where(lambda key: key[0] != fingerprint)
+            if dropped:
+                logger.info(f"SemanticSQLCache: schema changed, dropped {dropped} cached queries.")
+            self.schema_fingerprint = fingerprint
+        return fingerprint
+
+    def get(self, question: str) -> Optional[str]:
+        text, numbers = normalize_question(question)
+        sql = None
+        if numbers:
+            template = self._cache.get((self.schema_fingerprint, "param", text))
+            if template is not None:
+                sql = template.format(*numbers)
+        if sql is None:
+            sql = self._cache.get((self.schema_fingerprint, "literal", text, tuple(numbers)))
+        if sql is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return sql
+
+    def put(self, question: str, sql: str):
+        text, numbers = normalize_question(question)
+        template = _parameterize_sql(sql, numbers)
+        if template is not None:
+            self._cache.set((self.schema_fingerprint, "param", text), template)
+        else:
+            self._cache.set((self.schema_fingerprint, "literal", text, tuple(numbers)), sql)
+
+    def discard(self, question: str) -> bool:
+        """Drop the entry that would answer `question`, e.g. after its SQL failed to run."""
+        text, numbers = normalize_question(question)
+        dropped = False
+        if numbers:
+            dropped = self._cache.pop((self.schema_fingerprint, "param", text)) is not None
+        literal = self._cache.pop((self.schema_fingerprint, "literal", text, tuple(numbers)))
+        return dropped or literal is not None
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        # question-level counters: one get() may probe both the param and literal keys
+        lookups = self.hits + self.misses
+        return {
+            **self._cache.stats(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "schema_fingerprint": self.schema_fingerprint,
+        }
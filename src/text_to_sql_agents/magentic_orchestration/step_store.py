@@ -0,0 +1,286 @@
+# src/text_to_sql_agents/magentic_orchestration/step_store.py
+import hashlib
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from loguru import logger
+
+from .adapters.executor_pool import get_provider_executor
+from .caching import LRUTTLCache
+from ..models.config_models import StepStoreSettings
+from ..models.result_set import ColumnarResult, is_dataframe
+
+
+def input_digest(value: Any, known: Optional[Dict[int, str]] = None) -> str:
+    """
+    Content hash of a resolved step input. Objects listed in `known` (results of earlier
+    steps, by id) hash as their own step key, so a large upstream result is never re-read:
+    the key of a step already commits to everything it was computed from.
+    """
+    h = hashlib.sha1()
+    _feed(h, value, known or {})
+    return h.hexdigest()
+
+
+def _feed(h, value: Any, known: Dict[int, str]):
+    ref = known.get(id(value))
+    if ref is not None:
+        h.update(b"R" + ref.encode())
+    elif value is None or isinstance(value, (bool, int, float, str)):
+        h.update(f"{type(value).__name__}:{value!r};".encode())
+    elif isinstance(value, bytes):
+        h.update(b"B%d:" % len(value) + value)
+    elif isinstance(value, dict):
+        h.update(b"{")
+        for key in sorted(value, key=str):
+            _feed(h, str(key), known)
+            _feed(h, value[key], known)
+        h.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        h.update(b"[")
+        for item in value:
+            _feed(h, item, known)
+        h.update(b"]")
+    elif isinstance(value, ColumnarResult):
+        h.update(b"C")
+        for name in value.columns:
+            _feed(h, name, known)
+            _feed_array(h, value.column(name))
+    elif is_dataframe(value):
+        h.update(b"D")
+        for name in value.columns:
+            _feed(h, str(name), known)
+            _feed_array(h, value[name].to_numpy())
+    elif isinstance(value, np.ndarray):
+        _feed_array(h, value)
+    else:
+        h.update(f"{type(value).__qualname__}:{value!r};".encode())
+
+
+def _feed_array(h, values: np.ndarray):
+    h.update(f"{values.dtype.str}{values.shape};".encode())
+    if values.dtype.kind == "O":
+        h.update(repr(values.tolist()).encode())
+    else:
+        h.update(np.ascontiguousarray(values).tobytes())
+
+
+class StepStore:
+    """
+    Memoized step results, so a rerun (or another plan sharing the same leading steps)
+    resumes after the last step that succeeded instead of starting over.
+    - key: step id + agent + digest of the resolved input (+ plan name unless shared across plans)
+    - backends: "memory" (LRU), "sqlite" (pickled values in a local file) or "memory+sqlite"
+    - entries expire after ttl_seconds (per step: `memo_ttl_seconds` in the plan YAML)
+    - inspection: entries(), entry(), delete(), clear(), stats()
+    Store failures are logged and treated as a miss; they never fail a plan.
+    """
+
+    def __init__(self, settings: Optional[StepStoreSettings] = None):
+        self.settings = settings or StepStoreSettings()
+        backend = self.settings.backend
+        if backend not in ("memory", "sqlite", "memory+sqlite"):
+            raise ValueError(f"Unknown step_store.backend: {backend}")
+        self._memory = LRUTTLCache(max_entries=self.settings.max_entries) if "memory" in backend else None
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if "sqlite" in backend:
+            path = Path(self.settings.path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            with self._db_lock:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS step_results ("
+                    " key TEXT PRIMARY KEY, plan TEXT, step_id TEXT, agent TEXT, input_digest TEXT,"
+                    " created_at REAL, expires_at REAL, size INTEGER, value BLOB)"
+                )
+                self._db.commit()
+        self._io = get_provider_executor("step_store", 2)
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+    @classmethod
+    def from_settings(cls, settings: Optional[StepStoreSettings]) -> Optional["StepStore"]:
+        if settings is None or not settings.enabled:
+            return None
+        return cls(settings)
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.enabled
+
+    def key(self, plan: str, step_id: str, agent: str, digest: str) -> str:
+        scope = "*" if self.settings.share_across_plans else plan
+        return hashlib.sha1(f"{scope}|{step_id}|{agent}|{digest}".encode()).hexdigest()
+
+    # --- lookups ---------------------------------------------------------------------
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The stored entry ({"value", "plan", "step_id", ...}) or None."""
+        entry = self._memory.get(key) if self._memory is not None else None
+        if entry is None and self._db is not None:
+            try:
+                entry = await self._io.run(self._db_get, key)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Step store read failed: {e}")
+                entry = None
+            if entry is not None and self._memory is not None:
+                self._memory.set(key, entry, ttl_seconds=max(0.0, entry["expires_at"] - time.time()))
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    async def put(
+        self,
+        key: str,
+        value: Any,
+        plan: str,
+        step_id: str,
+        agent: str,
+        digest: str,
+        ttl_seconds: Optional[float] = None,
+    ):
+        ttl = self.settings.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+        entry = {
+            "key": key,
+            "value": value,
+            "plan": plan,
+            "step_id": step_id,
+            "agent": agent,
+            "input_digest": digest,
+            "created_at": now,
+            "expires_at": now + ttl,
+        }
+        if self._memory is not None:
+            self._memory.set(key, entry, ttl_seconds=ttl)
+        if self._db is not None:
+            try:
+                await self._io.run(self._db_put, entry)
+            except Exception as e:
+                # unpicklable values stay memory-only
+                self.errors += 1
+                logger.warning(f"Step store write failed for step '{step_id}': {e}")
+                return
+        self.writes += 1
+
+    def _db_get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT plan, step_id, agent, input_digest, created_at, expires_at, value"
+                " FROM step_results WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        plan, step_id, agent, digest, created_at, expires_at, blob = row
+        return {
+            "key": key,
+            "value": pickle.loads(blob),
+            "plan": plan,
+            "step_id": step_id,
+            "agent": agent,
+            "input_digest": digest,
+            "created_at": created_at,
+            "expires_at": expires_at,
+        }
+
+    def _db_put(self, entry: Dict[str, Any]):
+        blob = pickle.dumps(entry["value"], protocol=pickle.HIGHEST_PROTOCOL)
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO step_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    entry["key"], entry["plan"], entry["step_id"], entry["agent"], entry["input_digest"],
+                    entry["created_at"], entry["expires_at"], len(blob), blob,
+                ),
+            )
+            self._db.commit()
+
+    # --- inspection ------------------------------------------------------------------
+
+    @staticmethod
+    def _describe(entry: Dict[str, Any], size: Optional[int] = None) -> Dict[str, Any]:
+        info = {k: v for k, v in entry.items() if k != "value"}
+        info["value_type"] = type(entry["value"]).__name__ if "value" in entry else None
+        if size is not None:
+            info["size"] = size
+        return info
+
+    def entries(self, plan: Optional[str] = None, step_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Metadata of live entries (no values), newest first, optionally filtered."""
+        found: Dict[str, Dict[str, Any]] = {}
+        if self._db is not None:
+            with self._db_lock:
+                rows = self._db.execute(
+                    "SELECT key, plan, step_id, agent, input_digest, created_at, expires_at, size"
+                    " FROM step_results WHERE expires_at > ?",
+                    (time.time(),),
+                ).fetchall()
+            for key, p, s, agent, digest, created_at, expires_at, size in rows:
+                found[key] = {
+                    "key": key, "plan": p, "step_id": s, "agent": agent, "input_digest": digest,
+                    "created_at": created_at, "expires_at": expires_at, "size": size, "value_type": None,
+                }
+        if self._memory is not None:
+            for key, entry in self._memory.items():
+                found[key] = dict(found.get(key, {}), **self._describe(entry))
+        out = [
+            e for e in found.values()
+            if (plan is None or e["plan"] == plan) and (step_id is None or e["step_id"] == step_id)
+        ]
+        return sorted(out, key=lambda e: e["created_at"], reverse=True)
+
+    def entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """One entry including its value, without counting as a hit."""
+        entry = self._memory.get(key) if self._memory is not None else None
+        if entry is None and self._db is not None:
+            entry = self._db_get(key)
+        return entry
+
+    def delete(self, key: str) -> bool:
+        removed = self._memory is not None and self._memory.pop(key) is not None
+        if self._db is not None:
+            with self._db_lock:
+                removed = self._db.execute("DELETE FROM step_results WHERE key = ?", (key,)).rowcount > 0 or removed
+                self._db.commit()
+        return removed
+
+    def clear(self, plan: Optional[str] = None, step_id: Optional[str] = None) -> int:
+        """Drop entries (all, or those of a plan / step); returns how many were dropped."""
+        keys = [e["key"] for e in self.entries(plan=plan, step_id=step_id)]
+        for key in keys:
+            self.delete(key)
+        if self._db is not None and plan is None and step_id is None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM step_results")  # expired rows too
+                self._db.commit()
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.settings.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "writes": self.writes,
+            "errors": self.errors,
+            "memory": self._memory.stats() if self._memory is not None else None,
+        }
+
+    def close(self):
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
@@ -0,0 +1,46 @@
+# src/text_to_sql_agents/magentic_orchestration/tracing.py
+from contextlib import nullcontext
+from typing import Any, ContextManager, Optional
+
+from loguru import logger
+
+
+_TRACER: Optional[Any] = None
+_NOOP = nullcontext()
+
+
+def configure_tracing(enabled: bool, service_name: str = "text-to-sql-agents") -> bool:
+    """
+    Emit OpenTelemetry spans (plan -> step -> adapter call) through the globally configured
+    tracer provider. Needs opentelemetry-api; exporters / SDK setup are the application's
+    (e.g. opentelemetry-instrument). Returns whether tracing is on.
+    """
+    global _TRACER
+    if not enabled:
+        _TRACER = None
+        return False
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        logger.warning("Tracing requested but opentelemetry-api is not installed; spans are disabled.")
+        _TRACER = None
+        return False
+    _TRACER = trace.get_tracer(service_name)
+    logger.info(f"OpenTelemetry spans enabled (tracer '{service_name}').")
+    return True
+
+
+def tracing_enabled() -> bool:
+    return _TRACER is not None
+
+
+def span(name: str, **attributes: Any) -> ContextManager[Any]:
+    """
+    Span around the block, child of the current one (context follows tasks, so steps nest
+    under their plan). A shared no-op context when tracing is off. None attributes are dropped.
+    """
+    if _TRACER is None:
+        return _NOOP
+    return _TRACER.start_as_current_span(
+        name, attributes={k: v for k, v in attributes.items() if v is not None}
+    )
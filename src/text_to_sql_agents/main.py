@@ -1,13 +1,35 @@
 # src/text_to_sql_agents/main.py
 
-from fastapi import FastAPI, HTTPException
+import time
+
+# before any other import, so the startup profile covers the app's own import time
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import json
+import math
+import uuid
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from loguru import logger
 
 from src.text_to_sql_agents.utils.config_loader import get_settings
-from .service.kernel_factory import KernelFactory
-from .service.plugin_registry import PluginRegistry
-from .service.foundry_agent_service import FoundryAgentService
-from .magentic_orchestration.magentic_controller import MagenticController
+from .magentic_orchestration.adapters.executor_pool import shutdown_executors
+from .magentic_orchestration.admission import AdmissionController, AdmissionRejected
+from .magentic_orchestration.cancellation import RunCancelled, RunRegistry, cancel_on_disconnect, cancellation_stats
+from .magentic_orchestration.cassette import Cassette
+from .magentic_orchestration.llm_batching import grouped_llm_calls
+from .magentic_orchestration.llm_scheduler import BATCH, INTERACTIVE, llm_priority
+from .magentic_orchestration.metrics import METRICS, LoopLagMonitor
+from .magentic_orchestration.plan_events import PlanEventStream, plan_events
+from .magentic_orchestration.tracing import configure_tracing
+from .models.result_set import ColumnarResult
+from .utils.sql_guard import GuardrailEngine
+from .utils.startup import StartupProfile
+
+# Semantic Kernel, the Foundry service, the controller (SQLAlchemy, pandas) and matplotlib
+# are imported by the init stages below / on first use, not here: importing the app stays cheap
 
 
 # --- FastAPI initialization ---
@@ -20,32 +42,116 @@ settings = get_settings()
 kernel = None
 controller = None
 foundry_service = None
+cassette = None
+guardrail = None
+admission = None
+runs = RunRegistry()
+loop_lag = None
+startup_profile = StartupProfile(started=_IMPORT_STARTED)
+startup_profile.mark_imported()
+init_task = None
+
+METRICS.add_source("cancellations", cancellation_stats, nested_label="kind")
+METRICS.add_source("runs", lambda: {"active": len(runs.active())})
+
+
+async def _init_kernel():
+    """1️⃣ Create Semantic Kernel (on a worker thread) and load its plugins."""
+    global kernel
+    from .service.kernel_factory import KernelFactory
+    from .service.plugin_registry import PluginRegistry
+
+    kernel = await asyncio.to_thread(KernelFactory.create_kernel, settings)
+    plugin_registry = PluginRegistry(kernel, guardrail=guardrail)
+    await plugin_registry.load_all_plugins()
+
+
+async def _init_foundry():
+    """2️⃣ Initialize Azure Foundry Service."""
+    global foundry_service
+    from .service.foundry_service import FoundryAgentService
+
+    foundry_service = FoundryAgentService(settings)
+    await foundry_service.initialize()
+
+
+async def _init_controller():
+    """3️⃣ Initialize orchestration controller."""
+    global controller
+    from .magentic_orchestration.magentic_controller import MagenticController
+
+    orchestrator = MagenticController.from_settings(settings, cassette=cassette, guardrail=guardrail)
+    orchestrator.load_plan_file("src/text_to_sql_agents/magentic_orchestration/workflow_plans.yaml")
+    controller = orchestrator
+
+
+async def initialize():
+    """
+    Independent init stages, run concurrently: none of them needs another's result
+    (the controller builds its own adapters), so the cold start costs the slowest stage,
+    not their sum. The initialised Foundry service is then handed to the controller's
+    Foundry adapter. /health/ready reports the outcome.
+    """
+    stages = [("controller", _init_controller, True)]
+    if cassette is not None and cassette.replaying:
+        startup_profile.skip("kernel", reason="cassette replay")
+        startup_profile.skip("foundry", reason="cassette replay")
+    else:
+        stages = [("kernel", _init_kernel, True), ("foundry", _init_foundry, True)] + stages
+    try:
+        await startup_profile.run_all(stages)
+    except Exception:
+        logger.exception("❌ System initialization failed.")
+        raise
+    if foundry_service is not None:
+        # remote guardrail checks, agent calls and Power BI uploads go through this service
+        controller.foundry.attach(foundry_service)
+    startup_profile.mark_ready()
+    logger.success(f"✅ System initialization complete — backend ready ({startup_profile.summary()}).")
 
 
 @app.on_event("startup")
 async def startup():
     """
     Initialize Semantic Kernel, Foundry agent, and orchestration controller
-    when FastAPI application starts.
+    when FastAPI application starts. With orchestration.startup.background_init the
+    app serves /health/live right away and initialises in the background.
     """
-    global kernel, controller, foundry_service
+    global loop_lag, cassette, guardrail, admission, init_task
 
-    logger.info(f"🚀 Starting Text-to-SQL app in {settings.app.get('environment')} mode...")
+    logger.info(f"🚀 Starting Text-to-SQL app in {settings.app.environment} mode...")
 
-    # 1️⃣ Create Semantic Kernel
-    kernel = KernelFactory.create_kernel(settings)
-    plugin_registry = PluginRegistry(kernel)
-    await plugin_registry.load_all_plugins()
+    # 0️⃣ Observability: spans and event-loop lag, before anything else starts working
+    observability = settings.orchestration.observability
+    configure_tracing(observability.tracing, observability.service_name)
+    if observability.loop_lag_interval_ms > 0:
+        loop_lag = LoopLagMonitor(observability.loop_lag_interval_ms / 1000.0)
+        loop_lag.start()
+        METRICS.add_source("event_loop_lag", loop_lag.stats)
 
-    # 2️⃣ Initialize Azure Foundry Service
-    foundry_service = FoundryAgentService(settings)
-    await foundry_service.initialize()
+    # LLM / Foundry calls recorded to a cassette, or replayed from one without Azure
+    cassette = Cassette.from_settings(settings.orchestration.cassette)
+    if cassette is not None:
+        logger.info(f"Cassette {cassette.mode} mode: {cassette.path}")
+
+    # one guardrail engine (orchestration.guardrail) for the guard step and the SK guardrail agent
+    guardrail = GuardrailEngine.from_settings(settings.orchestration.guardrail)
 
-    # 3️⃣ Initialize orchestration controller
-    controller = MagenticController(kernel_adapter=None, foundry_adapter=None)
-    controller.load_plan_file("src/text_to_sql_agents/magentic_orchestration/workflow_plans.yaml")
+    # admission control in front of every plan run started over HTTP
+    admission = AdmissionController.from_settings(settings.orchestration.admission)
+    if admission is not None:
+        gate = admission
+        METRICS.add_source("admission", lambda: {k: v for k, v in gate.stats().items() if k != "classes"})
+        METRICS.add_source(
+            "admission.classes", lambda: gate.stats()["classes"], nested_label="class", name="admission_class"
+        )
 
-    logger.success("✅ System initialization complete — backend ready.")
+    init_task = asyncio.create_task(initialize())
+    if not settings.orchestration.startup.background_init:
+        await init_task
+    else:
+        # the outcome is read from startup_profile; keep the exception from being reported as never retrieved
+        init_task.add_done_callback(lambda task: task.cancelled() or task.exception())
 
 
 @app.on_event("shutdown")
@@ -54,32 +160,136 @@ async def shutdown():
     Cleanup or disconnect services on app shutdown.
     """
     logger.info("🧹 Shutting down Text-to-SQL backend...")
+    if init_task is not None and not init_task.done():
+        init_task.cancel()
     if foundry_service:
         await foundry_service.shutdown()
+    if loop_lag is not None:
+        await loop_lag.stop()
+    if cassette is not None:
+        cassette.close()
+    shutdown_executors()
+    from .agents.executor import dispose_engines
+
+    dispose_engines()
     logger.success("✅ Clean shutdown complete.")
 
 
+def _rows_for_response(exec_result) -> list:
+    """Row dicts are only materialised here, at the HTTP boundary."""
+    if isinstance(exec_result, dict):
+        # bounded/streamed execution: {"rows": preview, "row_count": ..., "aggregates": ...}
+        exec_result = exec_result.get("rows")
+    if isinstance(exec_result, ColumnarResult):
+        return exec_result.to_records()
+    return exec_result or []
+
+
+def _query_response(results: dict) -> dict:
+    return {
+        "status": "success",
+        "summary": results.get("summary"),
+        "visualization": results.get("viz"),
+        "sql_query": results.get("plan") or results.get("validate") or results.get("gen"),
+        "rows": _rows_for_response(results.get("exec")),
+    }
+
+
 @app.get("/health")
 async def health():
     """
-    Basic health check endpoint.
+    Basic health check endpoint (always 200 while the process serves requests; see `ready`).
     """
     return {
-        "status": "ok",
-        "environment": settings.app.get("environment"),
-        "db_provider": settings.database.get("provider"),
-        "foundry_agent": settings.azure.get("foundry_agent_name"),
+        "status": "failed" if startup_profile.failed else "ok",
+        "ready": startup_profile.ready,
+        "environment": settings.app.environment,
+        "db_provider": settings.database.provider,
+        "foundry_agent": settings.azure.foundry_agent_name,
     }
 
 
+@app.get("/health/live")
+async def health_live():
+    """Liveness: 200 while the process can serve, also during initialisation; 503 once a required init stage failed."""
+    if startup_profile.failed:
+        return JSONResponse({"status": "failed"}, status_code=503)
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness: 200 once every init stage finished, else 503; the body is the startup profile."""
+    report = startup_profile.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
+def _caller(payload: dict, request: Request) -> str:
+    """Who a run counts against for per-user admission limits: its user_id, else the client address."""
+    user_id = payload.get("user_id")
+    if user_id:
+        return str(user_id)
+    return f"client:{request.client.host}" if request.client else "anonymous"
+
+
+def _admission_check(caller: str, plan_name: str, priority: int):
+    """Turn a run away up front (429 / 503 with Retry-After), before a streaming response starts."""
+    if admission is None:
+        return
+    try:
+        admission.check(caller, plan_name, priority)
+    except AdmissionRejected as e:
+        raise _rejected(e, caller, plan_name)
+
+
+def _rejected(error: AdmissionRejected, caller: str, plan_name: str) -> HTTPException:
+    logger.warning(f"Admission rejected '{plan_name}' for {caller}: {error} ({error.reason}).")
+    return HTTPException(
+        status_code=error.status_code,
+        detail=str(error),
+        headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))},
+    )
+
+
+async def _admitted_run(plan_name: str, inputs: dict, caller: str, priority: int = INTERACTIVE) -> dict:
+    """controller.run_plan behind admission control: waits for a slot, or raises AdmissionRejected."""
+    if admission is None:
+        return await controller.run_plan(plan_name=plan_name, inputs=inputs)
+    async with admission.slot(caller, plan_name, priority):
+        return await controller.run_plan(plan_name=plan_name, inputs=inputs)
+
+
+def _run_id(payload: dict) -> str:
+    """Caller-chosen run id (so it can cancel the run while waiting for it), else a fresh one."""
+    run_id = payload.get("run_id") or uuid.uuid4().hex
+    if not isinstance(run_id, str):
+        raise HTTPException(status_code=400, detail="'run_id' must be a string")
+    if run_id in runs:
+        raise HTTPException(status_code=409, detail=f"Run '{run_id}' is already in flight")
+    return run_id
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint (text exposition format 0.0.4)."""
+    if not settings.orchestration.observability.metrics_endpoint:
+        raise HTTPException(status_code=404, detail="Metrics endpoint is disabled")
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.post("/query")
-async def query_endpoint(payload: dict):
+async def query_endpoint(payload: dict, request: Request, response: Response):
     """
     Executes a full Text-to-SQL orchestration workflow.
     Expected payload:
     {
-        "user_query": "Show me top 5 customers by revenue"
+        "user_query": "Show me top 5 customers by revenue",
+        "run_id": "optional id, for POST /query/{run_id}/cancel",
+        "user_id": "optional, for per-user admission limits (default: client address)"
     }
+    The run is cancelled (statements, pending LLM calls and all) when the client disconnects.
+    Under load the run waits for an admission slot, or is answered at once with
+    429 (this caller has too many runs) / 503 (server saturated) and a Retry-After header.
     """
     global controller
 
@@ -90,21 +300,242 @@ async def query_endpoint(payload: dict):
     if not user_query:
         raise HTTPException(status_code=400, detail="Missing 'user_query' field")
 
-    logger.info(f"💬 Received user query: {user_query}")
+    run_id = _run_id(payload)
+    logger.info(f"💬 Received user query (run {run_id}): {user_query}")
 
+    caller = _caller(payload, request)
+    inputs = {"user_query": user_query, "user_id": payload.get("user_id") or "api-user"}
+    task = asyncio.create_task(_admitted_run("text_to_sql_basic", inputs, caller))
+    runs.register(run_id, task, kind="query")
+    response.headers["X-Run-Id"] = run_id
     try:
-        result = await controller.run_plan(
-            plan_name="text_to_sql_basic",
-            inputs={"user_query": user_query, "user_id": "api-user"},
-        )
-        results = result.get("results", {})
-        return {
-            "status": "success",
-            "summary": results.get("summary"),
-            "visualization": results.get("viz"),
-            "sql_query": results.get("sql_query"),
-            "rows": results.get("rows", []),
-        }
+        result = await cancel_on_disconnect(task, request.is_disconnected, run_id=run_id)
+        return _query_response(result.get("results", {}))
+    except RunCancelled as e:
+        raise HTTPException(status_code=499, detail=str(e))
+    except AdmissionRejected as e:
+        raise _rejected(e, caller, "text_to_sql_basic")
     except Exception as e:
         logger.exception("❌ Orchestration failure.")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _sse(event: dict) -> str:
+    return f"id: {event.get('seq', '')}\nevent: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+async def _stream_plan(user_query: str, user_id: str, run_id: str, caller: str):
+    """
+    Server-sent events for one run: `run_started`, step progress and row batches as they
+    happen, then `done`. A client that goes away takes the run down with it.
+    """
+    if run_id in runs:  # the same run id was submitted again meanwhile
+        yield _sse({"event": "error", "error": f"Run '{run_id}' is already in flight"})
+        return
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+    stream = PlanEventStream(queue.put_nowait)
+
+    # the run task copies this context, so its steps report to `stream`
+    with plan_events(stream):
+        task = asyncio.create_task(
+            _admitted_run("text_to_sql_basic", {"user_query": user_query, "user_id": user_id}, caller)
+        )
+    task.add_done_callback(lambda _: queue.put_nowait(finished))
+    runs.register(run_id, task, kind="stream")
+    try:
+        yield _sse({"event": "run_started", "run_id": run_id})
+        while True:
+            event = await queue.get()
+            if event is finished:
+                break
+            yield _sse(event)
+        if task.cancelled() or task.exception() is not None:
+            error = None if task.cancelled() else task.exception()
+            event = {"event": "error", "error": "cancelled" if error is None else str(error)}
+            if isinstance(error, AdmissionRejected):
+                # passed the up-front check, then waited in the queue past the SLA
+                event.update(status=error.status_code, retry_after=error.retry_after)
+            yield _sse(event)
+        else:
+            results = task.result().get("results", {})
+            yield _sse({
+                "event": "done",
+                "status": "success",
+                "sql_query": results.get("plan") or results.get("validate") or results.get("gen"),
+                "summary": results.get("summary"),
+                "visualization": results.get("viz"),
+            })
+    finally:
+        # still running here means the client disconnected mid-stream
+        runs.cancel(run_id, reason="disconnected")
+
+
+@app.post("/query/stream")
+async def query_stream_endpoint(payload: dict, request: Request):
+    """
+    Same workflow as /query, reported as server-sent events while it runs:
+    step_started / step_completed (with the SQL, guardrail verdict, summary, chart spec...),
+    `rows` batches while exec reads the result, step_failed, then `done` (or `error`).
+    Expected payload: {"user_query": "...", "run_id": "optional"}
+    """
+    if not controller:
+        raise HTTPException(status_code=503, detail="Controller not initialized yet")
+    user_query = payload.get("user_query")
+    if not user_query:
+        raise HTTPException(status_code=400, detail="Missing 'user_query' field")
+
+    run_id = _run_id(payload)
+    caller = _caller(payload, request)
+    _admission_check(caller, "text_to_sql_basic", INTERACTIVE)
+    logger.info(f"💬 Received streaming query (run {run_id}): {user_query}")
+    return StreamingResponse(
+        _stream_plan(user_query, payload.get("user_id") or "api-user", run_id, caller),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Run-Id": run_id},
+    )
+
+
+@app.post("/query/{run_id}/cancel")
+async def cancel_query(run_id: str):
+    """Cancel an in-flight /query, /query/stream or /query/batch run by its run id."""
+    if not runs.cancel(run_id):
+        raise HTTPException(status_code=404, detail=f"No run '{run_id}' in flight")
+    return {"run_id": run_id, "status": "cancelling"}
+
+
+@app.get("/runs")
+async def list_runs():
+    """In-flight runs, how much work cancellations have stopped so far, and the admission queue."""
+    return {
+        "active": runs.active(),
+        "cancellations": cancellation_stats(),
+        "admission": admission.stats() if admission is not None else None,
+    }
+
+
+@app.get("/steps/store")
+async def step_store_entries(plan: str = None, step_id: str = None):
+    """Memoized step results (metadata only) and store statistics."""
+    store = controller.step_store if controller else None
+    if store is None:
+        raise HTTPException(status_code=404, detail="Step store is not enabled")
+    return {"stats": store.stats(), "entries": store.entries(plan=plan, step_id=step_id)}
+
+
+@app.delete("/steps/store")
+async def step_store_clear(plan: str = None, step_id: str = None, key: str = None):
+    """Drop one entry (key) or every entry of a plan / step (all when no filter is given)."""
+    store = controller.step_store if controller else None
+    if store is None:
+        raise HTTPException(status_code=404, detail="Step store is not enabled")
+    if key:
+        return {"deleted": int(store.delete(key))}
+    return {"deleted": store.clear(plan=plan, step_id=step_id)}
+
+
+async def _run_batch(questions: list, user_id: str, concurrency: int, run_id: str, caller: str):
+    """
+    Yields one NDJSON line per question as it completes, then a closing summary line
+    (status "cancelled" when the batch was cancelled by its run id).
+    """
+    if run_id in runs:  # the same run id was submitted again meanwhile
+        yield json.dumps({"status": "error", "error": f"Run '{run_id}' is already in flight"}) + "\n"
+        return
+    limit = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+
+    async def run_one(index: int, question: str) -> dict:
+        async with limit:
+            t0 = time.perf_counter()
+            try:
+                result = await _admitted_run(
+                    "text_to_sql_basic", {"user_query": question, "user_id": user_id}, caller, priority=BATCH
+                )
+                line = _query_response(result.get("results", {}))
+            except Exception as e:
+                logger.warning(f"Batch question {index} failed: {e}")
+                line = {"status": "error", "error": str(e)}
+            line.update(index=index, question=question, duration_ms=round((time.perf_counter() - t0) * 1000, 1))
+            return line
+
+    # the context (grouped LLM calls, batch priority) is copied into every task created here
+    with grouped_llm_calls(), llm_priority(BATCH):
+        tasks = [asyncio.create_task(run_one(i, q)) for i, q in enumerate(questions)]
+    # stands for the whole batch in the run registry: cancelling it cancels every question
+    group = asyncio.get_running_loop().create_future()
+
+    def cancel_questions(future: asyncio.Future):
+        if future.cancelled():
+            for task in tasks:
+                task.cancel()
+
+    group.add_done_callback(cancel_questions)
+    runs.register(run_id, group, kind="batch")
+    failed = 0
+    status = "done"
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                line = await next_done
+            except asyncio.CancelledError:
+                if not group.cancelled():
+                    raise
+                status = "cancelled"
+                break
+            failed += line["status"] != "success"
+            yield json.dumps(line, default=str) + "\n"
+        if not group.done():
+            group.set_result(None)
+    finally:
+        # still running here means the client disconnected
+        runs.cancel(run_id, reason="disconnected")
+        for task in tasks:
+            task.cancel()
+    yield json.dumps({
+        "status": status,
+        "run_id": run_id,
+        "questions": len(questions),
+        "failed": failed,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }) + "\n"
+
+
+@app.post("/query/batch")
+async def query_batch_endpoint(payload: dict, request: Request):
+    """
+    Runs many questions through the orchestration workflow, at most
+    orchestration.batch.max_concurrency at a time (and no more than the caller's per-user
+    admission limit, at batch priority), streaming NDJSON as each completes:
+    {"questions": ["...", "..."], "max_concurrency": 4}
+    Lines are the /query response plus "index", "question" and "duration_ms"
+    (or {"status": "error", "error": ...}); the last line is {"status": "done", ...}.
+    Pass "run_id" to be able to cancel the whole batch with POST /query/{run_id}/cancel.
+    """
+    if not controller:
+        raise HTTPException(status_code=503, detail="Controller not initialized yet")
+
+    questions = payload.get("questions")
+    if not isinstance(questions, list) or not questions or not all(isinstance(q, str) and q.strip() for q in questions):
+        raise HTTPException(status_code=400, detail="'questions' must be a non-empty list of strings")
+    batch = controller.batch
+    if len(questions) > batch.max_questions:
+        raise HTTPException(status_code=400, detail=f"At most {batch.max_questions} questions per batch")
+    try:
+        concurrency = int(payload.get("max_concurrency") or batch.max_concurrency)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="'max_concurrency' must be an integer")
+    concurrency = max(1, min(concurrency, batch.max_concurrency))
+    if admission is not None:
+        # more would only wait in the admission queue (and could hit the per-user limit)
+        concurrency = min(concurrency, admission.per_user_concurrency)
+
+    run_id = _run_id(payload)
+    caller = _caller(payload, request)
+    _admission_check(caller, "text_to_sql_basic", BATCH)
+    logger.info(f"💬 Received batch of {len(questions)} questions (concurrency {concurrency}, run {run_id}).")
+    return StreamingResponse(
+        _run_batch(questions, payload.get("user_id") or "api-user", concurrency, run_id, caller),
+        media_type="application/x-ndjson",
+        headers={"X-Run-Id": run_id},
+    )
@@ -4,7 +4,7 @@ These models are loaded by utils/config_loader.py from settings.yaml and env-spe
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 # -------------------------------------------------------------------------
@@ -49,19 +49,178 @@ class SnowflakeSettings(BaseModel):
     schema: Optional[str]
 
 
+class ResultCacheSettings(BaseModel):
+    enabled: bool = Field(False, description="Cache SELECT results keyed by canonical SQL.")
+    max_bytes: int = Field(256 * 1024 * 1024, description="Approximate memory budget for cached results.")
+    default_ttl_seconds: float = Field(300, description="TTL for queries that read no table listed below.")
+    table_ttl_seconds: Dict[str, float] = Field(
+        default_factory=dict,
+        description="Per-table TTLs (table or schema.table); a query uses the smallest TTL of the tables it reads.",
+    )
+
+
+class StreamingSettings(BaseModel):
+    chunk_size: int = Field(10_000, description="Rows fetched per round trip on the server-side cursor.")
+    max_rows: Optional[int] = Field(1_000_000, description="Stop fetching after this many rows.")
+    max_bytes: Optional[int] = Field(512 * 1024 * 1024, description="Stop fetching after roughly this much data.")
+    preview_rows: int = Field(1_000, description="Rows handed to downstream agents alongside the aggregates.")
+
+
+class PoolSettings(BaseModel):
+    pool_size: int = Field(5, description="Connections kept open per engine.")
+    max_overflow: int = Field(10, description="Extra connections allowed above pool_size under load.")
+    pool_timeout: float = Field(30, description="Seconds to wait for a free connection before failing.")
+    pool_pre_ping: bool = Field(True, description="Check connections for liveness before handing them out.")
+    pool_recycle: int = Field(1800, description="Recycle connections older than this many seconds.")
+    executor_workers: int = Field(8, description="Size of the dedicated thread pool for blocking DB calls (per provider).")
+
+
+class SchemaCacheSettings(BaseModel):
+    enabled: bool = Field(True, description="Persist schema snapshots and refresh them incrementally.")
+    path: str = Field(".cache/schema_snapshot.json", description="Local file holding the snapshot.")
+    check_interval_seconds: float = Field(60, description="Minimum time between catalog fingerprint checks.")
+    schemas: List[str] = Field(default_factory=list, description="Schemas to snapshot (default schema when empty).")
+
+
+class CostGateSettings(BaseModel):
+    enabled: bool = Field(False, description="Estimate every query (EXPLAIN / dry run) before executing it.")
+    row_limit: Optional[int] = Field(10_000, description="LIMIT/TOP injected when a query has none, or a larger one.")
+    max_rows_scanned: Optional[float] = Field(None, description="Budget on the planner's rows-scanned estimate.")
+    max_bytes_scanned: Optional[float] = Field(None, description="Budget on bytes scanned (BigQuery, Snowflake, Postgres).")
+    max_plan_cost: Optional[float] = Field(None, description="Budget on the provider's plan cost units.")
+    on_exceed: str = Field("limit", description="limit | reject: tighten the row limit and re-estimate, or fail.")
+    fallback_limit: int = Field(1_000, description="Row limit used when rewriting an over-budget query.")
+
+
 class DatabaseSettings(BaseModel):
     provider: str = Field("azure_sql", description="Database provider: azure_sql | bigquery | snowflake")
+    url: Optional[str] = Field(
+        None, description="SQLAlchemy URL of the warehouse; built from the provider's block below when unset."
+    )
     azure_sql: Optional[AzureSQLSettings] = None
     bigquery: Optional[BigQuerySettings] = None
     snowflake: Optional[SnowflakeSettings] = None
+    result_cache: ResultCacheSettings = Field(default_factory=ResultCacheSettings)
+    streaming: StreamingSettings = Field(default_factory=StreamingSettings)
+    pool: PoolSettings = Field(default_factory=PoolSettings)
+    schema_cache: SchemaCacheSettings = Field(default_factory=SchemaCacheSettings)
+    cost_gate: CostGateSettings = Field(default_factory=CostGateSettings)
+    async_mode: str = Field(
+        "auto", description="auto | on | off: use SQLAlchemy AsyncEngine when the URL names an async driver."
+    )
 
 
 # -------------------------------------------------------------------------
 # Orchestration and PowerBI
 # -------------------------------------------------------------------------
+class SQLCacheSettings(BaseModel):
+    enabled: bool = Field(True, description="Reuse validated SQL for questions that normalise to the same text.")
+    max_entries: int = Field(1024, description="Questions kept in the LRU cache.")
+    ttl_seconds: Optional[float] = Field(3600, description="Lifetime of a cached statement; unset = until evicted.")
+
+
+class SchemaIndexSettings(BaseModel):
+    enabled: bool = Field(True, description="Send only the tables relevant to the question to generate_sql/repair_sql.")
+    top_k: int = Field(8, description="Best-matching tables selected per question.")
+    hops: int = Field(1, description="Foreign-key steps added around the selected tables.")
+    max_tables: int = Field(20, description="Upper bound on tables placed in the prompt.")
+    min_tables: int = Field(30, description="Catalogs with at most this many tables are sent whole.")
+
+
+class GuardrailSettings(BaseModel):
+    verdict_cache_size: int = Field(4096, description="Guardrail verdicts kept in the LRU cache (keyed by SQL hash).")
+    remote_check: str = Field(
+        "ambiguous", description="ambiguous | never | always: when to ask the Foundry guardrail as well."
+    )
+    remote_ttl_seconds: float = Field(600, description="How long a remote verdict is reused.")
+
+
+class CoalescingSettings(BaseModel):
+    plans: bool = Field(True, description="Identical concurrent run_plan calls share one execution.")
+    steps: bool = Field(True, description="Identical concurrent agent invocations share one call.")
+
+
+class LLMSchedulerSettings(BaseModel):
+    enabled: bool = Field(True, description="Route every LLM plugin call through the central scheduler.")
+    requests_per_minute: Optional[float] = Field(None, description="Deployment RPM quota; unset = unlimited.")
+    tokens_per_minute: Optional[float] = Field(None, description="Deployment TPM quota; unset = unlimited.")
+    max_queue: int = Field(1000, description="Calls allowed to wait; beyond that submit() fails fast.")
+    max_throttle_retries: int = Field(5, description="429 responses absorbed per call before giving up.")
+    default_retry_after_seconds: float = Field(1.0, description="Back-off when a 429 carries no Retry-After.")
+    max_output_tokens: int = Field(800, description="Completion allowance added to each call's token estimate.")
+
+
+class StepStoreSettings(BaseModel):
+    enabled: bool = Field(False, description="Memoize step results so reruns resume after the last finished step.")
+    backend: str = Field("memory", description="memory | sqlite | memory+sqlite")
+    path: str = Field(".cache/step_store.sqlite", description="SQLite file for the sqlite backends.")
+    ttl_seconds: float = Field(3600, description="Default lifetime of a memoized result (per step: memo_ttl_seconds).")
+    max_entries: int = Field(1024, description="Entries kept by the in-memory backend.")
+    share_across_plans: bool = Field(True, description="Plans with identical steps (id, agent, input) share results.")
+
+
+class BatchQuerySettings(BaseModel):
+    max_concurrency: int = Field(8, description="Questions of one /query/batch request run at the same time.")
+    max_questions: int = Field(500, description="Upper bound on questions per /query/batch request.")
+    group_llm_calls: bool = Field(True, description="Group concurrent generate_sql calls into one generate_sql_batch prompt.")
+    max_group_size: int = Field(8, description="Questions per grouped generate_sql_batch call.")
+    group_window_ms: float = Field(20, description="How long a generate_sql call waits for others to group with.")
+
+
+class ObservabilitySettings(BaseModel):
+    metrics_endpoint: bool = Field(True, description="Serve Prometheus metrics on GET /metrics.")
+    loop_lag_interval_ms: float = Field(500, description="Event-loop lag sampling period; 0 disables the monitor.")
+    tracing: bool = Field(False, description="Emit OpenTelemetry spans (needs opentelemetry-api and a configured SDK).")
+    service_name: str = Field("text-to-sql-agents", description="Tracer name used for the spans.")
+
+
+class CassetteSettings(BaseModel):
+    mode: str = Field("off", description="off | record | replay: capture LLM / Foundry calls to `path`, or answer them from it.")
+    path: str = Field(".cache/llm_cassette.jsonl.gz", description="Gzipped JSON-lines file of recorded calls.")
+    record_prompts: bool = Field(True, description="Store call arguments (prompts) with each response, not only their hash.")
+    ignore_args: List[str] = Field(
+        default_factory=lambda: ["schema"], description="Arguments left out of the replay key (still recorded)."
+    )
+    latency_scale: float = Field(1.0, description="Replay: recorded latency x this (1 = as recorded, 0 = no delay).")
+    on_miss: str = Field("error", description="Replay: error | live - fail unrecorded calls, or make them for real.")
+
+
+class AdmissionSettings(BaseModel):
+    enabled: bool = Field(True, description="Gate /query, /query/stream and /query/batch runs through admission control.")
+    max_concurrency: int = Field(16, description="Plan runs executing at once; the rest wait in the admission queue.")
+    max_queue: int = Field(200, description="Runs allowed to wait; beyond that requests get 503 at once.")
+    per_user_concurrency: int = Field(4, description="Plan runs one user_id may have executing at once.")
+    per_user_queue: int = Field(8, description="Further runs one user_id may have waiting; beyond that 429.")
+    per_plan_concurrency: Dict[str, int] = Field(
+        default_factory=dict, description="Executing-run limit per plan name, e.g. {text_to_sql_basic: 8}."
+    )
+    max_queue_wait_ms: Optional[float] = Field(
+        2000, description="Interactive SLA: 503 when the estimated (or actual) queue wait exceeds it; unset = wait."
+    )
+    batch_max_queue_wait_ms: Optional[float] = Field(None, description="Same for /query/batch questions; unset = wait.")
+    default_retry_after_seconds: float = Field(1.0, description="Smallest Retry-After sent with a 429 / 503.")
+
+
+class StartupSettings(BaseModel):
+    background_init: bool = Field(
+        True, description="Serve /health/live at once and initialise in the background; /health/ready turns 200 when done."
+    )
+
+
 class OrchestrationSettings(BaseModel):
     retry_max: int = Field(2, description="Maximum number of retries for SQL regeneration.")
     enable_powerbi: bool = Field(True, description="Whether to enable Power BI export integration.")
+    sql_cache: SQLCacheSettings = Field(default_factory=SQLCacheSettings)
+    schema_index: SchemaIndexSettings = Field(default_factory=SchemaIndexSettings)
+    guardrail: GuardrailSettings = Field(default_factory=GuardrailSettings)
+    coalescing: CoalescingSettings = Field(default_factory=CoalescingSettings)
+    batch: BatchQuerySettings = Field(default_factory=BatchQuerySettings)
+    llm_scheduler: LLMSchedulerSettings = Field(default_factory=LLMSchedulerSettings)
+    step_store: StepStoreSettings = Field(default_factory=StepStoreSettings)
+    observability: ObservabilitySettings = Field(default_factory=ObservabilitySettings)
+    cassette: CassetteSettings = Field(default_factory=CassetteSettings)
+    admission: AdmissionSettings = Field(default_factory=AdmissionSettings)
+    startup: StartupSettings = Field(default_factory=StartupSettings)
 
 
 class PowerBISettings(BaseModel):
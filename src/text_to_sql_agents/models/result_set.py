@@ -0,0 +1,159 @@
+# src/text_to_sql_agents/models/result_set.py
+from __future__ import annotations
+import math
+import sys
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:  # pandas is imported on first use: building a result set does not need it
+    import pandas as pd
+
+
+def is_dataframe(value: Any) -> bool:
+    """isinstance(value, pd.DataFrame) without importing pandas: nothing is a DataFrame until it is loaded."""
+    pandas = sys.modules.get("pandas")
+    return pandas is not None and isinstance(value, pandas.DataFrame)
+
+
+def _python_values(values: np.ndarray) -> List[Any]:
+    kind = values.dtype.kind
+    if kind in "Mm":
+        # nanosecond datetimes / timedeltas come out of tolist() as bare integers; at
+        # microsecond precision they become datetime / timedelta objects (NaT -> None)
+        return values.astype("datetime64[us]" if kind == "M" else "timedelta64[us]").tolist()
+    return values.tolist()
+
+
+class ColumnarResult:
+    """
+    Query result held column-wise as read-only NumPy arrays.
+    Shared between plan steps by reference: slicing (head) returns views, and row
+    dicts are only built by to_records(), at the HTTP boundary.
+    """
+
+    __slots__ = ("_data", "_length", "_nbytes")
+
+    def __init__(self, data: Dict[str, np.ndarray]):
+        lengths = {len(values) for values in data.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"ColumnarResult columns have different lengths: {sorted(lengths)}")
+        for values in data.values():
+            values.flags.writeable = False
+        self._data = data
+        self._length = lengths.pop() if lengths else 0
+        self._nbytes: Optional[int] = None
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "ColumnarResult":
+        # to_numpy() on a single column returns a view of the DataFrame block where possible
+        return cls({str(column): df[column].to_numpy() for column in df.columns})
+
+    @classmethod
+    def from_records(cls, rows: List[Dict[str, Any]]) -> "ColumnarResult":
+        if not rows:
+            return cls({})
+        import pandas as pd
+
+        return cls.from_dataframe(pd.DataFrame.from_records(rows))
+
+    @classmethod
+    def concat(cls, parts: Iterable["ColumnarResult"]) -> "ColumnarResult":
+        parts = [p for p in parts if p.columns]
+        if not parts:
+            return cls({})
+        if len(parts) == 1:
+            return parts[0]
+        return cls({c: np.concatenate([p._data[c] for p in parts]) for c in parts[0].columns})
+
+    # ------------------------------------------------------------------
+    # Access
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._data)
+
+    def column(self, name: str) -> np.ndarray:
+        return self._data[name]
+
+    def head(self, n: int) -> "ColumnarResult":
+        if n >= self._length:
+            return self
+        return ColumnarResult({c: values[:n] for c, values in self._data.items()})
+
+    def is_numeric(self, name: str) -> bool:
+        kind = self._data[name].dtype.kind
+        return kind in "iuf"
+
+    def numeric_columns(self) -> List[str]:
+        return [c for c in self._data if self.is_numeric(c)]
+
+    def text_columns(self) -> List[str]:
+        return [c for c, values in self._data.items() if values.dtype.kind in "OUS"]
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory footprint; object columns include the referenced Python objects."""
+        # the columns are read-only, so the per-object walk is done once (getattr: results
+        # pickled into the step store before this slot existed do not have it)
+        if getattr(self, "_nbytes", None) is None:
+            size = 0
+            for values in self._data.values():
+                size += values.nbytes
+                if values.dtype.kind == "O":
+                    size += sum(sys.getsizeof(v) for v in values)
+            self._nbytes = size
+        return self._nbytes
+
+    # ------------------------------------------------------------------
+    # Conversion
+    # ------------------------------------------------------------------
+    def to_records(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Row dicts with plain Python values (NaN -> None), e.g. for a JSON response."""
+        source = self.head(limit) if limit is not None else self
+        columns = source.columns
+        # tolist() converts NumPy scalars to Python objects in one vectorised pass per column
+        lists = [_python_values(source._data[c]) for c in columns]
+        return [
+            {c: (None if isinstance(v, float) and math.isnan(v) else v) for c, v in zip(columns, row)}
+            for row in zip(*lists)
+        ]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        import pandas as pd
+
+        return pd.DataFrame(self._data, copy=False)
+
+    def column_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Vectorised per-column statistics: count / nulls everywhere, min / max / mean / sum for numerics."""
+        import pandas as pd
+
+        stats: Dict[str, Dict[str, Any]] = {}
+        for name, values in self._data.items():
+            nulls = int(pd.isna(values).sum())
+            col = {"count": self._length - nulls, "nulls": nulls}
+            if self.is_numeric(name) and col["count"]:
+                col.update(
+                    min=np.nanmin(values).item(),
+                    max=np.nanmax(values).item(),
+                    sum=np.nansum(values).item(),
+                    mean=np.nanmean(values).item(),
+                )
+            stats[name] = col
+        return stats
+
+    def __repr__(self) -> str:
+        return f"ColumnarResult(rows={self._length}, columns={self.columns})"
+
+    def __str__(self) -> str:
+        # what an LLM prompt sees for ${exec}: a bounded CSV preview, not the whole result
+        preview_rows = 50
+        preview = self.to_dataframe().head(preview_rows).to_csv(index=False)
+        suffix = f"... ({self._length - preview_rows} more rows)\n" if self._length > preview_rows else ""
+        return f"{preview}{suffix}"
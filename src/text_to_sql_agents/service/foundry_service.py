@@ -1,12 +1,13 @@
 # src/text_to_sql_agents/service/foundry_agent_service.py
 
 import asyncio
+from typing import TYPE_CHECKING
 from loguru import logger
-from semantic_kernel import Kernel
 
 from ..models.config_models import AppConfig
-from .kernel_factory import KernelFactory
-from .plugin_registry import PluginRegistry
+
+if TYPE_CHECKING:
+    from semantic_kernel import Kernel
 
 
 class FoundryAgentService:
@@ -15,22 +16,34 @@ class FoundryAgentService:
     and registering Magentic Orchestration agents.
     """
 
-    def __init__(self, config: AppConfig, db_adapter):
+    def __init__(self, config: AppConfig, db_adapter=None):
         self.config = config
         self.db_adapter = db_adapter
-        self.kernel: Kernel | None = None
+        self.kernel: "Kernel | None" = None
         self.foundry_session = None
 
     async def initialize(self):
-        """Initialize kernel and connect to Azure Foundry agent host."""
+        """Initialize kernel and connect to Azure Foundry agent host (both at once: neither needs the other)."""
         logger.info("🚀 Starting Azure Foundry agent service...")
 
-        self.kernel = KernelFactory.create_kernel(self.config)
-        await PluginRegistry.register_plugins(self.kernel, self.db_adapter)
-
-        await self._connect_to_foundry()
+        stages = [asyncio.ensure_future(self._create_kernel()), asyncio.ensure_future(self._connect_to_foundry())]
+        try:
+            await asyncio.gather(*stages)
+        except BaseException:
+            for stage in stages:
+                stage.cancel()
+            raise
         logger.success("✅ Azure Foundry agent service initialized.")
 
+    async def _create_kernel(self):
+        # Semantic Kernel is imported on first initialisation, not with the app; the kernel is
+        # built on a worker thread so its connector setup overlaps the Foundry connect
+        from .kernel_factory import KernelFactory
+        from .plugin_registry import PluginRegistry
+
+        self.kernel = await asyncio.to_thread(KernelFactory.create_kernel, self.config)
+        await PluginRegistry.register_plugins(self.kernel, self.db_adapter)
+
     async def _connect_to_foundry(self):
         """
         Connect to Azure AI Foundry orchestration environment.
@@ -49,6 +62,12 @@ class FoundryAgentService:
             logger.exception("❌ Failed to connect to Azure Foundry.")
             raise e
 
+    async def shutdown(self):
+        """Drop the Foundry session (the app calls this on shutdown)."""
+        if self.foundry_session:
+            logger.info("Disconnecting from Azure AI Foundry.")
+        self.foundry_session = None
+
     async def run_magentic_workflow(self, plan_name: str, inputs: dict):
         """
         Run a multi-agent orchestration plan via Magentic orchestration layer.
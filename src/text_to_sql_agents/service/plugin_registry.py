@@ -1,28 +1,41 @@
 # src/text_to_sql_agents/service/plugin_registry.py
 
+from typing import Optional
+
 from semantic_kernel import Kernel
 from loguru import logger
 
 from ..agents.sql_generator_agent import SQLGeneratorAgent
-from ..agents.guardrail_agent import GuardrailAgent
+from ..agents.guardrail import GuardrailAgent
 from ..agents.executor_agent import SQLExecutorAgent
 from ..agents.summarizer_agent import SummarizerAgent
 from ..agents.visualization_agent import VisualizationAgent
 from ..agents.powerbi_agent import PowerBIAgent
+from ..utils.sql_guard import GuardrailEngine
 
 
 class PluginRegistry:
     """
     Loads all Semantic Kernel-compatible agents (as plugins)
     and registers them with the kernel runtime.
+    The guardrail agent uses the given GuardrailEngine, so it shares its verdict cache and
+    configuration (orchestration.guardrail) with the orchestration's guardrail step.
     """
 
+    def __init__(self, kernel: Kernel, db_adapter=None, guardrail: Optional[GuardrailEngine] = None):
+        self.kernel = kernel
+        self.db_adapter = db_adapter
+        self.guardrail = guardrail
+
+    async def load_all_plugins(self):
+        return await self.register_plugins(self.kernel, self.db_adapter, guardrail=self.guardrail)
+
     @staticmethod
-    async def register_plugins(kernel: Kernel, db_adapter):
+    async def register_plugins(kernel: Kernel, db_adapter, guardrail: Optional[GuardrailEngine] = None):
         logger.info("🔌 Registering Semantic Kernel agent plugins...")
 
         sql_gen = SQLGeneratorAgent()
-        guardrail = GuardrailAgent()
+        guardrail = GuardrailAgent(guardrail)
         executor = SQLExecutorAgent(db_adapter)
         summarizer = SummarizerAgent()
         visualizer = VisualizationAgent()
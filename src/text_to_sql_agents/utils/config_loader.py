@@ -1,10 +1,12 @@
 import os
 import yaml
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
+from urllib.parse import quote_plus
 from loguru import logger
 
-from ..models.config_models import AppConfig
+from ..models.config_models import AppConfig, DatabaseSettings
 
 
 def deep_merge_dict(base: dict, override: dict) -> dict:
@@ -25,7 +27,7 @@ def load_config(env: Optional[str] = None) -> AppConfig:
     """
     env = env or os.getenv("APP_ENV", "development")
 
-    config_path = Path(__file__).resolve().parents[2] / "config" / "settings.yaml"
+    config_path = Path(__file__).resolve().parents[1] / "config" / "settings.yaml"
     if not config_path.exists():
         raise FileNotFoundError(f"Configuration file not found: {config_path}")
 
@@ -44,3 +46,29 @@ def load_config(env: Optional[str] = None) -> AppConfig:
     except Exception as e:
         logger.error(f"❌ Failed to parse configuration: {e}")
         raise
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> AppConfig:
+    """Configuration of the running app (APP_ENV), loaded once per process."""
+    return load_config()
+
+
+def database_url(database: DatabaseSettings) -> Optional[str]:
+    """
+    SQLAlchemy URL for the configured warehouse: `database.url` when set, else one built
+    from the provider's block (azure_sql over ODBC Driver 18, bigquery). None when neither
+    says where the warehouse is (snowflake needs an explicit url with its credentials).
+    """
+    if database.url:
+        return database.url
+    if database.provider == "azure_sql" and database.azure_sql is not None:
+        sql = database.azure_sql
+        return (
+            f"mssql+pyodbc://{quote_plus(sql.username)}:{quote_plus(sql.password)}@{sql.server}/{sql.database}"
+            "?driver=ODBC+Driver+18+for+SQL+Server&Encrypt=yes"
+        )
+    if database.provider == "bigquery" and database.bigquery is not None and database.bigquery.project_id:
+        bq = database.bigquery
+        return f"bigquery://{bq.project_id}/{bq.dataset}" if bq.dataset else f"bigquery://{bq.project_id}"
+    return None
@@ -0,0 +1,251 @@
+# src/text_to_sql_agents/utils/sql_guard.py
+"""
+Local SQL guardrail: one pass over the lexer's tokens decides whether a statement is a
+single read-only query. Keywords inside literals, comments and quoted identifiers are
+never mistaken for commands. Statements the rules cannot judge (calls to functions that
+are not known built-ins, external data access) come back as "ambiguous" so a remote
+reviewer can be asked about those only.
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from .sql_lexer import COMMENT, PUNCT, QUOTED_IDENT, STRING, WORD, iter_tokens
+from ..magentic_orchestration.caching import LRUTTLCache
+from ..models.config_models import GuardrailSettings
+
+
+ALLOW = "allow"
+BLOCK = "block"
+AMBIGUOUS = "ambiguous"
+
+# statements (or clauses) that write, change schema, change permissions or run code.
+# REPLACE is left out on purpose: it is a common string function, and CREATE OR REPLACE /
+# REPLACE INTO are caught by CREATE / INTO.
+FORBIDDEN_KEYWORDS = frozenset(
+    {
+        "INSERT", "UPDATE", "DELETE", "MERGE", "UPSERT", "DROP", "ALTER", "CREATE",
+        "TRUNCATE", "RENAME", "GRANT", "REVOKE", "DENY", "EXEC", "EXECUTE", "CALL", "DO",
+        "COPY", "UNLOAD", "PUT", "REMOVE", "ATTACH", "DETACH", "VACUUM", "ANALYZE", "REINDEX",
+        "CLUSTER", "LOCK", "UNLOCK", "SET", "RESET", "USE", "DECLARE", "SHUTDOWN", "KILL",
+        "BACKUP", "RESTORE", "BULK", "DBCC", "WAITFOR", "COMMIT", "ROLLBACK", "BEGIN",
+        "SAVEPOINT", "PRAGMA", "LOAD", "IMPORT", "EXPORT", "INTO", "OUTFILE", "DUMPFILE",
+    }
+)
+
+# functions that reach outside the database or into the OS; blocked outright
+FORBIDDEN_FUNCTIONS = frozenset(
+    {"XP_CMDSHELL", "PG_SLEEP", "PG_READ_FILE", "PG_READ_BINARY_FILE", "LO_IMPORT", "LO_EXPORT", "LOAD_FILE", "SLEEP", "BENCHMARK"}
+)
+
+# external data access: legitimate in some warehouses, but not something to allow blindly
+EXTERNAL_FUNCTIONS = frozenset({"OPENROWSET", "OPENQUERY", "OPENDATASOURCE", "DBLINK", "EXTERNAL_QUERY", "READ_CSV", "READ_PARQUET"})
+
+# built-in functions common to the supported warehouses; any other call is ambiguous
+KNOWN_FUNCTIONS = frozenset(
+    {
+        # aggregates and windows
+        "COUNT", "SUM", "AVG", "MIN", "MAX", "STDEV", "STDDEV", "STDDEV_POP", "STDDEV_SAMP", "VARIANCE",
+        "VAR", "VAR_POP", "VAR_SAMP", "MEDIAN", "PERCENTILE_CONT", "PERCENTILE_DISC", "APPROX_COUNT_DISTINCT",
+        "STRING_AGG", "LISTAGG", "ARRAY_AGG", "GROUP_CONCAT", "ROW_NUMBER", "RANK", "DENSE_RANK", "NTILE",
+        "LAG", "LEAD", "FIRST_VALUE", "LAST_VALUE", "NTH_VALUE", "CUME_DIST", "PERCENT_RANK", "GROUPING",
+        "GROUPING_ID", "ANY_VALUE", "BOOL_AND", "BOOL_OR", "EVERY", "CORR", "COVAR_POP", "COVAR_SAMP",
+        # conditionals and conversion
+        "COALESCE", "NULLIF", "ISNULL", "IFNULL", "NVL", "NVL2", "IIF", "IFF", "IF", "DECODE",
+        "ZEROIFNULL", "NULLIFZERO", "TRY_TO_NUMBER", "TRY_TO_DATE", "GREATEST", "LEAST",
+        "CAST", "TRY_CAST", "CONVERT", "TRY_CONVERT", "SAFE_CAST", "TO_CHAR", "TO_DATE", "TO_NUMBER",
+        "TO_TIMESTAMP", "TO_VARCHAR", "PARSE_DATE", "FORMAT",
+        # strings
+        "LOWER", "UPPER", "TRIM", "LTRIM", "RTRIM", "LENGTH", "LEN", "CHAR_LENGTH", "CHARACTER_LENGTH",
+        "SUBSTRING", "SUBSTR", "LEFT", "RIGHT", "CONCAT", "CONCAT_WS", "POSITION", "CHARINDEX", "INSTR",
+        "STRPOS", "LPAD", "RPAD", "SPLIT_PART", "REGEXP_REPLACE", "REGEXP_LIKE", "REGEXP_SUBSTR", "INITCAP",
+        "REVERSE", "REPEAT", "REPLICATE", "REPLACE", "STUFF", "TRANSLATE", "ASCII", "CHR", "CHAR",
+        "JSON_VALUE", "JSON_QUERY", "JSON_EXTRACT", "JSON_EXTRACT_PATH_TEXT", "STRING_SPLIT",
+        # numbers
+        "ABS", "ROUND", "CEIL", "CEILING", "FLOOR", "POWER", "POW", "SQRT", "EXP", "LN", "LOG", "LOG10",
+        "MOD", "SIGN", "TRUNC", "TRUNCATE_NUMBER", "DIV0", "RANDOM", "RAND",
+        # dates
+        "NOW", "CURRENT_DATE", "CURRENT_TIMESTAMP", "GETDATE", "GETUTCDATE", "SYSDATETIME", "SYSDATE",
+        "DATE", "DATETIME", "TIMESTAMP", "TIME", "DATEADD", "DATEDIFF", "DATE_ADD", "DATE_SUB", "DATE_DIFF",
+        "DATE_TRUNC", "DATE_PART", "DATEPART", "DATENAME", "DATEFROMPARTS", "EXTRACT", "YEAR", "MONTH",
+        "DAY", "HOUR", "MINUTE", "SECOND", "WEEK", "QUARTER", "EOMONTH", "LAST_DAY", "STRFTIME",
+        "JULIANDAY", "TIMESTAMPDIFF", "TIMESTAMPADD", "AGE", "MAKE_DATE", "FORMAT_DATE",
+        # keywords that take parentheses
+        "IN", "EXISTS", "ANY", "ALL", "SOME", "OVER", "FILTER", "WITHIN", "VALUES", "AS", "ON", "USING",
+        "AND", "OR", "NOT", "FROM", "SELECT", "WHERE", "JOIN", "LATERAL", "UNNEST", "FLATTEN", "TABLE",
+        "PARTITION", "ROWS", "RANGE", "BETWEEN", "WHEN", "THEN", "ELSE", "CASE", "END", "BY", "LIMIT",
+        "TOP", "OFFSET", "FETCH", "UNION", "EXCEPT", "INTERSECT", "WITH", "DISTINCT", "IS", "LIKE", "ILIKE",
+        "HAVING", "QUALIFY", "PIVOT", "UNPIVOT", "TABLESAMPLE", "INTERVAL", "ARRAY", "STRUCT", "ROW",
+        "ROLLUP", "CUBE", "SETS",  # GROUP BY ROLLUP (...), CUBE (...), GROUPING SETS (...)
+    }
+)
+
+# conversions whose type argument may carry parentheses: CAST(x AS DECIMAL(10,2)), CONVERT(VARCHAR(10), x)
+CAST_FUNCTIONS = frozenset({"CAST", "TRY_CAST", "SAFE_CAST"})
+CONVERT_FUNCTIONS = frozenset({"CONVERT", "TRY_CONVERT"})
+
+
+@dataclass(frozen=True)
+class GuardVerdict:
+    status: str
+    reasons: List[str] = field(default_factory=list)
+    statements: int = 0
+
+    @property
+    def allowed(self) -> bool:
+        return self.status == ALLOW
+
+
+def analyze_sql(sql: str) -> GuardVerdict:
+    """Classify a SQL text as allow / block / ambiguous in a single pass over its tokens."""
+    if not sql or not sql.strip():
+        return GuardVerdict(BLOCK, ["empty statement"])
+
+    blocked: List[str] = []
+    unsure: List[str] = []
+    statements = 0
+    first_word: Optional[str] = None
+    ended = False  # a ";" closed the current statement
+    prev = None  # previous significant token
+    prev2 = None  # the one before it
+    calls: List[str] = []  # name in front of each open "(" ("" for a bare one)
+    type_name = None  # word known to name a type (inside CAST / CONVERT), not a function
+    cte_depth: Optional[int] = None  # paren depth of a WITH clause whose CTE list is still open
+
+    for tok in iter_tokens(sql, skip_whitespace=True):
+        kind = tok.kind
+        if kind == COMMENT:
+            # /*! ... */ is executed by MySQL; an open comment hides the rest of the text
+            if tok.text.startswith("/*!"):
+                blocked.append("executable comment")
+            if not tok.terminated:
+                blocked.append("unterminated comment")
+            continue
+        if kind in (STRING, QUOTED_IDENT) and not tok.terminated:
+            blocked.append(f"unterminated {'string literal' if kind == STRING else 'quoted identifier'}")
+
+        if kind == PUNCT and tok.text == ";":
+            ended = True
+            prev2, prev = prev, tok
+            continue
+        if ended or statements == 0:
+            statements += 1
+            ended = False
+            if statements == 2:
+                blocked.append("multiple statements")
+
+        if kind == WORD:
+            word = tok.upper
+            if first_word is None:
+                first_word = word
+            if calls and prev is not None:
+                if (prev.upper == "AS" and calls[-1] in CAST_FUNCTIONS) or (
+                    prev.text == "(" and calls[-1] in CONVERT_FUNCTIONS
+                ):
+                    type_name = tok
+            if word == "WITH" and (prev is None or prev.text in ("(", ";")):
+                cte_depth = len(calls)
+            elif word == "SELECT" and cte_depth == len(calls):
+                cte_depth = None
+            if word in FORBIDDEN_KEYWORDS and not (prev is not None and prev.text == "."):
+                blocked.append(f"forbidden keyword {word}")
+            elif word.startswith("XP_"):
+                blocked.append(f"forbidden routine {word}")
+        elif kind == PUNCT and tok.text == "(":
+            name = prev.upper if prev is not None and prev.kind == WORD else ""
+            # "WITH cte (a, b) AS" and ", cte2 (c) AS" are column lists, DECIMAL(10,2) a type
+            cte_header = prev2 is not None and (
+                prev2.upper in ("WITH", "RECURSIVE") or (prev2.text == "," and cte_depth == len(calls))
+            )
+            if not name or prev is type_name or cte_header:
+                pass
+            elif name in FORBIDDEN_FUNCTIONS:
+                blocked.append(f"forbidden routine {name}")
+            elif name in EXTERNAL_FUNCTIONS:
+                unsure.append(f"external data access {name}")
+            elif name not in KNOWN_FUNCTIONS:
+                unsure.append(f"unknown function {name}")
+            calls.append(name)
+        elif kind == PUNCT and tok.text == ")" and calls:
+            calls.pop()
+        elif first_word is None and not (kind == PUNCT and tok.text == "("):
+            first_word = tok.text
+        prev2, prev = prev, tok
+
+    if first_word not in ("SELECT", "WITH"):
+        blocked.append(f"not a query: starts with {first_word or 'nothing'}")
+
+    if blocked:
+        return GuardVerdict(BLOCK, list(dict.fromkeys(blocked)), statements)
+    if unsure:
+        return GuardVerdict(AMBIGUOUS, list(dict.fromkeys(unsure)), statements)
+    return GuardVerdict(ALLOW, [], statements)
+
+
+RemoteCheck = Callable[[str], Awaitable[bool]]
+
+
+class GuardrailEngine:
+    """
+    Local guardrail with an LRU verdict cache keyed by the SQL's hash.
+    - allow / block verdicts are decided locally and cached without expiry
+    - ambiguous statements go to the remote check (when one is configured and enabled);
+      its answer is cached for remote_ttl_seconds, so a transient remote failure does not stick
+    - without a remote check, ambiguous statements are blocked
+    """
+
+    def __init__(self, cache_size: int = 4096, remote_check: str = "ambiguous", remote_ttl_seconds: float = 600):
+        if remote_check not in ("ambiguous", "never", "always"):
+            raise ValueError(f"Unknown remote_check mode: {remote_check}")
+        self._cache = LRUTTLCache(max_entries=cache_size)
+        self.remote_check = remote_check
+        self.remote_ttl_seconds = remote_ttl_seconds
+        self.remote_calls = 0
+
+    @classmethod
+    def from_settings(cls, settings: Optional[GuardrailSettings]) -> "GuardrailEngine":
+        settings = settings or GuardrailSettings()
+        return cls(
+            cache_size=settings.verdict_cache_size,
+            remote_check=settings.remote_check,
+            remote_ttl_seconds=settings.remote_ttl_seconds,
+        )
+
+    @staticmethod
+    def _key(sql: str) -> bytes:
+        return hashlib.sha1(sql.encode("utf-8")).digest()
+
+    def analyze(self, sql: str) -> GuardVerdict:
+        """Local verdict, from the cache when this exact text was seen before."""
+        key = self._key(sql)
+        verdict = self._cache.get(key)
+        if verdict is None:
+            verdict = analyze_sql(sql)
+            self._cache.set(key, verdict)
+        return verdict
+
+    async def check(self, sql: str, remote: Optional[RemoteCheck] = None) -> bool:
+        verdict = self.analyze(sql)
+        if verdict.status == BLOCK:
+            logger.warning(f"Guardrail blocked SQL: {', '.join(verdict.reasons)}")
+            return False
+        wants_remote = self.remote_check == "always" or (self.remote_check == "ambiguous" and verdict.status == AMBIGUOUS)
+        if not wants_remote or remote is None:
+            if verdict.status == AMBIGUOUS:
+                logger.warning(f"Guardrail blocked ambiguous SQL: {', '.join(verdict.reasons)}")
+            return verdict.allowed
+
+        remote_key = (b"remote", self._key(sql))
+        cached = self._cache.get(remote_key)
+        if cached is not None:
+            return cached
+        self.remote_calls += 1
+        allowed = bool(await remote(sql))
+        self._cache.set(remote_key, allowed, ttl_seconds=self.remote_ttl_seconds)
+        return allowed
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._cache.stats(), "remote_calls": self.remote_calls}
@@ -0,0 +1,181 @@
+# src/text_to_sql_agents/utils/sql_lexer.py
+"""
+Minimal single-pass SQL lexer shared by caching, guardrails and validation.
+It only needs to know where comments, literals and quoted identifiers start and end;
+it does not try to be a full parser for any dialect.
+"""
+
+import re
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+
+WHITESPACE = "ws"
+COMMENT = "comment"
+STRING = "string"
+QUOTED_IDENT = "quoted_ident"
+NUMBER = "number"
+WORD = "word"
+PARAM = "param"
+PUNCT = "punct"
+
+# one alternation, tried left to right at each position: a single regex pass over the text.
+# The *_open groups match literals/comments/identifiers that run to the end of the input.
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+)
+    |(?P<line_comment>--[^\n]*)
+    |(?P<comment>/\*.*?\*/)
+    |(?P<comment_open>/\*.*)
+    |(?P<string>[NnEe]?'[^']*(?:''[^']*)*'(?!'))
+    |(?P<string_open>[NnEe]?'.*)
+    |(?P<ident>"[^"]*"|`[^`]*`|\[[^\]]*\])
+    |(?P<ident_open>["`\[].*)
+    |(?P<number>(?:\d|\.\d)(?:[^\W_]|\.)*)
+    |(?P<word>(?:[^\W\d_]|[_\#$@])[\w$\#@]*)
+    |(?P<param>:[^\W\d_]\w*|\?\w*)
+    |(?P<punct><=|>=|<>|!=|\|\||::|.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+_GROUP_KINDS = {
+    "ws": (WHITESPACE, True),
+    "line_comment": (COMMENT, True),
+    "comment": (COMMENT, True),
+    "comment_open": (COMMENT, False),
+    "string": (STRING, True),
+    "string_open": (STRING, False),
+    "ident": (QUOTED_IDENT, True),
+    "ident_open": (QUOTED_IDENT, False),
+    "number": (NUMBER, True),
+    "word": (WORD, True),
+    "param": (PARAM, True),
+    "punct": (PUNCT, True),
+}
+
+_CLAUSE_WORDS = frozenset(
+    {
+        "WHERE", "GROUP", "ORDER", "HAVING", "LIMIT", "OFFSET", "JOIN", "INNER", "LEFT", "RIGHT",
+        "FULL", "CROSS", "OUTER", "ON", "USING", "UNION", "EXCEPT", "INTERSECT", "WINDOW",
+        "QUALIFY", "FETCH", "FOR", "NATURAL", "WITH", "TABLESAMPLE", "PIVOT", "UNPIVOT",
+    }
+)
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+    pos: int
+    # False for a string/comment/quoted identifier that runs to the end of the input
+    terminated: bool = True
+
+    @property
+    def upper(self) -> str:
+        return self.text.upper()
+
+
+def iter_tokens(sql: str, skip_whitespace: bool = False) -> Iterator[Token]:
+    """Tokens in order, produced lazily from one scan of the text."""
+    for m in _TOKEN_RE.finditer(sql):
+        kind, terminated = _GROUP_KINDS[m.lastgroup]
+        if skip_whitespace and kind == WHITESPACE:
+            continue
+        text = m.group()
+        if kind == WORD and text[0] == "@":
+            kind = PARAM
+        yield Token(kind, text, m.start(), terminated)
+
+
+def tokenize(sql: str) -> List[Token]:
+    return list(iter_tokens(sql))
+
+
+def significant(tokens: List[Token]) -> List[Token]:
+    """Drop whitespace and comments."""
+    return [t for t in tokens if t.kind not in (WHITESPACE, COMMENT)]
+
+
+def canonicalize_sql(sql: str) -> str:
+    """
+    Canonical text of a statement for use as a cache key: comments dropped,
+    whitespace collapsed, trailing semicolons removed and unquoted words upper-cased.
+    Literals and quoted identifiers are kept byte-for-byte.
+    Unquoted identifiers are case-insensitive on every supported warehouse,
+    so upper-casing them along with the keywords is safe.
+    """
+    out: List[str] = []
+    for tok in significant(tokenize(sql)):
+        text = tok.upper if tok.kind == WORD else tok.text
+        # no space around "." or inside parentheses/before commas, so
+        # "a . b" / "a.b" and "f ( x )" / "f(x)" canonicalise the same way
+        tight = tok.kind == PUNCT and text in (".", ",", "(", ")")
+        if out and not tight and out[-1] not in (".", "("):
+            out.append(" ")
+        out.append(text)
+    while out and out[-1] in (";", " "):
+        out.pop()
+    return "".join(out)
+
+
+def _read_name(toks: List[Token], i: int) -> tuple:
+    """Read a possibly dotted (schema.table) name starting at toks[i]; returns (name, next index)."""
+    parts = []
+    while i < len(toks) and toks[i].kind in (WORD, QUOTED_IDENT):
+        text = toks[i].text
+        parts.append(text[1:-1] if toks[i].kind == QUOTED_IDENT else text)
+        if i + 2 < len(toks) and toks[i + 1].text == "." and toks[i + 2].kind in (WORD, QUOTED_IDENT):
+            i += 2
+            continue
+        i += 1
+        break
+    return ".".join(parts), i
+
+
+def _from_items(sql: str) -> List[Tuple[str, Optional[str]]]:
+    """(table, alias or None) for each name right after FROM / JOIN, lower-cased."""
+    toks = significant(tokenize(sql))
+    items: List[Tuple[str, Optional[str]]] = []
+    i = 0
+    while i < len(toks):
+        if toks[i].kind == WORD and toks[i].upper in ("FROM", "JOIN"):
+            i += 1
+            while i < len(toks):
+                name, j = _read_name(toks, i)
+                if not name:
+                    break
+                i = j
+                alias = None
+                # skip an optional alias: [AS] alias
+                if i < len(toks) and toks[i].kind == WORD and toks[i].upper == "AS":
+                    i += 1
+                if i < len(toks) and toks[i].kind in (WORD, QUOTED_IDENT) and toks[i].upper not in _CLAUSE_WORDS:
+                    alias = (toks[i].text[1:-1] if toks[i].kind == QUOTED_IDENT else toks[i].text).lower()
+                    i += 1
+                items.append((name.lower(), alias))
+                if i < len(toks) and toks[i].text == ",":
+                    i += 1
+                    continue
+                break
+        else:
+            i += 1
+    return items
+
+
+def referenced_tables(sql: str) -> Set[str]:
+    """
+    Names that appear right after FROM / JOIN (and comma-separated FROM lists), lower-cased.
+    Subqueries and CTE names are included as-is; callers match against known tables.
+    """
+    return {table for table, _ in _from_items(sql)}
+
+
+def table_aliases(sql: str) -> Dict[str, str]:
+    """
+    Referenced tables keyed by the name the query uses for them (alias or table name),
+    lower-cased: "FROM dbo.orders o JOIN customers" -> {"dbo.orders": "dbo.orders",
+    "o": "dbo.orders", "customers": "customers"}.
+    """
+    items = _from_items(sql)
+    aliases = {table: table for table, _ in items}
+    aliases.update((alias, table) for table, alias in items if alias)
+    return aliases
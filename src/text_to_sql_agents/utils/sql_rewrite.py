@@ -0,0 +1,99 @@
+# src/text_to_sql_agents/utils/sql_rewrite.py
+"""
+Token-level rewrites of generated SQL. Only the outermost query is touched, and a
+statement the rewrite cannot handle safely is returned unchanged.
+"""
+
+from typing import List, Optional, Tuple
+
+from .sql_lexer import COMMENT, NUMBER, PUNCT, WHITESPACE, WORD, Token, iter_tokens
+from ..models.sql_models import SQLQuery
+
+
+# SQLQuery.dialect values that use SELECT TOP n; everything else takes a trailing LIMIT n
+TOP_DIALECTS = frozenset({"tsql", "mssql", "azure_sql", "sqlserver", "synapse", "fabric"})
+
+# SQLAlchemy dialect names -> SQLQuery.dialect
+DIALECT_BY_BACKEND = {
+    "mssql": "tsql",
+    "postgresql": "postgres",
+    "sqlite": "sqlite",
+    "snowflake": "snowflake",
+    "bigquery": "bigquery",
+    "mysql": "mysql",
+    "duckdb": "duckdb",
+}
+
+
+def _top_level(tokens: List[Token]) -> List[Tuple[int, Token]]:
+    """Significant tokens outside any parentheses, with their index in `tokens`."""
+    out, depth = [], 0
+    for i, tok in enumerate(tokens):
+        if tok.kind == PUNCT and tok.text == "(":
+            depth += 1
+        elif tok.kind == PUNCT and tok.text == ")":
+            depth -= 1
+        elif depth == 0 and tok.kind not in (WHITESPACE, COMMENT):
+            out.append((i, tok))
+    return out
+
+
+def apply_row_limit(query: SQLQuery, limit: int) -> Tuple[SQLQuery, bool]:
+    """
+    Cap the rows returned by the outermost SELECT at `limit`, in the query's dialect:
+    SELECT TOP n for T-SQL, a trailing LIMIT n elsewhere. An existing smaller TOP/LIMIT is
+    kept, a larger one is lowered. Returns the (possibly) rewritten query and whether it changed.
+    Left alone: set operations under T-SQL (TOP binds to one branch), OFFSET/FETCH paging,
+    and parameterised limits.
+    """
+    tokens = list(iter_tokens(query.text))
+    top = _top_level(tokens)
+    words = [(i, t.upper) for i, t in top if t.kind == WORD]
+    uppers = {w for _, w in words}
+    if not words or "SELECT" not in uppers or uppers & {"FETCH", "OFFSET"}:
+        return query, False
+
+    def rewritten(parts: List[str]) -> Tuple[SQLQuery, bool]:
+        return query.model_copy(update={"text": "".join(parts)}), True
+
+    texts = [t.text for t in tokens]
+    use_top = query.dialect.lower() in TOP_DIALECTS
+
+    # existing TOP n / LIMIT n on the outer query
+    for i, word in words:
+        if word not in ("TOP", "LIMIT"):
+            continue
+        j = i + 1
+        while j < len(tokens) and tokens[j].kind == WHITESPACE:
+            j += 1
+        paren = j < len(tokens) and tokens[j].text == "("
+        k = j + 1 if paren else j
+        if k >= len(tokens) or tokens[k].kind != NUMBER or not tokens[k].text.isdigit():
+            return query, False  # TOP (@n), LIMIT :n, TOP 10 PERCENT ... : leave to the database
+        if int(tokens[k].text) <= limit:
+            return query, False
+        texts[k] = str(limit)
+        return rewritten(texts)
+
+    if use_top:
+        if uppers & {"UNION", "EXCEPT", "INTERSECT"}:
+            return query, False
+        # first outer SELECT (after any CTEs), past DISTINCT / ALL
+        select_at = next(n for n, (_, w) in enumerate(words) if w == "SELECT")
+        insert_after = words[select_at][0]
+        if select_at + 1 < len(words) and words[select_at + 1][1] in ("DISTINCT", "ALL"):
+            nxt = words[select_at + 1][0]
+            if all(t.kind in (WHITESPACE, COMMENT) for t in tokens[insert_after + 1 : nxt]):
+                insert_after = nxt
+        texts[insert_after] = f"{texts[insert_after]} TOP {limit}"
+        return rewritten(texts)
+
+    # trailing LIMIT, before any final semicolon / comments
+    end = len(tokens)
+    while end > 0 and (tokens[end - 1].kind in (WHITESPACE, COMMENT) or tokens[end - 1].text == ";"):
+        end -= 1
+    return rewritten(texts[:end] + [f" LIMIT {limit}"] + texts[end:])
+
+
+def dialect_for_backend(backend: Optional[str], default: str = "tsql") -> str:
+    return DIALECT_BY_BACKEND.get((backend or "").lower(), default)
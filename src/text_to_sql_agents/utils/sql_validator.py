@@ -0,0 +1,353 @@
+# src/text_to_sql_agents/utils/sql_validator.py
+"""
+Static, schema-aware checks of generated SQL against a schema snapshot, so that a wrong
+table or column is caught (and repaired) without a warehouse round-trip.
+The checks are deliberately conservative: anything the token-level analysis cannot
+resolve with certainty (CTEs, derived tables, table functions) is left for the database.
+"""
+
+import difflib
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from .sql_guard import KNOWN_FUNCTIONS
+from .sql_lexer import _CLAUSE_WORDS, COMMENT, NUMBER, PUNCT, QUOTED_IDENT, STRING, WORD, Token, iter_tokens
+
+
+UNKNOWN_TABLE = "unknown_table"
+UNKNOWN_COLUMN = "unknown_column"
+UNKNOWN_ALIAS = "unknown_alias"
+
+# words that can never be a column reference
+SQL_KEYWORDS = frozenset(
+    {
+        "SELECT", "DISTINCT", "FROM", "WHERE", "AND", "OR", "NOT", "NULL", "IS", "IN", "LIKE", "ILIKE",
+        "BETWEEN", "CASE", "WHEN", "THEN", "ELSE", "END", "AS", "ASC", "DESC", "NULLS", "FIRST", "LAST",
+        "TRUE", "FALSE", "BY", "TOP", "PERCENT", "TIES", "ROWS", "ROW", "ONLY", "NEXT", "PRECEDING",
+        "FOLLOWING", "UNBOUNDED", "CURRENT", "OVER", "PARTITION", "ALL", "ANY", "SOME", "EXISTS",
+        "ESCAPE", "COLLATE", "RECURSIVE", "LATERAL", "APPLY", "BOTH", "LEADING", "TRAILING", "AT", "ZONE",
+        "SEPARATOR", "FILTER", "WITHIN", "IGNORE", "RESPECT", "INTERVAL", "VALUES", "DEFAULT", "UNKNOWN",
+        "YEAR", "MONTH", "DAY", "HOUR", "MINUTE", "SECOND", "WEEK", "QUARTER", "DAYOFWEEK", "DAYOFYEAR",
+        "DOW", "DOY", "EPOCH", "MILLISECOND", "MICROSECOND", "ISOWEEK", "WEEKDAY",
+        "INT", "INTEGER", "BIGINT", "SMALLINT", "TINYINT", "DECIMAL", "NUMERIC", "FLOAT", "REAL", "DOUBLE",
+        "PRECISION", "VARCHAR", "NVARCHAR", "CHAR", "NCHAR", "TEXT", "STRING", "DATE", "DATETIME",
+        "DATETIME2", "TIMESTAMP", "TIME", "BOOLEAN", "BOOL", "BIT", "MONEY", "VARIANT", "JSON",
+    }
+) | _CLAUSE_WORDS | KNOWN_FUNCTIONS
+
+_RELATION_STARTERS = frozenset({"FROM", "JOIN"})
+# keywords after which an opening parenthesis groups an expression rather than calling a function
+_GROUPING_WORDS = frozenset(
+    {
+        "IN", "EXISTS", "AS", "ON", "USING", "AND", "OR", "NOT", "WHERE", "SELECT", "FROM", "JOIN", "WHEN",
+        "THEN", "ELSE", "HAVING", "BY", "ANY", "ALL", "SOME", "LATERAL", "UNION", "EXCEPT", "INTERSECT",
+        "WITH", "VALUES", "IS", "BETWEEN",
+    }
+)
+# functions whose first argument is a bare date part (dd, yy, mm, qq, wk, hh...), not a column
+_DATEPART_FUNCTIONS = frozenset(
+    {
+        "DATEADD", "DATEDIFF", "DATEDIFF_BIG", "DATEPART", "DATENAME", "DATETRUNC", "DATE_TRUNC", "DATE_PART",
+        "TIMESTAMPADD", "TIMESTAMPDIFF",
+    }
+)
+
+
+@dataclass(frozen=True)
+class SQLValidationError:
+    code: str
+    message: str
+    name: str
+    position: int
+    suggestions: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class SQLValidationFailed(ValueError):
+    """Raised when SQL still fails validation after the allowed repairs."""
+
+    def __init__(self, errors: List[SQLValidationError]):
+        super().__init__(f"SQL failed schema validation:\n{format_errors(errors)}")
+        self.errors = errors
+
+
+def format_errors(errors: List[SQLValidationError]) -> str:
+    """One line per error, written for the repair_sql prompt."""
+    lines = []
+    for e in errors:
+        line = f"- {e.code}: {e.message}"
+        if e.suggestions:
+            line += f" (did you mean: {', '.join(e.suggestions)})"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _ident(tok: Token) -> str:
+    text = tok.text[1:-1] if tok.kind == QUOTED_IDENT else tok.text
+    return text.lower()
+
+
+def _is_name(tok: Optional[Token]) -> bool:
+    return tok is not None and tok.kind in (WORD, QUOTED_IDENT)
+
+
+class SQLValidator:
+    """
+    Resolves the tables and columns of a statement against a schema snapshot
+    ({"tables": {"schema.table": {"columns": [{"name": ...}, ...]}}}).
+    - unknown tables after FROM / JOIN
+    - alias.column / table.column where the column does not exist in that table
+    - unqualified columns that exist in none of the statement's tables
+      (only checked when every relation in the statement is a known base table)
+    """
+
+    def __init__(self, snapshot: Dict[str, Any]):
+        self.columns: Dict[str, Set[str]] = {}
+        self.by_name: Dict[str, List[str]] = {}
+        self.schemas: Set[str] = set()
+        for full, table in (snapshot or {}).get("tables", {}).items():
+            key = full.lower()
+            self.columns[key] = {str(c.get("name", "")).lower() for c in table.get("columns", [])}
+            self.by_name.setdefault(key.rsplit(".", 1)[-1], []).append(key)
+            if "." in key:
+                self.schemas.add(key.rsplit(".", 1)[0])
+
+    def __bool__(self) -> bool:
+        return bool(self.columns)
+
+    def resolve_table(self, name: str) -> Optional[str]:
+        """Snapshot key for a (possibly schema- or database-qualified) table name."""
+        parts = name.lower().split(".")
+        if len(parts) >= 2:
+            key = ".".join(parts[-2:])
+            return key if key in self.columns else None
+        matches = self.by_name.get(parts[0], [])
+        # the same name in several schemas depends on the session's default schema
+        return matches[0] if len(matches) == 1 else None
+
+    def _missing(self, name: str) -> bool:
+        """True when the table certainly does not exist (its schema, if any, is covered by the snapshot)."""
+        parts = name.lower().split(".")
+        if parts[-1].startswith("#"):
+            return False
+        if len(parts) == 1:
+            return parts[0] not in self.by_name
+        return parts[-2] in self.schemas and ".".join(parts[-2:]) not in self.columns
+
+    def validate(self, sql: str) -> List[SQLValidationError]:
+        toks = [t for t in iter_tokens(sql, skip_whitespace=True) if t.kind != COMMENT]
+        errors: List[SQLValidationError] = []
+        relations: Dict[str, Optional[str]] = {}  # alias or table name -> snapshot key (None: not a base table)
+        consumed: Set[int] = set()
+        aliases: Set[str] = set()
+
+        cte_names = self._cte_names(toks)
+        aliases.update(cte_names)
+
+        # pass 1: relations and aliases
+        stack: List[str] = []
+        i = 0
+        while i < len(toks):
+            tok = toks[i]
+            if tok.kind == PUNCT and tok.text == "(":
+                prev = toks[i - 1] if i else None
+                is_call = prev is not None and prev.kind == WORD and prev.upper not in _GROUPING_WORDS
+                stack.append("call" if is_call else "group")
+            elif tok.kind == PUNCT and tok.text == ")":
+                if stack:
+                    stack.pop()
+                # "(subquery) alias" names a derived table
+                nxt = toks[i + 1] if i + 1 < len(toks) else None
+                if nxt is not None and nxt.kind == WORD and nxt.upper not in SQL_KEYWORDS:
+                    aliases.add(_ident(nxt))
+            elif tok.kind == WORD and tok.upper in _RELATION_STARTERS and "call" not in stack[-1:]:
+                i = self._read_relations(toks, i + 1, cte_names, relations, aliases, consumed, errors)
+                continue
+            elif _is_name(tok) and i and toks[i - 1].kind == WORD and toks[i - 1].upper == "AS":
+                aliases.add(_ident(tok))
+            elif tok.kind == WORD and i and (toks[i - 1].upper in ("OVER", "WINDOW")):
+                aliases.add(_ident(tok))
+            i += 1
+
+        # a CTE, derived table, table function or unresolved table is in play
+        unresolved = any(v is None for v in relations.values())
+        in_scope = list(dict.fromkeys(k for k in relations.values() if k is not None))
+        scope_columns: Set[str] = set().union(*(self.columns[k] for k in in_scope)) if in_scope else set()
+
+        # pass 2: column references
+        i = 0
+        while i < len(toks):
+            if i in consumed or not _is_name(toks[i]):
+                i += 1
+                continue
+            chain = [toks[i]]
+            j = i + 1
+            while j + 1 < len(toks) and toks[j].text == "." and (_is_name(toks[j + 1]) or toks[j + 1].text == "*"):
+                chain.append(toks[j + 1])
+                j += 2
+            nxt = toks[j] if j < len(toks) else None
+            prev = toks[i - 1] if i else None
+            if nxt is not None and nxt.text == "(":
+                i = j  # function call, possibly schema-qualified
+                continue
+            if prev is not None and prev.text in (".", "::"):
+                i = j
+                continue
+            if len(chain) > 1:
+                self._check_qualified(chain, relations, aliases, scope_columns, errors)
+            else:
+                self._check_unqualified(toks, i, relations, aliases, scope_columns, unresolved, in_scope, errors)
+            i = j
+        return errors
+
+    @staticmethod
+    def _cte_names(toks: List[Token]) -> Set[str]:
+        names = set()
+        for i, tok in enumerate(toks):
+            if not _is_name(tok) or i + 2 >= len(toks):
+                continue
+            nxt = toks[i + 1]
+            if nxt.kind == WORD and nxt.upper == "AS" and toks[i + 2].text == "(":
+                names.add(_ident(tok))
+            elif nxt.text == "(" and i and toks[i - 1].upper in ("WITH", "RECURSIVE", ","):
+                # name (col, ...) AS (
+                depth, j = 0, i + 1
+                while j < len(toks):
+                    depth += toks[j].text == "("
+                    depth -= toks[j].text == ")"
+                    if depth == 0:
+                        break
+                    j += 1
+                if j + 2 < len(toks) and toks[j + 1].upper == "AS" and toks[j + 2].text == "(":
+                    names.add(_ident(tok))
+        return names
+
+    def _read_relations(self, toks, i, cte_names, relations, aliases, consumed, errors) -> int:
+        """Read `rel [AS] alias [, rel [AS] alias ...]` starting at toks[i]; returns the next index."""
+        while i < len(toks):
+            tok = toks[i]
+            if tok.text == "(":
+                # derived table / subquery: its columns are not known statically
+                relations[f"#derived{i}"] = None
+                return i
+            if not _is_name(tok):
+                return i
+            start = i
+            parts = [_ident(tok)]
+            while i + 2 < len(toks) and toks[i + 1].text == "." and _is_name(toks[i + 2]):
+                parts.append(_ident(toks[i + 2]))
+                i += 2
+            i += 1
+            consumed.update(range(start, i))
+            name = ".".join(parts)
+            if i < len(toks) and toks[i].text == "(":
+                relations[f"#function{start}"] = None  # table-valued function
+                return i
+            if name in cte_names:
+                key = None
+            else:
+                key = self.resolve_table(name)
+                if key is None and self._missing(name):
+                    errors.append(
+                        SQLValidationError(
+                            UNKNOWN_TABLE,
+                            f"table '{name}' does not exist",
+                            name,
+                            tok.pos,
+                            difflib.get_close_matches(parts[-1], list(self.by_name), n=3),
+                        )
+                    )
+            relations[name] = key
+            if len(parts) > 1:
+                relations.setdefault(parts[-1], key)
+            # optional alias
+            if i < len(toks) and toks[i].kind == WORD and toks[i].upper == "AS":
+                i += 1
+            if i < len(toks) and _is_name(toks[i]) and toks[i].upper not in SQL_KEYWORDS:
+                alias = _ident(toks[i])
+                relations[alias] = key
+                aliases.add(alias)
+                consumed.add(i)
+                i += 1
+            # T-SQL table hints: WITH (NOLOCK, ...)
+            if i + 1 < len(toks) and toks[i].upper == "WITH" and toks[i + 1].text == "(":
+                while i < len(toks) and toks[i].text != ")":
+                    consumed.add(i)
+                    i += 1
+                i += 1
+            if i < len(toks) and toks[i].text == ",":
+                i += 1
+                continue
+            return i
+        return i
+
+    def _check_qualified(self, chain, relations, aliases, scope_columns, errors):
+        if chain[-1].text == "*":
+            qualifier_parts, column_tok = chain[:-1], None
+        else:
+            qualifier_parts, column_tok = chain[:-1], chain[-1]
+        qualifier = ".".join(_ident(t) for t in qualifier_parts)
+        short = _ident(qualifier_parts[-1])
+        if qualifier in relations:
+            key = relations[qualifier]
+        elif short in relations and len(qualifier_parts) > 1:
+            key = relations[short]
+        else:
+            if qualifier in aliases or short in aliases or _ident(qualifier_parts[0]) in scope_columns:
+                return  # CTE / derived alias, or a struct field of a known column
+            errors.append(
+                SQLValidationError(
+                    UNKNOWN_ALIAS,
+                    f"'{qualifier}' is not a table or alias in the FROM clause",
+                    qualifier,
+                    qualifier_parts[0].pos,
+                    difflib.get_close_matches(qualifier, [k for k in relations if not k.startswith("#")], n=3),
+                )
+            )
+            return
+        if key is None or column_tok is None:
+            return
+        column = _ident(column_tok)
+        if column not in self.columns[key]:
+            errors.append(
+                SQLValidationError(
+                    UNKNOWN_COLUMN,
+                    f"column '{column}' does not exist in {key}",
+                    f"{qualifier}.{column}",
+                    column_tok.pos,
+                    difflib.get_close_matches(column, sorted(self.columns[key]), n=3),
+                )
+            )
+
+    def _check_unqualified(self, toks, i, relations, aliases, scope_columns, unresolved, in_scope, errors):
+        tok = toks[i]
+        if unresolved or not in_scope or tok.kind != WORD:
+            return
+        if tok.upper in SQL_KEYWORDS or tok.text.startswith(("#", "$")):
+            return
+        name = _ident(tok)
+        if name in aliases or name in relations or name in scope_columns:
+            return
+        prev = toks[i - 1] if i else None
+        if prev is not None and prev.text == "(" and i >= 2 and toks[i - 2].upper in _DATEPART_FUNCTIONS:
+            return
+        # `expr alias` without AS: a name right after the end of an expression
+        if prev is not None and (
+            prev.kind in (NUMBER, STRING, QUOTED_IDENT)
+            or prev.text == ")"
+            or (prev.kind == WORD and (prev.upper == "END" or prev.upper not in SQL_KEYWORDS))
+        ):
+            aliases.add(name)
+            return
+        candidates = sorted(scope_columns)
+        errors.append(
+            SQLValidationError(
+                UNKNOWN_COLUMN,
+                f"column '{name}' does not exist in {', '.join(in_scope)}",
+                name,
+                tok.pos,
+                difflib.get_close_matches(name, candidates, n=3),
+            )
+        )
@@ -0,0 +1,118 @@
+# src/text_to_sql_agents/utils/startup.py
+import asyncio
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+# loaded on first use (first query, first kernel call), never by importing the app
+HEAVY_MODULES = (
+    "pandas",
+    "sqlalchemy",
+    "matplotlib",
+    "semantic_kernel",
+    "openai",
+    "azure.identity",
+    "azure.ai.projects",
+)
+
+
+def loaded_heavy_modules() -> List[str]:
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+class StartupProfile:
+    """
+    Where a cold start spends its time:
+    - import: seconds from the first app import to `mark_imported()`, and which heavy modules
+      were already loaded by then
+    - stages: named init steps (kernel, foundry, controller...), run concurrently by `run_all`,
+      each with its status (pending / running / done / failed / skipped), its start offset
+      and its duration
+    The app is live as soon as it serves requests; it is ready once every stage finished,
+    and failed when a required stage did.
+    """
+
+    def __init__(self, started: Optional[float] = None):
+        self.started = started if started is not None else time.perf_counter()
+        self.import_seconds: Optional[float] = None
+        self.heavy_modules_at_import: List[str] = []
+        self.ready_seconds: Optional[float] = None
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def mark_imported(self):
+        self.import_seconds = time.perf_counter() - self.started
+        self.heavy_modules_at_import = loaded_heavy_modules()
+
+    def _stage(self, name: str, required: bool) -> Dict[str, Any]:
+        stage = self.stages.setdefault(name, {"status": "pending", "required": required})
+        stage["required"] = required
+        return stage
+
+    def _offset_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 1)
+
+    def skip(self, name: str, reason: str = ""):
+        stage = self._stage(name, required=False)
+        stage.update(status="skipped", reason=reason)
+
+    async def run(self, name: str, func: Callable[[], Awaitable[Any]], required: bool = True) -> Any:
+        """Run one stage, recording its timing; an optional stage's failure is logged, not raised."""
+        stage = self._stage(name, required)
+        stage.update(status="running", offset_ms=self._offset_ms())
+        started = time.perf_counter()
+        try:
+            result = await func()
+        except Exception as e:
+            stage.update(status="failed", error=f"{type(e).__name__}: {e}")
+            if required:
+                raise
+            logger.warning(f"Optional startup stage '{name}' failed: {e}")
+            return None
+        finally:
+            stage["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        stage["status"] = "done"
+        return result
+
+    async def run_all(self, stages: List[Tuple[str, Callable[[], Awaitable[Any]], bool]]) -> List[Any]:
+        """Run independent (name, func, required) stages concurrently; raises the first required failure."""
+        for name, _, required in stages:
+            self._stage(name, required)
+        results = await asyncio.gather(
+            *(self.run(name, func, required) for name, func, required in stages), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
+
+    def mark_ready(self):
+        self.ready_seconds = time.perf_counter() - self.started
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_seconds is not None and not self.failed
+
+    @property
+    def failed(self) -> bool:
+        return any(s["status"] == "failed" and s["required"] for s in self.stages.values())
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "failed": self.failed,
+            "import_ms": round(self.import_seconds * 1000, 1) if self.import_seconds is not None else None,
+            "heavy_modules_at_import": self.heavy_modules_at_import,
+            "heavy_modules_loaded": loaded_heavy_modules(),
+            "ready_ms": round(self.ready_seconds * 1000, 1) if self.ready_seconds is not None else None,
+            "stages": {name: dict(stage) for name, stage in self.stages.items()},
+        }
+
+    def summary(self) -> str:
+        stages = ", ".join(
+            f"{name} {stage.get('duration_ms', 0):.0f}ms ({stage['status']})" for name, stage in self.stages.items()
+        )
+        imported = f"{self.import_seconds * 1000:.0f}ms" if self.import_seconds is not None else "n/a"
+        return f"imports {imported}; {stages}"
@@ -0,0 +1,23 @@
+# tests/conftest.py
+import pytest
+import yaml
+
+from src.text_to_sql_agents.magentic_orchestration.magentic_controller import MagenticController
+
+
+@pytest.fixture
+def make_controller(tmp_path):
+    """
+    Controller over `plans` ({name: plan}) whose agents are the given coroutines
+    ({agent name: async fn(payload)}) instead of LLM / warehouse calls.
+    """
+
+    def make(plans, agents, **kwargs):
+        controller = MagenticController(**kwargs)
+        controller.registry._mapping.update(agents)
+        path = tmp_path / "plans.yaml"
+        path.write_text(yaml.safe_dump({"plans": plans}, sort_keys=False), encoding="utf-8")
+        controller.load_plan_file(str(path))
+        return controller
+
+    return make
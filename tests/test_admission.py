@@ -0,0 +1,199 @@
+# tests/test_admission.py
+import asyncio
+
+import httpx
+import pytest
+
+from src.text_to_sql_agents.magentic_orchestration.admission import AdmissionController, AdmissionRejected
+from src.text_to_sql_agents.magentic_orchestration.llm_scheduler import BATCH, INTERACTIVE
+from src.text_to_sql_agents.models.config_models import AdmissionSettings
+
+PLAN = "text_to_sql_basic"
+
+
+async def _hold(admission, user, release, order=None, priority=INTERACTIVE):
+    """Take a slot, note when it was granted, and keep it until `release` is set."""
+    async with admission.slot(user, PLAN, priority):
+        if order is not None:
+            order.append(user)
+        await release.wait()
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_settings_map_to_limits():
+    assert AdmissionController.from_settings(AdmissionSettings(enabled=False)) is None
+    admission = AdmissionController.from_settings(
+        AdmissionSettings(enabled=True, max_concurrency=3, per_plan_concurrency={PLAN: 2}, batch_max_queue_wait_ms=None)
+    )
+    assert admission.max_concurrency == 3 and admission.per_plan_concurrency == {PLAN: 2}
+    assert admission.max_queue_wait[BATCH] is None
+
+
+async def test_user_over_limit_gets_429_and_full_queue_gets_503():
+    admission = AdmissionController(max_concurrency=1, max_queue=1, per_user_concurrency=1, per_user_queue=0)
+    release = asyncio.Event()
+    holder = asyncio.create_task(_hold(admission, "alice", release))
+    await _settle()
+
+    # alice already has per_user_concurrency + per_user_queue runs: her own excess
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.check("alice", PLAN)
+    assert rejected.value.status_code == 429 and rejected.value.reason == "user_limit"
+
+    # bob is fine as a user, but takes the last queue place; carol finds the queue full
+    waiter = asyncio.create_task(_hold(admission, "bob", release))
+    await _settle()
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.check("carol", PLAN)
+    assert rejected.value.status_code == 503 and rejected.value.reason == "queue_full"
+    assert rejected.value.retry_after >= admission.default_retry_after
+
+    release.set()
+    await asyncio.gather(holder, waiter)
+    counts = admission.stats()["classes"]["interactive"]
+    assert counts["completed"] == 2 and counts["rejected"] == 2
+
+
+async def test_estimated_wait_over_sla_gets_503_and_wait_timeout_too():
+    admission = AdmissionController(max_concurrency=1, max_queue_wait={INTERACTIVE: 0.05})
+    release = asyncio.Event()
+    holder = asyncio.create_task(_hold(admission, "alice", release))
+    await _settle()
+
+    # nothing has finished yet, so no estimate: bob waits, and gives up after the SLA
+    with pytest.raises(AdmissionRejected) as rejected:
+        async with admission.slot("bob", PLAN):
+            pass
+    assert rejected.value.status_code == 503 and rejected.value.reason == "queue_timeout"
+
+    # with a known run time the wait is estimated up front instead
+    admission.service_seconds = 10.0
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.check("bob", PLAN)
+    assert rejected.value.reason == "queue_wait" and rejected.value.retry_after == pytest.approx(10.0)
+
+    release.set()
+    await holder
+    assert admission.stats()["queued"] == 0 and admission.running == 0
+
+
+async def test_waiters_are_granted_by_class_then_fair_share():
+    admission = AdmissionController(max_concurrency=2, per_user_concurrency=4, max_queue_wait={BATCH: None})
+    first, second, rest = asyncio.Event(), asyncio.Event(), asyncio.Event()
+    order = []
+    holders = [asyncio.create_task(_hold(admission, "alice", event)) for event in (first, second)]
+    await _settle()
+
+    # queued in this order: a batch run, then alice's, bob's and carol's interactive runs
+    waiters = [asyncio.create_task(_hold(admission, "dave", rest, order, priority=BATCH))]
+    await _settle()
+    for user in ("alice", "bob", "carol"):
+        waiters.append(asyncio.create_task(_hold(admission, user, rest, order)))
+        await _settle()
+    assert admission.stats()["queued"] == 4
+
+    # one slot frees up while alice still runs one: bob, who has none running, goes first
+    first.set()
+    await holders[0]
+    await _settle()
+    assert order == ["bob"]
+
+    # the next one: alice and carol both have nothing running now, so arrival order decides;
+    # the batch run waits for every interactive one
+    second.set()
+    await holders[1]
+    await _settle()
+    assert order == ["bob", "alice"]
+
+    rest.set()
+    await asyncio.gather(*waiters)
+    assert order == ["bob", "alice", "carol", "dave"]
+
+
+async def test_per_plan_limit_holds_back_only_that_plan():
+    admission = AdmissionController(max_concurrency=4, per_plan_concurrency={"heavy": 1})
+    release = asyncio.Event()
+
+    async def hold(plan):
+        async with admission.slot("alice", plan):
+            await release.wait()
+
+    heavy = asyncio.create_task(hold("heavy"))
+    await _settle()
+    assert admission._starts_now("alice", PLAN, INTERACTIVE)
+    assert not admission._starts_now("alice", "heavy", INTERACTIVE)
+    release.set()
+    await heavy
+
+
+async def test_cancel_while_queued_leaves_the_queue():
+    admission = AdmissionController(max_concurrency=1, max_queue_wait={INTERACTIVE: None})
+    release = asyncio.Event()
+    ran = []
+
+    async def run(user):
+        async with admission.slot(user, PLAN):
+            ran.append(user)
+            await release.wait()
+
+    holder = asyncio.create_task(run("alice"))
+    await _settle()
+    gone = asyncio.create_task(run("bob"))
+    await _settle()
+    assert admission.stats()["queued"] == 1
+
+    gone.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await gone
+    stats = admission.stats()
+    assert stats["queued"] == 0 and stats["users_active"] == 1
+    assert stats["classes"]["interactive"]["cancelled_queued"] == 1
+
+    release.set()
+    await holder
+    assert ran == ["alice"] and admission.running == 0
+
+
+async def test_query_endpoint_answers_429_with_retry_after(monkeypatch):
+    from src.text_to_sql_agents import main
+
+    admission = AdmissionController(max_concurrency=1, per_user_concurrency=1, per_user_queue=0, default_retry_after=2.5)
+    monkeypatch.setattr(main, "admission", admission)
+    monkeypatch.setattr(main, "controller", object())  # never reached: the run is turned away first
+    release = asyncio.Event()
+    holder = asyncio.create_task(_hold(admission, "alice", release))
+    await _settle()
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/query", json={"user_query": "top customers", "user_id": "alice"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+
+    release.set()
+    await holder
+
+
+@pytest.mark.parametrize("payload, user", [({"user_id": "alice"}, "alice"), ({}, "api-user")])
+async def test_query_endpoint_passes_the_user_id_to_the_plan(make_controller, monkeypatch, payload, user):
+    from src.text_to_sql_agents import main
+
+    seen = []
+
+    async def upload(payload):
+        seen.append(payload["user_id"])
+        return None
+
+    plan = {"steps": [{"id": "powerbi", "agent": "upload", "input": {"user_id": "${inputs.user_id}"}}]}
+    monkeypatch.setattr(main, "admission", None)
+    monkeypatch.setattr(main, "controller", make_controller({PLAN: plan}, {"upload": upload}))
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/query", json={"user_query": "top customers", **payload})
+    assert response.status_code == 200
+    assert seen == [user]
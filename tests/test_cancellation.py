@@ -0,0 +1,141 @@
+# tests/test_cancellation.py
+import asyncio
+import sqlite3
+import time
+
+import httpx
+import pytest
+
+from src.text_to_sql_agents.magentic_orchestration.adapters.sql_adapter import SQLAdapter
+from src.text_to_sql_agents.magentic_orchestration.cancellation import (
+    RunCancelled,
+    RunRegistry,
+    cancel_on_disconnect,
+    cancellation_stats,
+)
+from src.text_to_sql_agents.magentic_orchestration.plan_events import PlanEventStream, plan_events
+
+
+def _count(kind):
+    return cancellation_stats()[kind]["count"]
+
+
+@pytest.fixture
+def slow_plan(make_controller):
+    """A plan whose first step blocks until cancelled, with two steps waiting behind it."""
+    state = {"started": asyncio.Event(), "cancelled": 0}
+
+    async def block(payload):
+        state["started"].set()
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            state["cancelled"] += 1
+            raise
+        return "never"
+
+    async def echo(payload):
+        return payload
+
+    plan = {
+        "steps": [
+            {"id": "slow", "agent": "block", "input": {}},
+            {"id": "next", "agent": "echo", "input": {"value": "${slow}"}},
+            {"id": "last", "agent": "echo", "input": {"value": "${next}"}},
+        ]
+    }
+    state["controller"] = make_controller({"text_to_sql_basic": plan}, {"block": block, "echo": echo})
+    return state
+
+
+async def test_cancelled_run_stops_running_steps_and_skips_the_rest(slow_plan):
+    before = {kind: _count(kind) for kind in ("plans", "steps", "steps_skipped")}
+    events = []
+    with plan_events(PlanEventStream(events.append)):
+        task = asyncio.create_task(slow_plan["controller"].run_plan("text_to_sql_basic", {}))
+    await slow_plan["started"].wait()
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert slow_plan["cancelled"] == 1
+    assert ("step_cancelled", "slow") in [(e["event"], e["step"]) for e in events]
+    assert _count("plans") == before["plans"] + 1
+    assert _count("steps") == before["steps"] + 1
+    assert _count("steps_skipped") == before["steps_skipped"] + 2
+
+
+async def test_run_registry():
+    runs = RunRegistry()
+    task = asyncio.create_task(asyncio.sleep(30))
+    runs.register("r1", task)
+    with pytest.raises(ValueError, match="already in flight"):
+        runs.register("r1", task)
+    assert "r1" in runs and [r["run_id"] for r in runs.active()] == ["r1"]
+
+    assert runs.cancel("r1") is True
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await asyncio.sleep(0)
+    assert "r1" not in runs and runs.cancel("r1") is False
+
+
+async def test_cancel_on_disconnect():
+    async def connected():
+        return False
+
+    done = asyncio.create_task(asyncio.sleep(0.01, result="ok"))
+    assert await cancel_on_disconnect(done, connected, poll_seconds=0.005) == "ok"
+
+    checks = {"n": 0}
+
+    async def leaves_after_two_checks():
+        checks["n"] += 1
+        return checks["n"] > 2
+
+    before = cancellation_stats()["requests"]["disconnected"]
+    task = asyncio.create_task(asyncio.sleep(30))
+    started = time.perf_counter()
+    with pytest.raises(RunCancelled):
+        await cancel_on_disconnect(task, leaves_after_two_checks, poll_seconds=0.01, run_id="r2")
+    assert task.cancelled() and time.perf_counter() - started < 1
+    assert cancellation_stats()["requests"]["disconnected"] == before + 1
+
+
+async def test_cancelled_query_is_interrupted_in_the_driver(tmp_path):
+    path = tmp_path / "warehouse.db"
+    sqlite3.connect(path).close()
+    adapter = SQLAdapter(f"sqlite:///{path}", provider="test-cancel")
+    # long enough to still be running when cancelled; interrupted, it ends at once
+    slow = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 200000000) SELECT COUNT(*) FROM n"
+
+    before = _count("db_statements")
+    task = asyncio.create_task(adapter.execute_query(slow))
+    await asyncio.sleep(0.2)
+    started = time.perf_counter()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert _count("db_statements") == before + 1
+
+    # the worker thread is free again soon after: the statement did not run to completion
+    result = await asyncio.wait_for(adapter.execute_query("SELECT 1 AS one"), timeout=5)
+    assert result.to_records() == [{"one": 1}] and time.perf_counter() - started < 5
+
+
+async def test_cancel_endpoint_stops_a_running_query(slow_plan, monkeypatch):
+    from src.text_to_sql_agents import main
+
+    monkeypatch.setattr(main, "controller", slow_plan["controller"])
+    monkeypatch.setattr(main, "admission", None)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.post("/query/missing/cancel")).status_code == 404
+
+        query = asyncio.create_task(client.post("/query", json={"user_query": "q", "run_id": "r3"}))
+        await slow_plan["started"].wait()
+        assert (await client.post("/query/r3/cancel")).status_code == 200
+        response = await query
+
+    assert response.status_code == 499 and "cancelled" in response.json()["detail"]
+    assert slow_plan["cancelled"] == 1 and "r3" not in main.runs
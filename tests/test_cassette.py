@@ -0,0 +1,101 @@
+# tests/test_cassette.py
+import pytest
+
+from src.text_to_sql_agents.magentic_orchestration.cassette import Cassette, CassetteMiss, ReplayedResult
+from src.text_to_sql_agents.magentic_orchestration.llm_scheduler import LLMThrottled, retry_after_seconds
+from src.text_to_sql_agents.magentic_orchestration.retry_policy import classify_error
+
+
+class OperationalError(Exception):
+    """Named like the DB-API error, which classifies as transient."""
+
+
+class RateLimitError(Exception):
+    """Shaped like the openai client's 429: status code and Retry-After header."""
+
+    status_code = 429
+    headers = {"retry-after": "7"}
+
+
+class FunctionResult:
+    """Non-JSON plugin output with token usage, like SK's FunctionResult."""
+
+    metadata = {"usage": {"total_tokens": 42}}
+
+    def __str__(self):
+        return "SELECT 1"
+
+
+ERRORS = [
+    ValueError("bad plugin arguments"),
+    KeyError("missing"),
+    TimeoutError("model did not answer"),
+    LLMThrottled("still throttled"),
+    RateLimitError("slow down"),
+    OperationalError("connection dropped"),
+]
+
+
+async def _record(path, outcomes):
+    cassette = Cassette(str(path), mode="record")
+    raised = []
+    for outcome in outcomes:
+
+        async def live(outcome=outcome):
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        try:
+            await cassette.call("llm", "generate_sql", {"query": "top customers"}, live)
+        except Exception as e:
+            raised.append(e)
+    cassette.close()
+    return raised
+
+
+async def test_replay_returns_recorded_responses_and_errors_in_order(tmp_path):
+    path = tmp_path / "calls.jsonl.gz"
+    recorded = await _record(path, ["SELECT 1", FunctionResult(), *ERRORS])
+
+    replay = Cassette(str(path), mode="replay", latency_scale=0)
+
+    async def live():
+        raise AssertionError("replay must not call the service")
+
+    call = lambda: replay.call("llm", "generate_sql", {"query": "top customers"}, live)
+    assert await call() == "SELECT 1"
+    result = await call()
+    assert isinstance(result, ReplayedResult) and str(result) == "SELECT 1"
+    assert result.metadata["usage"]["total_tokens"] == 42
+
+    for original in recorded:
+        with pytest.raises(Exception) as info:
+            await call()
+        replayed = info.value
+        assert type(replayed).__name__ == type(original).__name__
+        assert classify_error(replayed) == classify_error(original)
+        assert retry_after_seconds(replayed) == retry_after_seconds(original)
+        assert str(replayed) == str(original)
+    assert replay.stats()["hits"] == 2 + len(ERRORS)
+
+
+async def test_builtin_errors_replay_as_their_own_type(tmp_path):
+    path = tmp_path / "calls.jsonl.gz"
+    await _record(path, [KeyError("missing"), TimeoutError("late")])
+    replay = Cassette(str(path), mode="replay", latency_scale=0)
+
+    with pytest.raises(KeyError):
+        await replay.call("llm", "generate_sql", {"query": "top customers"}, None)
+    with pytest.raises(TimeoutError):
+        await replay.call("llm", "generate_sql", {"query": "top customers"}, None)
+
+
+async def test_unrecorded_call_misses(tmp_path):
+    path = tmp_path / "calls.jsonl.gz"
+    await _record(path, ["SELECT 1"])
+    replay = Cassette(str(path), mode="replay", latency_scale=0)
+
+    with pytest.raises(CassetteMiss):
+        await replay.call("llm", "generate_sql", {"query": "other question"}, None)
+    assert replay.stats()["misses"] == 1
@@ -0,0 +1,49 @@
+# tests/test_coalescing.py
+import asyncio
+import time
+
+from src.text_to_sql_agents.magentic_orchestration.single_flight import SingleFlight, flight_key
+
+
+def _schema(tables: int):
+    return {
+        "tables": {
+            f"dbo.t{i}": {"columns": [{"name": f"c{j}", "type": "int"} for j in range(8)]} for i in range(tables)
+        }
+    }
+
+
+def test_flight_key_normalises_whitespace():
+    assert flight_key("plan", {"user_query": "top  customers\n"}) == flight_key("plan", {"user_query": "top customers"})
+    assert flight_key("plan", {"user_query": "a"}) != flight_key("plan", {"user_query": "b"})
+
+
+def test_known_outputs_are_keyed_by_fingerprint_not_content():
+    schema = _schema(10_000)
+    known = {id(schema): "id:schema"}
+
+    started = time.perf_counter()
+    key = flight_key("generate_sql", {"query": "q", "schema": schema}, known=known)
+    assert time.perf_counter() - started < 0.05
+
+    # the schema is not read: the key follows the fingerprint, the other inputs still count
+    schema["tables"].clear()
+    assert flight_key("generate_sql", {"query": "q", "schema": schema}, known=known) == key
+    assert flight_key("generate_sql", {"query": "q", "schema": schema}, known={id(schema): "id:other"}) != key
+    assert flight_key("generate_sql", {"query": "r", "schema": schema}, known=known) != key
+
+
+async def test_concurrent_identical_calls_share_one_execution():
+    flights = SingleFlight("test")
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return calls
+
+    key = flight_key("summarize", {"query": "q"})
+    results = await asyncio.gather(*(flights.do(key, work) for _ in range(5)))
+    assert results == [1] * 5
+    assert flights.stats()["coalesced"] == 4 and len(flights) == 0
@@ -0,0 +1,49 @@
+# tests/test_cost_gate.py
+import sqlalchemy
+
+from src.text_to_sql_agents.agents.executor import estimate_cost
+from src.text_to_sql_agents.utils.sql_lexer import referenced_tables, table_aliases
+
+
+def _warehouse():
+    engine = sqlalchemy.create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE orders (id INTEGER PRIMARY KEY, customer_id INT, amount REAL)")
+        conn.exec_driver_sql("CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.exec_driver_sql(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 5000) "
+            "INSERT INTO orders SELECT i, i % 50, i * 1.5 FROM n"
+        )
+        conn.exec_driver_sql(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 50) "
+            "INSERT INTO customers SELECT i, 'c' || i FROM n"
+        )
+    return engine
+
+
+def test_table_aliases():
+    sql = 'SELECT * FROM regions, dbo.orders o JOIN customers AS "C" ON o.customer_id = "C".id'
+    assert table_aliases(sql) == {
+        "regions": "regions",
+        "dbo.orders": "dbo.orders",
+        "o": "dbo.orders",
+        "customers": "customers",
+        "c": "customers",
+    }
+    assert referenced_tables(sql) == {"dbo.orders", "customers", "regions"}
+
+
+def test_sqlite_estimate_maps_aliases_to_tables():
+    engine = _warehouse()
+    with engine.connect() as conn:
+        plain = estimate_cost(conn, "SELECT * FROM orders")
+        aliased = estimate_cost(conn, "SELECT o.amount FROM orders o")
+        joined = estimate_cost(
+            conn, "SELECT c.name, SUM(o.amount) FROM orders AS o JOIN customers c ON c.id = o.customer_id GROUP BY c.name"
+        )
+
+    assert plain["rows_scanned"] == 5000
+    assert aliased["rows_scanned"] == 5000
+    # a full scan of one side plus a primary-key search into the other
+    assert joined["rows_scanned"] in (5000 + 50 / 10, 50 + 5000 / 10)
+    assert joined["source"] == "sqlite"
@@ -0,0 +1,56 @@
+# tests/test_guardrails.py
+import pytest
+
+from src.text_to_sql_agents.utils.sql_guard import ALLOW, AMBIGUOUS, BLOCK, analyze_sql
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT CAST(amount AS DECIMAL(10,2)) FROM orders",
+        "SELECT TRY_CAST(x AS NUMERIC(12,2)) AS x FROM t",
+        "SELECT CAST((a + b) AS NVARCHAR(50)), CAST(c AS INT) FROM t",
+        "SELECT CONVERT(VARCHAR(10), order_date, 120) FROM orders",
+        "SELECT TRY_CONVERT(DECIMAL(18,4), price) FROM products",
+        "WITH t AS (SELECT 1 AS a), u (b) AS (SELECT a FROM t) SELECT b FROM u",
+        "WITH t (a) AS (SELECT 1), u (b, c) AS (SELECT a, a FROM t) SELECT * FROM u",
+    ],
+)
+def test_type_names_and_cte_column_lists_are_allowed(sql):
+    verdict = analyze_sql(sql)
+    assert verdict.status == ALLOW, verdict.reasons
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT region, product, SUM(amount) FROM sales GROUP BY ROLLUP(region, product)",
+        "SELECT region, product, SUM(amount) FROM sales GROUP BY CUBE (region, product)",
+        "SELECT region, GROUPING(region), GROUPING_ID(region, product) FROM sales GROUP BY ROLLUP (region, product)",
+        "SELECT region, SUM(amount) FROM sales GROUP BY GROUPING SETS ((region), (region, product), ())",
+    ],
+)
+def test_grouping_extensions_are_allowed(sql):
+    verdict = analyze_sql(sql)
+    assert verdict.status == ALLOW, verdict.reasons
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        # only the type position is exempt; calls elsewhere in the conversion are still checked
+        "SELECT CAST(my_udf(x) AS DECIMAL(10,2)) FROM t",
+        "SELECT CONVERT(VARCHAR(10), my_udf(x)) FROM t",
+        # a "name (" after a comma outside the CTE list is a call
+        "WITH t AS (SELECT 1 AS a) SELECT a, my_udf(a) FROM t",
+        "SELECT a, my_udf(a) FROM t",
+    ],
+)
+def test_unknown_calls_stay_ambiguous(sql):
+    verdict = analyze_sql(sql)
+    assert verdict.status == AMBIGUOUS
+    assert verdict.reasons == ["unknown function MY_UDF"]
+
+
+def test_forbidden_routine_in_type_position_is_still_blocked():
+    assert analyze_sql("SELECT CAST(x AS INT), xp_cmdshell('dir') FROM t").status == BLOCK
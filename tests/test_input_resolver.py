@@ -0,0 +1,52 @@
+# tests/test_input_resolver.py
+import pytest
+
+from src.text_to_sql_agents.magentic_orchestration.input_resolver import compile_input, extract_references
+
+
+def _context():
+    return {
+        "inputs": {"user_query": "top customers", "limit": 5},
+        "exec": {"rows": [[1, "a"], [2, "b"]], "columns": ["id", "name"]},
+        "gen": "SELECT 1",
+    }
+
+
+def test_whole_value_reference_passes_the_object_itself():
+    context = _context()
+    assert compile_input("${exec}")(context) is context["exec"]
+    assert compile_input("${exec.rows}")(context) is context["exec"]["rows"]
+    # not stringified, and surrounding whitespace does not turn it into a template
+    assert compile_input(" ${inputs.limit} ")(context) == 5
+
+
+@pytest.mark.parametrize("raw", ["${missing}", "${inputs.nothing}", "${gen.deeper}"])
+def test_missing_whole_value_reference_is_none(raw):
+    assert compile_input(raw)(_context()) is None
+
+
+def test_embedded_references_render_a_string():
+    render = compile_input("Answer '${inputs.user_query}' with at most ${inputs.limit} rows")
+    assert render(_context()) == "Answer 'top customers' with at most 5 rows"
+    # missing tokens render empty
+    assert compile_input("q=${inputs.user_query}; x=${nope}")(_context()) == "q=top customers; x="
+
+
+def test_dicts_and_lists_resolve_each_value():
+    raw = {"sql": "${gen}", "data": "${exec}", "meta": ["${inputs.limit}", "static"], "label": "run ${inputs.limit}"}
+    context = _context()
+    resolved = compile_input(raw)(context)
+    assert resolved == {"sql": "SELECT 1", "data": context["exec"], "meta": [5, "static"], "label": "run 5"}
+    assert resolved["data"] is context["exec"]
+
+
+def test_inputs_without_references_are_returned_as_is():
+    raw = {"stream": True, "columns": ["a", "b"]}
+    resolve = compile_input(raw)
+    assert resolve({}) is raw and resolve(_context()) is raw
+    assert compile_input(42)({}) == 42
+
+
+def test_references_name_the_upstream_steps():
+    raw = {"sql": "${plan}", "query": "${inputs.user_query}", "notes": ["see ${exec.rows} and ${ gen }"]}
+    assert extract_references(raw) == {"plan", "inputs", "exec", "gen"}
@@ -0,0 +1,159 @@
+# tests/test_llm_scheduler.py
+import asyncio
+import time
+
+import pytest
+
+from src.text_to_sql_agents.magentic_orchestration.llm_scheduler import (
+    BATCH,
+    INTERACTIVE,
+    LLMQueueFull,
+    LLMScheduler,
+    LLMThrottled,
+    TokenBucket,
+    llm_priority,
+    retry_after_seconds,
+)
+
+
+class Throttled(Exception):
+    """Shaped like an HTTP client's 429 error."""
+
+    status_code = 429
+
+    def __init__(self, headers=None):
+        super().__init__("429 Too Many Requests")
+        self.headers = headers or {}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _answer(value="ok", log=None, usage=None):
+    async def call():
+        if log is not None:
+            log.append((value, time.perf_counter()))
+        return {"text": value, "usage": {"total_tokens": usage}} if usage is not None else value
+
+    return call
+
+
+def test_token_bucket_refills_continuously_up_to_capacity():
+    clock = Clock()
+    bucket = TokenBucket(60, period_seconds=60, clock=clock)
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    clock.now = 30
+    assert bucket.wait_time(30) == 0.0 and bucket.wait_time(31) == pytest.approx(1.0)
+    clock.now = 600
+    assert bucket.wait_time(60) == 0.0 and bucket.tokens == 60
+    # an oversized request waits for a full bucket instead of forever
+    assert bucket.wait_time(500) == 0.0
+    bucket.adjust(-100)  # refunds never exceed the capacity
+    assert bucket.tokens == 60
+
+
+async def test_requests_per_minute_spaces_calls():
+    # 2 requests per 0.2 s: two go at once, the rest one every 0.1 s
+    scheduler = LLMScheduler(requests_per_minute=2, period_seconds=0.2)
+    log = []
+    started = time.perf_counter()
+    await asyncio.gather(*(scheduler.submit(_answer(i, log), tokens=1) for i in range(4)))
+    offsets = [at - started for _, at in log]
+    assert offsets[1] < 0.05
+    assert offsets[2] >= 0.08 and offsets[3] >= 0.17
+    assert scheduler.stats()["classes"]["interactive"]["completed"] == 4
+
+
+async def test_tokens_per_minute_waits_for_the_estimate_and_settles_on_usage():
+    scheduler = LLMScheduler(tokens_per_minute=100, period_seconds=0.2)
+    # the estimate reserves 100 tokens; the reported usage (20) gives 80 back
+    assert (await scheduler.submit(_answer(usage=20), tokens=100))["text"] == "ok"
+    assert scheduler.tpm.tokens == pytest.approx(80, abs=5)
+
+    started = time.perf_counter()
+    await scheduler.submit(_answer(), tokens=80)
+    await scheduler.submit(_answer(), tokens=50)
+    assert time.perf_counter() - started >= 0.08
+
+
+async def test_interactive_calls_go_before_queued_batch_calls():
+    scheduler = LLMScheduler(requests_per_minute=1, period_seconds=0.05)
+    log = []
+    await scheduler.submit(_answer("first", log))  # the bucket is now empty
+    with llm_priority(BATCH):
+        batch = [asyncio.create_task(scheduler.submit(_answer(f"batch{i}", log))) for i in range(2)]
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(scheduler.submit(_answer("interactive", log), priority=INTERACTIVE))
+    await asyncio.gather(*batch, interactive)
+    assert [value for value, _ in log] == ["first", "interactive", "batch0", "batch1"]
+    classes = scheduler.stats()["classes"]
+    assert classes["batch"]["completed"] == 2 and classes["interactive"]["completed"] == 2
+
+
+async def test_retry_after_pauses_dispatch_and_requeues_the_call():
+    scheduler = LLMScheduler()
+    attempts = []
+
+    async def call():
+        attempts.append(time.perf_counter())
+        if len(attempts) == 1:
+            raise Throttled({"retry-after-ms": "100"})
+        return "ok"
+
+    assert await scheduler.submit(call) == "ok"
+    assert attempts[1] - attempts[0] >= 0.09
+    assert scheduler.throttled == 1
+
+
+async def test_persistent_throttling_gives_up():
+    scheduler = LLMScheduler(max_throttle_retries=2, default_retry_after=0.01)
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        raise Throttled()
+
+    with pytest.raises(LLMThrottled):
+        await scheduler.submit(call)
+    assert calls == 3 and scheduler.stats()["classes"]["interactive"]["failed"] == 1
+
+
+async def test_full_queue_rejects_at_once():
+    scheduler = LLMScheduler(requests_per_minute=1, period_seconds=60, max_queue=1)
+    await scheduler.submit(_answer())
+    waiting = asyncio.create_task(scheduler.submit(_answer()))
+    await asyncio.sleep(0)
+    with pytest.raises(LLMQueueFull):
+        await scheduler.submit(_answer())
+    assert scheduler.stats()["rejected"] == 1 and scheduler.stats()["queued"] == 1
+
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert scheduler.stats()["classes"]["interactive"]["cancelled_queued"] == 1
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({"retry-after-ms": "250"}, 0.25),
+        ({"retry-after": "3"}, 3.0),
+        ({}, 1.0),  # no header: the default
+    ],
+)
+def test_retry_after_header(headers, expected):
+    assert retry_after_seconds(Throttled(headers)) == expected
+
+
+def test_retry_after_is_none_for_other_errors():
+    assert retry_after_seconds(ValueError("bad")) is None
+    wrapped = RuntimeError("call failed")
+    wrapped.__cause__ = Throttled({"retry-after": "2"})
+    assert retry_after_seconds(wrapped) == 2.0
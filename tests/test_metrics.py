@@ -0,0 +1,105 @@
+# tests/test_metrics.py
+import httpx
+import pytest
+
+from src.text_to_sql_agents.magentic_orchestration.metrics import MetricsRegistry
+
+
+def _samples(text):
+    """{sample line without value: value} of an exposition, comments left out."""
+    out = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            out[name] = value
+    return out
+
+
+def test_counters_and_gauges_render_per_label_set():
+    registry = MetricsRegistry(prefix="t")
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    requests.inc(1, "/query")
+    requests.inc(2, "/query")
+    requests.inc(1, 'say "hi"\n')
+    registry.gauge("queue_depth", "Waiting runs.").set(3.5)
+
+    text = registry.render()
+    assert "# HELP t_requests_total Requests.\n# TYPE t_requests_total counter" in text
+    assert "# TYPE t_queue_depth gauge" in text
+    samples = _samples(text)
+    assert samples['t_requests_total{route="/query"}'] == "3"
+    assert samples['t_requests_total{route="say \\"hi\\"\\n"}'] == "1"
+    assert samples["t_queue_depth"] == "3.5"
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry(prefix="t")
+    latency = registry.histogram("step_seconds", "Steps.", ("step", "outcome"), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        latency.observe(value, "gen", "ok")
+    with pytest.raises(RuntimeError):
+        with latency.time("gen"):
+            raise RuntimeError("boom")
+
+    samples = _samples(registry.render())
+    assert samples['t_step_seconds_bucket{step="gen",outcome="ok",le="0.1"}'] == "1"
+    assert samples['t_step_seconds_bucket{step="gen",outcome="ok",le="1"}'] == "3"
+    assert samples['t_step_seconds_bucket{step="gen",outcome="ok",le="+Inf"}'] == "4"
+    assert samples['t_step_seconds_count{step="gen",outcome="ok"}'] == "4"
+    assert float(samples['t_step_seconds_sum{step="gen",outcome="ok"}']) == pytest.approx(4.25)
+    assert samples['t_step_seconds_count{step="gen",outcome="error"}'] == "1"
+    assert latency.count("gen", "ok") == 4
+
+
+def test_stats_sources_are_read_at_scrape_time():
+    registry = MetricsRegistry(prefix="t")
+    stats = {"hits": 1, "hit_rate": 0.5, "backend": "memory", "memory": {"size": 2}}
+    registry.add_source("cache", lambda: stats, labels={"provider": "sqlite"})
+    registry.add_source("scheduler", lambda: {"batch": {"queued": 4}}, nested_label="class", name="llm")
+    registry.add_source("broken", lambda: 1 / 0)
+
+    stats["hits"] = 7
+    samples = _samples(registry.render())
+    assert samples['t_cache_hits{provider="sqlite"}'] == "7"
+    assert samples['t_cache_hit_rate{provider="sqlite"}'] == "0.5"
+    assert samples['t_cache_memory_size{provider="sqlite"}'] == "2"
+    assert samples['t_llm_queued{class="batch"}'] == "4"
+    assert not any(name.startswith("t_cache_backend") or name.startswith("t_broken") for name in samples)
+
+    # registering a key again replaces the source
+    registry.add_source("cache", lambda: {"hits": 0})
+    assert _samples(registry.render())["t_cache_hits"] == "0"
+
+
+def test_metric_names_are_unique_per_type_and_labels():
+    registry = MetricsRegistry(prefix="t")
+    first = registry.counter("calls_total", "Calls.", ("agent",))
+    assert registry.counter("calls_total", "Calls.", ("agent",)) is first
+    with pytest.raises(ValueError):
+        registry.gauge("calls_total", "Calls.", ("agent",))
+
+
+async def test_metrics_endpoint_exposes_plan_and_step_latency(make_controller, monkeypatch):
+    from src.text_to_sql_agents import main
+
+    async def work(payload):
+        return payload["name"]
+
+    steps = [{"id": "a", "agent": "work", "input": {"name": "a"}}, {"id": "b", "agent": "work", "input": {"name": "${a}"}}]
+    controller = make_controller({"metrics_test_plan": {"steps": steps}}, {"work": work})
+    await controller.run_plan("metrics_test_plan", {})
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        samples = _samples(response.text)
+        assert samples['text_to_sql_plan_duration_seconds_count{plan="metrics_test_plan",outcome="ok"}'] == "1"
+        assert samples[
+            'text_to_sql_step_duration_seconds_count{plan="metrics_test_plan",step="b",agent="work",outcome="ok"}'
+        ] == "1"
+        assert 'text_to_sql_coalescing_coalesced{scope="plans"}' in samples
+
+        monkeypatch.setattr(main.settings.orchestration.observability, "metrics_endpoint", False)
+        assert (await client.get("/metrics")).status_code == 404
@@ -0,0 +1,112 @@
+# tests/test_plan_events.py
+import asyncio
+import json
+
+import httpx
+import numpy as np
+import pytest
+
+from src.text_to_sql_agents.magentic_orchestration.plan_events import PlanEventStream, describe_result, plan_events
+from src.text_to_sql_agents.models.result_set import ColumnarResult
+
+
+def _rows(n):
+    return ColumnarResult({"id": np.arange(n), "amount": np.arange(n) * 1.5})
+
+
+async def _gen(payload):
+    return "SELECT id, amount FROM orders"
+
+
+async def _exec(payload):
+    return _rows(5)
+
+
+async def _summarize(payload):
+    return f"{len(payload['data'])} rows"
+
+
+async def _broken(payload):
+    raise ValueError("Invalid column name 'amount'")
+
+
+AGENTS = {"gen": _gen, "exec": _exec, "summarize": _summarize, "broken": _broken}
+PLAN = {
+    "steps": [
+        {"id": "gen", "agent": "gen", "input": {"query": "${inputs.user_query}"}},
+        {"id": "exec", "agent": "exec", "input": {"sql": "${gen}"}},
+        {"id": "summary", "agent": "summarize", "input": {"data": "${exec}"}},
+    ]
+}
+
+
+def test_rows_are_sent_in_batches():
+    events = []
+    stream = PlanEventStream(events.append, batch_rows=2)
+    stream.emit_rows("exec", _rows(5), offset=10)
+
+    assert [e["event"] for e in events] == ["rows"] * 3
+    assert [e["offset"] for e in events] == [10, 12, 14]
+    assert [len(e["rows"]) for e in events] == [2, 2, 1]
+    assert events[0]["columns"] == ["id", "amount"] and events[0]["rows"][1] == {"id": 1, "amount": 1.5}
+    assert [e["seq"] for e in events] == [1, 2, 3] and stream.rows_sent == {"exec"}
+
+
+def test_describe_result_keeps_events_small():
+    assert describe_result(_rows(3)) == {"row_count": 3, "columns": ["id", "amount"]}
+    assert describe_result({"rows": _rows(2), "row_count": 900, "truncated": True}) == {"row_count": 900, "truncated": True}
+    assert describe_result({"tables": {"dbo.a": {}, "dbo.b": {}}}) == {"tables": 2}
+    assert describe_result("x" * 10, max_chars=4) == "xxxx"
+
+
+async def test_run_reports_step_progress_and_rows(make_controller):
+    controller = make_controller({"p": PLAN}, AGENTS)
+    events = []
+    with plan_events(PlanEventStream(events.append, batch_rows=2)):
+        run = await asyncio.create_task(controller.run_plan("p", {"user_query": "q"}))
+
+    assert run["results"]["summary"] == "5 rows"
+    names = [(e["event"], e["step"]) for e in events]
+    assert names == [
+        ("step_started", "gen"), ("step_completed", "gen"),
+        ("step_started", "exec"), ("rows", "exec"), ("rows", "exec"), ("rows", "exec"), ("step_completed", "exec"),
+        ("step_started", "summary"), ("step_completed", "summary"),
+    ]
+    completed = {e["step"]: e for e in events if e["event"] == "step_completed"}
+    assert completed["gen"]["result"] == "SELECT id, amount FROM orders"
+    assert completed["exec"]["result"] == {"row_count": 5, "columns": ["id", "amount"]}
+    assert completed["exec"]["attempts"] == 1 and completed["exec"]["memoized"] is False
+    # a streamed run is never shared with a concurrent identical one
+    assert controller.flights.stats()["calls"] == 0
+
+
+async def test_failed_step_is_reported(make_controller):
+    plan = {"steps": [{"id": "bad", "agent": "broken", "input": {}, "retries": 0}]}
+    controller = make_controller({"p": plan}, AGENTS)
+    events = []
+    with plan_events(PlanEventStream(events.append)):
+        with pytest.raises(ValueError):
+            await asyncio.create_task(controller.run_plan("p", {}))
+
+    failed = events[-1]
+    assert failed["event"] == "step_failed" and failed["step"] == "bad"
+    assert "Invalid column name" in failed["error"]
+
+
+async def test_query_stream_endpoint_sends_server_sent_events(make_controller, monkeypatch):
+    from src.text_to_sql_agents import main
+
+    monkeypatch.setattr(main, "controller", make_controller({"text_to_sql_basic": PLAN}, AGENTS))
+    monkeypatch.setattr(main, "admission", None)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/query/stream", json={"user_query": "top customers", "run_id": "r1"})
+
+    assert response.status_code == 200 and response.headers["X-Run-Id"] == "r1"
+    events = [
+        json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")
+    ]
+    assert events[0] == {"event": "run_started", "run_id": "r1"}
+    assert [e["event"] for e in events].count("rows") == 1
+    assert events[-1]["event"] == "done" and events[-1]["sql_query"] == "SELECT id, amount FROM orders"
+    assert events[-1]["summary"] == "5 rows"
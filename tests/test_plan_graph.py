@@ -0,0 +1,98 @@
+# tests/test_plan_graph.py
+import asyncio
+import time
+
+import pytest
+
+from src.text_to_sql_agents.magentic_orchestration.plan_graph import PlanGraph
+
+
+def _step(step_id, ms=0, after=(), **extra):
+    """A `work` step that sleeps `ms` and reads the results of the steps in `after`."""
+    return {"id": step_id, "agent": "work", "input": {"name": step_id, "ms": ms, "after": [f"${{{d}}}" for d in after]}, **extra}
+
+
+@pytest.fixture
+def trace():
+    """(name, start, end) of each `work` call, and the agent that records them."""
+    calls = []
+    running = {"now": 0, "peak": 0}
+
+    async def work(payload):
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        start = time.perf_counter()
+        try:
+            await asyncio.sleep(payload["ms"] / 1000)
+        finally:
+            running["now"] -= 1
+        calls.append((payload["name"], start, time.perf_counter()))
+        return f"{payload['name']}<{','.join(payload['after'])}>"
+
+    return {"calls": calls, "running": running, "agents": {"work": work}}
+
+
+def test_graph_edges_from_references_and_depends_on():
+    graph = PlanGraph("p", [_step("a"), _step("b", after=["a"]), _step("c", depends_on="a"), _step("d", after=["b", "c"])])
+    assert graph.dependencies == {"a": set(), "b": {"a"}, "c": {"a"}, "d": {"b", "c"}}
+    assert graph.ready(set(), set()) == ["a"]
+    assert graph.ready({"a"}, {"a"}) == ["b", "c"]
+    assert graph.ready({"a", "b"}, {"a", "b", "c"}) == []
+
+
+@pytest.mark.parametrize(
+    "steps, message",
+    [
+        ([_step("a", after=["b"]), _step("b", after=["a"])], "dependency cycle"),
+        ([_step("a", depends_on=["missing"])], "unknown step 'missing'"),
+        ([_step("a", depends_on="a")], "depends on itself"),
+        ([_step("a"), _step("a")], "more than once"),
+        ([{"agent": "work"}], "without an 'id'"),
+    ],
+)
+def test_invalid_graphs_are_rejected(steps, message):
+    with pytest.raises(ValueError, match=message):
+        PlanGraph("p", steps)
+
+
+async def test_independent_steps_run_concurrently(make_controller, trace):
+    plan = {"max_concurrency": 3, "steps": [_step("a", 20), _step("b", 100, ["a"]), _step("c", 100, ["a"]), _step("d", 20, ["b", "c"])]}
+    controller = make_controller({"p": plan}, trace["agents"])
+
+    started = time.perf_counter()
+    run = await controller.run_plan("p", {})
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.2  # b and c side by side: about 140 ms, not 240 ms
+    assert trace["running"]["peak"] == 2
+    calls = {name: (start, end) for name, start, end in trace["calls"]}
+    assert calls["b"][0] >= calls["a"][1] and calls["c"][0] >= calls["a"][1]
+    assert calls["d"][0] >= max(calls["b"][1], calls["c"][1])
+
+    # results come back in plan order, with upstream values passed along
+    assert list(run["results"]) == ["a", "b", "c", "d"]
+    assert run["results"]["d"] == "d<b<a<>>,c<a<>>>"
+    assert run["critical_path"]["steps"][0] == "a" and run["critical_path"]["steps"][-1] == "d"
+    assert set(run["timings"]) == {"a", "b", "c", "d"}
+
+
+async def test_max_concurrency_bounds_parallel_steps(make_controller, trace):
+    plan = {"max_concurrency": 2, "steps": [_step(name, 30) for name in "abcde"]}
+    controller = make_controller({"p": plan}, trace["agents"])
+    await controller.run_plan("p", {})
+    assert trace["running"]["peak"] == 2 and len(trace["calls"]) == 5
+
+
+async def test_failed_step_cancels_running_siblings(make_controller, trace):
+    async def broken(payload):
+        await asyncio.sleep(0.01)
+        raise ValueError("no such column")
+
+    plan = {"steps": [_step("slow", 1000), {"id": "bad", "agent": "broken", "input": {}, "retries": 0}, _step("after", 0, ["bad"])]}
+    controller = make_controller({"p": plan}, {**trace["agents"], "broken": broken})
+
+    started = time.perf_counter()
+    with pytest.raises(ValueError, match="no such column"):
+        await controller.run_plan("p", {})
+    assert time.perf_counter() - started < 0.5
+    assert trace["calls"] == [] and trace["running"]["now"] == 0
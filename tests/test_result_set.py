@@ -0,0 +1,45 @@
+# tests/test_result_set.py
+import datetime as dt
+import json
+import pickle
+
+import numpy as np
+
+from src.text_to_sql_agents.models.result_set import ColumnarResult
+
+
+def test_to_records_converts_datetime_columns():
+    result = ColumnarResult(
+        {
+            "order_date": np.array(["2024-03-01T10:30:00", "NaT"], dtype="datetime64[ns]"),
+            "lead_time": np.array([90, 3600], dtype="timedelta64[s]").astype("timedelta64[ns]"),
+            "amount": np.array([12.5, np.nan]),
+        }
+    )
+    records = result.to_records()
+    assert records == [
+        {"order_date": dt.datetime(2024, 3, 1, 10, 30), "lead_time": dt.timedelta(seconds=90), "amount": 12.5},
+        {"order_date": None, "lead_time": dt.timedelta(hours=1), "amount": None},
+    ]
+    assert json.loads(json.dumps(records, default=str))[0]["order_date"] == "2024-03-01 10:30:00"
+
+
+def test_to_records_from_dataframe_dates():
+    import pandas as pd
+
+    df = pd.DataFrame({"day": pd.to_datetime(["2024-01-31", "2024-02-29"]), "n": [1, 2]})
+    records = ColumnarResult.from_dataframe(df).to_records(limit=1)
+    assert records == [{"day": dt.datetime(2024, 1, 31), "n": 1}]
+
+
+def test_nbytes_counts_object_columns_once():
+    names = np.array(["alpha", "beta", None], dtype=object)
+    result = ColumnarResult({"id": np.arange(3), "name": names})
+    size = result.nbytes
+    assert size > result.column("id").nbytes + names.nbytes
+    assert result.nbytes == size
+
+    # a result pickled into the step store before the cached size existed has no such slot
+    legacy = object.__new__(ColumnarResult)
+    legacy._data, legacy._length = result._data, len(result)
+    assert pickle.loads(pickle.dumps(legacy)).nbytes == size
@@ -0,0 +1,174 @@
+# tests/test_retry_policy.py
+import asyncio
+import json
+import random
+import time
+
+import pydantic
+import pytest
+
+from src.text_to_sql_agents.magentic_orchestration.deadline import DeadlineExceeded, StepTimeout
+from src.text_to_sql_agents.magentic_orchestration.llm_scheduler import LLMThrottled
+from src.text_to_sql_agents.magentic_orchestration.retry_policy import (
+    DEADLINE,
+    DETERMINISTIC,
+    THROTTLED,
+    TIMEOUT,
+    TRANSIENT,
+    UNKNOWN,
+    RetryPolicy,
+    classify_error,
+)
+from src.text_to_sql_agents.models.sql_models import SQLQuery
+
+# stand-ins for driver / client errors, matched by class name like the real ones
+OperationalError = type("OperationalError", (Exception,), {})
+ProgrammingError = type("ProgrammingError", (Exception,), {})
+
+
+class RateLimited(Exception):
+    status_code = 429
+    headers = {"retry-after-ms": "1500"}
+
+
+@pytest.mark.parametrize(
+    "exc, expected",
+    [
+        (DeadlineExceeded("out of time"), DEADLINE),
+        (LLMThrottled("still 429"), THROTTLED),
+        (RateLimited(), THROTTLED),
+        (asyncio.TimeoutError(), TIMEOUT),
+        (StepTimeout("attempt too slow"), TIMEOUT),
+        (OperationalError("connection reset by peer"), TRANSIENT),
+        (ConnectionResetError(), TRANSIENT),
+        (ProgrammingError("Invalid column name 'x'"), DETERMINISTIC),
+        (ValueError("bad input"), DETERMINISTIC),
+        (KeyError("agent"), DETERMINISTIC),
+        (RuntimeError("something else"), UNKNOWN),
+    ],
+)
+def test_classify_error(exc, expected):
+    assert classify_error(exc) == expected
+
+
+def test_unparseable_model_output_stays_retryable():
+    with pytest.raises(json.JSONDecodeError) as info:
+        json.loads("Here is your SQL: SELECT 1")
+    assert classify_error(info.value) == UNKNOWN
+
+    with pytest.raises(pydantic.ValidationError) as info:
+        SQLQuery.model_validate({"dialect": "tsql"})
+    assert classify_error(info.value) == UNKNOWN
+
+    OutputParserException = type("OutputParserException", (ValueError,), {})
+    assert classify_error(OutputParserException("could not parse LLM output")) == UNKNOWN
+    assert UNKNOWN in RetryPolicy.from_step({"id": "gen", "retries": 1}).retry_on
+
+
+def test_policy_from_step_and_defaults():
+    defaults = {"retry_on": ["transient", "deterministic"], "initial_backoff_ms": 50, "jitter": "none"}
+    policy = RetryPolicy.from_step({"id": "exec", "retries": 2, "timeout_ms": 1500}, defaults)
+    assert policy.max_attempts == 3 and policy.timeout == 1.5
+    # deterministic errors are never retried, whatever the plan says
+    assert policy.retry_on == frozenset({TRANSIENT})
+    assert policy.should_retry(TRANSIENT, 2) and not policy.should_retry(TRANSIENT, 3)
+    assert not policy.should_retry(DETERMINISTIC, 1)
+
+    # an explicit retry block wins over the retries shorthand and the defaults
+    policy = RetryPolicy.from_step({"id": "gen", "retries": 5, "retry": {"max_attempts": 2, "jitter": "full"}}, defaults)
+    assert policy.max_attempts == 2 and policy.jitter == "full" and policy.initial_backoff_ms == 50
+
+    assert RetryPolicy.from_step({"id": "plain"}) == RetryPolicy()
+
+
+@pytest.mark.parametrize(
+    "retry, message",
+    [({"max_tries": 3}, "Unknown retry settings"), ({"retry_on": ["flaky"]}, "Unknown error classes"), ({"jitter": "some"}, "Unknown jitter")],
+)
+def test_invalid_policies_are_rejected(retry, message):
+    with pytest.raises(ValueError, match=message):
+        RetryPolicy.from_step({"id": "s", "retry": retry})
+
+
+def test_backoff_grows_caps_jitters_and_honours_retry_after():
+    policy = RetryPolicy(initial_backoff_ms=100, multiplier=2, max_backoff_ms=350, jitter="none")
+    assert [policy.backoff(n) for n in (1, 2, 3, 4)] == [0.1, 0.2, 0.35, 0.35]
+
+    rng = random.Random(3)
+    full = RetryPolicy(initial_backoff_ms=100, jitter="full")
+    equal = RetryPolicy(initial_backoff_ms=100, jitter="equal")
+    assert all(0 <= full.backoff(1, rng=rng) <= 0.1 for _ in range(50))
+    assert all(0.05 <= equal.backoff(1, rng=rng) <= 0.1 for _ in range(50))
+
+    # a 429's Retry-After is a floor under the computed delay
+    assert policy.backoff(1, RateLimited()) == 1.5
+
+
+def _flaky(failures, exc_type=OperationalError, delay=0.0):
+    """An agent that raises `exc_type` on its first `failures` calls, then answers."""
+    calls = {"n": 0}
+
+    async def agent(payload):
+        calls["n"] += 1
+        await asyncio.sleep(delay)
+        if calls["n"] <= failures:
+            raise exc_type(f"failure {calls['n']}")
+        return "ok"
+
+    return agent, calls
+
+
+def _plan(**step):
+    retry = {"initial_backoff_ms": 1, "jitter": "none", **step.pop("retry", {})}
+    return {"steps": [{"id": "s", "agent": "flaky", "input": {}, "retry": retry, **step}]}
+
+
+async def test_transient_failures_are_retried(make_controller):
+    agent, calls = _flaky(2)
+    controller = make_controller({"p": _plan(retries=2)}, {"flaky": agent})
+    run = await controller.run_plan("p", {})
+
+    assert run["results"]["s"] == "ok" and calls["n"] == 3
+    timing = run["timings"]["s"]
+    assert timing["attempts"] == 3 and timing["retries"] == 2 and timing["errors"] == [TRANSIENT, TRANSIENT]
+    assert controller.retry_stats()["p.s"]["retries"] == 2
+
+
+async def test_deterministic_failures_are_not_retried(make_controller):
+    agent, calls = _flaky(1, ProgrammingError)
+    controller = make_controller({"p": _plan(retries=3)}, {"flaky": agent})
+    with pytest.raises(ProgrammingError):
+        await controller.run_plan("p", {})
+    assert calls["n"] == 1
+    assert controller.retry_stats()["p.s"]["failures"] == 1
+
+
+async def test_step_timeout_is_retried_per_attempt(make_controller):
+    calls = {"n": 0}
+
+    async def slow_once(payload):
+        calls["n"] += 1
+        await asyncio.sleep(1.0 if calls["n"] == 1 else 0)
+        return "ok"
+
+    controller = make_controller({"p": _plan(retries=1, timeout_ms=50)}, {"flaky": slow_once})
+    run = await controller.run_plan("p", {})
+    assert run["results"]["s"] == "ok" and run["timings"]["s"]["errors"] == [TIMEOUT]
+
+
+async def test_plan_deadline_stops_retries(make_controller):
+    agent, calls = _flaky(100, delay=0.03)
+    plan = _plan(retries=50, retry={"initial_backoff_ms": 10})
+    controller = make_controller({"p": {**plan, "deadline_ms": 100}}, {"flaky": agent})
+
+    started = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        await controller.run_plan("p", {})
+    assert time.perf_counter() - started < 0.5
+    assert 1 < calls["n"] < 10
+
+    # a caller's tighter deadline wins over the plan's own
+    agent, calls = _flaky(0, delay=0.2)
+    controller = make_controller({"p": _plan()}, {"flaky": agent})
+    with pytest.raises(DeadlineExceeded):
+        await controller.run_plan("p", {}, deadline_ms=50)
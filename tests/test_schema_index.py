@@ -0,0 +1,79 @@
+# tests/test_schema_index.py
+from src.text_to_sql_agents.magentic_orchestration.schema_index import SchemaIndex, index_terms, render_schema
+
+
+def _table(name, columns, comment=None, fks=()):
+    return {
+        "name": name.rsplit(".", 1)[-1],
+        "comment": comment,
+        "columns": [{"name": c, "type": "int"} for c in columns],
+        "primary_key": [columns[0]],
+        "foreign_keys": [
+            {"columns": [col], "referred_table": table, "referred_columns": ["id"]} for col, table in fks
+        ],
+    }
+
+
+SNAPSHOT = {
+    "tables": {
+        "sales.orders": _table(
+            "sales.orders", ["id", "customer_id", "product_id", "order_date", "amount"],
+            fks=[("customer_id", "sales.customers"), ("product_id", "sales.products")],
+        ),
+        "sales.customers": _table("sales.customers", ["id", "name", "region_id"], fks=[("region_id", "sales.regions")]),
+        "sales.products": _table("sales.products", ["id", "title", "supplier_id"], fks=[("supplier_id", "sales.suppliers")]),
+        "sales.regions": _table("sales.regions", ["id", "name"]),
+        "sales.suppliers": _table("sales.suppliers", ["id", "name"], comment="vendors we buy stock from"),
+        "hr.employees": _table("hr.employees", ["id", "name", "salary"]),
+        "hr.payroll": _table("hr.payroll", ["id", "employee_id", "paid_at"], fks=[("employee_id", "hr.employees")]),
+    }
+}
+
+
+def test_identifiers_split_into_terms():
+    assert index_terms("CustomerID") == ["customer", "id"]
+    assert index_terms("order_items2") == ["order", "item", "2"]
+    assert index_terms("Show me the categories") == ["category"]
+
+
+def test_tables_are_ranked_by_relevance():
+    index = SchemaIndex(SNAPSHOT)
+    # a table-name match outweighs a column-name match (customer_id in orders)
+    assert index.search("customers", k=2) == ["sales.customers", "sales.orders"]
+    assert index.search("employee salaries", k=1) == ["hr.employees"]
+    # comments are indexed too
+    assert index.search("vendors", k=3) == ["sales.suppliers"]
+    assert index.search("weather forecast") == []
+
+
+def test_select_adds_foreign_key_neighbours():
+    index = SchemaIndex(SNAPSHOT)
+    assert index.select("salary", k=1, hops=0) == ["hr.employees"]
+    assert index.select("salary", k=1, hops=1) == ["hr.employees", "hr.payroll"]
+
+    two_hops = index.select("regions", k=1, hops=2)
+    assert two_hops[:2] == ["sales.regions", "sales.customers"]
+    assert set(two_hops) == {"sales.regions", "sales.customers", "sales.orders"}
+
+
+def test_select_is_capped_at_max_tables_keeping_relevant_neighbours():
+    index = SchemaIndex(SNAPSHOT)
+    # orders neighbours customers and products; the one the question mentions wins the last slot
+    assert index.select("order amount per product", k=1, hops=1, max_tables=2) == ["sales.orders", "sales.products"]
+    assert len(index.select("name", k=5, hops=3, max_tables=3)) == 3
+
+
+def test_select_without_matches_falls_back_to_connected_tables():
+    index = SchemaIndex(SNAPSHOT)
+    assert index.select("weather forecast", k=1, hops=0) == ["sales.orders"]
+
+
+def test_subset_and_render_keep_the_snapshot_shape():
+    index = SchemaIndex(SNAPSHOT)
+    subset = index.subset(["sales.orders", "nope"])
+    assert list(subset["tables"]) == ["sales.orders"]
+    text = render_schema(subset)
+    assert text.startswith("sales.orders(id int PK, customer_id int -> sales.customers.id")
+    assert render_schema({"tables": {"sales.suppliers": SNAPSHOT["tables"]["sales.suppliers"]}}).endswith(
+        "-- vendors we buy stock from"
+    )
@@ -0,0 +1,157 @@
+# tests/test_sql_cache.py
+import pytest
+
+from src.text_to_sql_agents.magentic_orchestration.agent_registry import AgentRegistry
+from src.text_to_sql_agents.magentic_orchestration.sql_cache import (
+    SemanticSQLCache,
+    _parameterize_sql,
+    normalize_question,
+)
+from src.text_to_sql_agents.models.config_models import SQLCacheSettings
+from src.text_to_sql_agents.utils.sql_validator import SQLValidationFailed
+
+SNAPSHOT = {"tables": {"dbo.orders": {"columns": [{"name": "id"}, {"name": "amount"}]}}}
+
+
+class ProgrammingError(Exception):
+    """Stands in for the DB-API error raised for SQL the database rejects."""
+
+
+class FakeKernel:
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+
+    async def invoke_plugin(self, name, **kwargs):
+        self.calls += 1
+        return self.sql
+
+
+class FakeSQL:
+    provider = "sqlite"
+
+    def __init__(self, error=None):
+        self.error = error
+
+    async def execute_query(self, sql):
+        if self.error is not None:
+            raise self.error
+        return []
+
+
+def _registry(sql, db_error=None):
+    return AgentRegistry(
+        kernel_adapter=FakeKernel(sql), sql_adapter=FakeSQL(db_error), sql_cache=SemanticSQLCache(), max_repairs=0
+    )
+
+
+@pytest.mark.parametrize(
+    "question",
+    ["Show me the top 5 customers", "top 5 customers?", "  TOP 5   Customers, please ", "what are the top 5 customers"],
+)
+def test_questions_differing_in_case_punctuation_and_stop_words_normalise_alike(question):
+    assert normalize_question(question) == ("top <num> customers", ["5"])
+
+
+def test_normalisation_keeps_words_that_change_the_answer():
+    assert normalize_question("customers not in 2023")[0] != normalize_question("customers in 2023")[0]
+    assert normalize_question("sales by region 2.5")[1] == ["2.5"]
+    # digits inside identifiers are not parameters
+    assert normalize_question("q4 revenue for region_2") == ("q4 revenue for region_2", [])
+
+
+def test_sql_is_parameterized_over_distinct_numbers_used_once():
+    assert _parameterize_sql("SELECT TOP 5 * FROM t WHERE year = 2023", ["5", "2023"]) == (
+        "SELECT TOP {0} * FROM t WHERE year = {1}"
+    )
+    assert _parameterize_sql("SELECT '{x}' FROM t LIMIT 5", ["5"]).format("7") == "SELECT '{x}' FROM t LIMIT 7"
+
+
+@pytest.mark.parametrize(
+    "sql, numbers",
+    [
+        ("SELECT TOP 5 * FROM t WHERE rank <= 5", ["5"]),    # the number is used twice in the SQL
+        ("SELECT TOP 5 * FROM t", ["5", "5"]),                # ... or twice in the question
+        ("SELECT TOP 10 * FROM t", ["5"]),                    # ... or not at all
+        ("SELECT * FROM t", []),
+    ],
+)
+def test_ambiguous_numbers_are_not_parameterized(sql, numbers):
+    assert _parameterize_sql(sql, numbers) is None
+
+
+def test_cached_template_serves_the_same_question_with_another_number():
+    cache = SemanticSQLCache()
+    cache.put("top 5 customers", "SELECT TOP 5 name FROM customers ORDER BY revenue DESC")
+    assert cache.get("Top 10 customers") == "SELECT TOP 10 name FROM customers ORDER BY revenue DESC"
+
+
+def test_sql_with_a_repeated_number_only_serves_the_same_number():
+    cache = SemanticSQLCache()
+    cache.put("orders over 5 items", "SELECT id FROM orders WHERE items > 5 AND lines > 5")
+    assert cache.get("orders over 5 items") == "SELECT id FROM orders WHERE items > 5 AND lines > 5"
+    assert cache.get("orders over 6 items") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_schema_change_invalidates_cached_sql():
+    cache = SemanticSQLCache()
+    cache.set_schema(SNAPSHOT)
+    cache.put("order ids", "SELECT id FROM dbo.orders")
+    assert cache.set_schema({"tables": dict(SNAPSHOT["tables"])}) == cache.schema_fingerprint  # same content
+    assert cache.get("order ids") == "SELECT id FROM dbo.orders"
+
+    changed = {"tables": {"dbo.orders": {"columns": [{"name": "order_id"}, {"name": "amount"}]}}}
+    cache.set_schema(changed)
+    assert cache.get("order ids") is None
+    # switching back does not revive the dropped entry
+    cache.set_schema(SNAPSHOT)
+    assert cache.get("order ids") is None
+
+
+def test_disabled_cache_is_not_built():
+    assert SemanticSQLCache.from_settings(SQLCacheSettings(enabled=False)) is None
+    cache = SemanticSQLCache.from_settings(SQLCacheSettings(max_entries=1, ttl_seconds=None))
+    cache.put("a", "SELECT 1")
+    cache.put("b", "SELECT 2")
+    assert cache.get("a") is None and cache.get("b") == "SELECT 2"
+
+
+async def test_generated_sql_is_cached_only_after_validation():
+    registry = _registry("SELECT id FROM dbo.orders")
+    sql = await registry.invoke("generate_sql", {"query": "order ids", "schema": SNAPSHOT})
+    assert registry.sql_cache.get("order ids") is None
+
+    await registry.invoke("validate_sql", {"sql": sql, "query": "order ids", "allowed": True})
+    assert registry.sql_cache.get("order ids") == sql
+
+
+@pytest.mark.parametrize(
+    "sql, allowed, error",
+    [
+        ("SELECT id FROM dbo.orders", False, ValueError),            # rejected by the guardrail
+        ("SELECT total FROM dbo.orders", True, SQLValidationFailed),  # unknown column
+    ],
+)
+async def test_rejected_sql_is_not_cached(sql, allowed, error):
+    registry = _registry(sql)
+    await registry.invoke("generate_sql", {"query": "order ids", "schema": SNAPSHOT})
+    with pytest.raises(error):
+        await registry.invoke("validate_sql", {"sql": sql, "query": "order ids", "allowed": allowed})
+    assert registry.sql_cache.get("order ids") is None
+
+
+async def test_sql_the_database_rejects_is_evicted():
+    registry = _registry("SELECT id FROM dbo.orders", db_error=ProgrammingError("no such table"))
+    registry.sql_cache.put("order ids", "SELECT id FROM dbo.orders")
+    with pytest.raises(ProgrammingError):
+        await registry.invoke("execute_sql", {"sql": "SELECT id FROM dbo.orders", "query": "order ids"})
+    assert registry.sql_cache.get("order ids") is None
+
+
+async def test_transient_database_errors_keep_the_cached_sql():
+    registry = _registry("SELECT id FROM dbo.orders", db_error=ConnectionResetError("reset"))
+    registry.sql_cache.put("order ids", "SELECT id FROM dbo.orders")
+    with pytest.raises(ConnectionResetError):
+        await registry.invoke("execute_sql", {"sql": "SELECT id FROM dbo.orders", "query": "order ids"})
+    assert registry.sql_cache.get("order ids") == "SELECT id FROM dbo.orders"
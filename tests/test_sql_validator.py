@@ -0,0 +1,39 @@
+# tests/test_sql_validator.py
+import pytest
+
+from src.text_to_sql_agents.utils.sql_validator import SQLValidator
+
+SNAPSHOT = {
+    "tables": {
+        "dbo.orders": {"columns": [{"name": "id"}, {"name": "customer_id"}, {"name": "order_date"}, {"name": "amount"}]},
+        "dbo.customers": {"columns": [{"name": "id"}, {"name": "name"}, {"name": "created_at"}]},
+    }
+}
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT DATEADD(dd, -7, order_date) FROM dbo.orders",
+        "SELECT DATEDIFF(yy, created_at, GETDATE()) FROM dbo.customers",
+        "SELECT DATEPART(qq, order_date), DATENAME(mm, order_date) FROM dbo.orders",
+        "SELECT id FROM dbo.orders WHERE order_date >= DATEADD(wk, -1, GETDATE())",
+        "SELECT DATEDIFF(hh, o.order_date, c.created_at) FROM dbo.orders o JOIN dbo.customers c ON c.id = o.customer_id",
+    ],
+)
+def test_date_parts_are_not_columns(sql):
+    assert SQLValidator(SNAPSHOT).validate(sql) == []
+
+
+@pytest.mark.parametrize(
+    "sql, name",
+    [
+        # only the first argument is a date part; the others are still resolved
+        ("SELECT DATEADD(dd, -7, shipped_at) FROM dbo.orders", "shipped_at"),
+        ("SELECT DATEDIFF(dd, order_date, shipped_at) FROM dbo.orders", "shipped_at"),
+        ("SELECT ROUND(dd, 2) FROM dbo.orders", "dd"),
+    ],
+)
+def test_unknown_columns_next_to_date_parts_are_reported(sql, name):
+    errors = SQLValidator(SNAPSHOT).validate(sql)
+    assert [e.name for e in errors] == [name]
@@ -0,0 +1,133 @@
+# tests/test_startup.py
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+from src.text_to_sql_agents.utils.startup import StartupProfile
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# generous: catches a heavy module creeping back into the import path, not machine noise
+IMPORT_BUDGET_MS = 3000
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from src.text_to_sql_agents import main
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({"ms": elapsed, "loaded": sorted(m for m in sys.modules), "report": main.startup_profile.report()}))
+"""
+
+
+@pytest.fixture(scope="module")
+def cold_import():
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=ROOT, capture_output=True, text=True, timeout=60, check=True
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("module", ["semantic_kernel", "matplotlib", "sqlalchemy", "pandas"])
+def test_app_import_does_not_load_heavy_modules(cold_import, module):
+    assert module not in cold_import["loaded"]
+
+
+def test_app_import_time_and_profile(cold_import):
+    assert cold_import["ms"] < IMPORT_BUDGET_MS
+    report = cold_import["report"]
+    assert report["heavy_modules_at_import"] == []
+    assert 0 < report["import_ms"] < IMPORT_BUDGET_MS
+    assert report["ready"] is False and report["stages"] == {}
+
+
+async def test_stages_run_concurrently():
+    profile = StartupProfile()
+
+    async def slow():
+        await asyncio.sleep(0.2)
+        return "up"
+
+    started = time.perf_counter()
+    results = await profile.run_all([("kernel", slow, True), ("foundry", slow, True)])
+    profile.mark_ready()
+
+    assert results == ["up", "up"]
+    assert time.perf_counter() - started < 0.35
+    assert profile.ready and not profile.failed
+    report = profile.report()
+    assert {s["status"] for s in report["stages"].values()} == {"done"}
+    assert all(s["duration_ms"] >= 190 for s in report["stages"].values())
+
+
+async def test_failed_required_stage_is_not_ready():
+    profile = StartupProfile()
+
+    async def broken():
+        raise ValueError("Azure OpenAI configuration is missing.")
+
+    async def fine():
+        return None
+
+    with pytest.raises(ValueError):
+        await profile.run_all([("kernel", broken, True), ("controller", fine, True)])
+
+    assert profile.failed and not profile.ready
+    stages = profile.report()["stages"]
+    assert stages["kernel"]["status"] == "failed"
+    assert "configuration is missing" in stages["kernel"]["error"]
+    assert stages["controller"]["status"] == "done"
+
+
+async def test_failed_optional_stage_and_skip_keep_app_ready():
+    profile = StartupProfile()
+
+    async def broken():
+        raise RuntimeError("no blob memory")
+
+    assert await profile.run("memory", broken, required=False) is None
+    profile.skip("foundry", reason="cassette replay")
+    profile.mark_ready()
+
+    assert profile.ready
+    assert profile.stages["memory"]["status"] == "failed"
+    assert profile.stages["foundry"]["status"] == "skipped"
+
+
+async def test_health_endpoints_follow_startup_profile(monkeypatch):
+    from src.text_to_sql_agents import main
+
+    async def request(path):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path)
+
+    profile = StartupProfile()
+    monkeypatch.setattr(main, "startup_profile", profile)
+
+    # initialising: alive, not ready
+    assert (await request("/health/live")).status_code == 200
+    response = await request("/health/ready")
+    assert response.status_code == 503 and response.json()["ready"] is False
+
+    async def up():
+        return None
+
+    await profile.run_all([("controller", up, True)])
+    profile.mark_ready()
+    assert (await request("/health/ready")).status_code == 200
+    assert (await request("/health")).json()["ready"] is True
+
+    async def broken():
+        raise RuntimeError("foundry unreachable")
+
+    with pytest.raises(RuntimeError):
+        await profile.run("foundry", broken)
+    assert (await request("/health/live")).status_code == 503
+    assert (await request("/health/ready")).status_code == 503
+    assert (await request("/health")).json()["status"] == "failed"
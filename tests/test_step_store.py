@@ -0,0 +1,107 @@
+# tests/test_step_store.py
+import numpy as np
+import pytest
+
+from src.text_to_sql_agents.magentic_orchestration.step_store import StepStore, input_digest
+from src.text_to_sql_agents.models.config_models import StepStoreSettings
+from src.text_to_sql_agents.models.result_set import ColumnarResult
+
+
+@pytest.fixture
+def make_store(tmp_path):
+    stores = []
+
+    def make(backend="memory", **kwargs):
+        settings = StepStoreSettings(enabled=True, backend=backend, path=str(tmp_path / "steps.sqlite"), **kwargs)
+        stores.append(StepStore(settings))
+        return stores[-1]
+
+    yield make
+    for store in stores:
+        store.close()
+
+
+def test_input_digest_follows_content_and_known_results():
+    rows = ColumnarResult({"id": np.arange(3), "name": np.array(["a", "b", "c"], dtype=object)})
+    same = ColumnarResult({"id": np.arange(3), "name": np.array(["a", "b", "c"], dtype=object)})
+    assert input_digest({"data": rows, "n": 1}) == input_digest({"n": 1, "data": same})
+    other = ColumnarResult({"id": np.arange(3), "name": np.array(["a", "b", "d"], dtype=object)})
+    assert input_digest({"data": rows}) != input_digest({"data": other})
+    assert input_digest({"n": 1}) != input_digest({"n": "1"})
+    # an upstream result listed in `known` hashes as its step key, not its content
+    assert input_digest({"data": rows}, {id(rows): "k1"}) == input_digest({"data": same}, {id(same): "k1"})
+    assert input_digest({"data": rows}, {id(rows): "k1"}) != input_digest({"data": rows}, {id(rows): "k2"})
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "memory+sqlite"])
+async def test_round_trip(make_store, backend):
+    store = make_store(backend)
+    value = {"sql": "SELECT 1", "rows": [[1, "a"]]}
+    key = store.key("p", "gen", "generate_sql", "d1")
+    assert await store.get(key) is None
+
+    await store.put(key, value, "p", "gen", "generate_sql", "d1")
+    entry = await store.get(key)
+    assert entry["value"] == value and entry["step_id"] == "gen" and entry["agent"] == "generate_sql"
+    assert [e["key"] for e in store.entries(plan="p")] == [key]
+    assert store.stats()["hits"] == 1 and store.stats()["misses"] == 1 and store.stats()["writes"] == 1
+
+    assert store.delete(key) and await store.get(key) is None
+
+
+async def test_sqlite_entries_survive_a_restart(make_store):
+    rows = ColumnarResult({"id": np.arange(4), "amount": np.linspace(0, 1, 4)})
+    first = make_store("sqlite")
+    key = first.key("p", "exec", "execute_sql", "d1")
+    await first.put(key, rows, "p", "exec", "execute_sql", "d1")
+    first.close()
+
+    entry = await make_store("memory+sqlite").get(key)
+    assert entry["value"].columns == rows.columns
+    assert np.array_equal(entry["value"].column("amount"), rows.column("amount"))
+
+
+async def test_expired_entries_are_misses(make_store):
+    store = make_store("memory+sqlite")
+    key = store.key("p", "gen", "generate_sql", "d1")
+    await store.put(key, "SELECT 1", "p", "gen", "generate_sql", "d1", ttl_seconds=0)
+    assert await store.get(key) is None and store.entries() == []
+
+
+def test_keys_are_shared_across_plans_unless_disabled(make_store):
+    shared = make_store()
+    assert shared.key("a", "gen", "generate_sql", "d") == shared.key("b", "gen", "generate_sql", "d")
+    private = make_store(share_across_plans=False)
+    assert private.key("a", "gen", "generate_sql", "d") != private.key("b", "gen", "generate_sql", "d")
+
+
+async def test_rerun_resumes_after_the_failed_step(make_controller, make_store):
+    calls = []
+    fail = {"report": True}
+
+    async def work(payload):
+        calls.append(payload["name"])
+        if fail.get(payload["name"]):
+            raise ValueError(f"{payload['name']} failed")
+        return f"{payload['name']}({payload.get('after')})"
+
+    steps = [
+        {"id": "gen", "agent": "work", "input": {"name": "gen"}},
+        {"id": "exec", "agent": "work", "input": {"name": "exec", "after": "${gen}"}},
+        {"id": "live", "agent": "work", "input": {"name": "live", "after": "${exec}"}, "memoize": False},
+        {"id": "report", "agent": "work", "input": {"name": "report", "after": "${live}"}},
+    ]
+    controller = make_controller({"p": {"steps": steps}}, {"work": work}, step_store=make_store("memory+sqlite"))
+
+    with pytest.raises(ValueError):
+        await controller.run_plan("p", {})
+    assert calls == ["gen", "exec", "live", "report"]
+
+    calls.clear()
+    fail["report"] = False
+    result = await controller.run_plan("p", {})
+    # stored steps are restored; the step opted out of memoization runs again, then the failed one
+    assert calls == ["live", "report"]
+    assert result["context"]["report"] == "report(live(exec(gen(None))))"
+    assert result["timings"]["gen"]["memoized"] and result["timings"]["exec"]["memoized"]
+    assert not result["timings"]["report"].get("memoized")